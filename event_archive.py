@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Time-partitioned event archive for Graph My Mind.
+Moves old events out of the live SQLite database into compressed NDJSON
+segments with a small index, and streams archived and live events back as
+one generator with filters pushed down to the segment index and SQL.
+"""
+
+import argparse
+import functools
+import gzip
+import heapq
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+TEMPLATES_DIR = SCRIPT_DIR / 'templates'
+DEFAULT_DB_DIR = SCRIPT_DIR / 'db'
+DEFAULT_ARCHIVE_DIR = DEFAULT_DB_DIR / 'archive'
+MANIFEST_NAME = 'manifest.json'
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(TEMPLATES_DIR))
+from workspace_store import atomic_write_json, file_lock, read_json
+
+
+def default_db_paths(db_dir=DEFAULT_DB_DIR):
+    """Return the live events database plus any shards under db_dir."""
+    db_dir = Path(db_dir)
+    paths = []
+    if (db_dir / 'events.db').exists():
+        paths.append(db_dir / 'events.db')
+    paths.extend(sorted((db_dir / 'shards').glob('*.db')))
+    return paths
+
+
+def partition_key(timestamp_ms):
+    """UTC day partition (YYYY-MM-DD) for a millisecond timestamp."""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def row_to_event(row):
+    """Convert an events row into the JSON shape served by the API."""
+    try:
+        data = json.loads(row['data'] or '{}')
+    except (json.JSONDecodeError, TypeError):
+        data = {}
+    return {
+        'id': row['id'],
+        'session_id': row['session_id'],
+        'event_type': row['event_type'],
+        'timestamp': row['timestamp'],
+        'data': data,
+        'created_at': row['created_at'],
+    }
+
+
+def load_manifest(archive_dir):
+    """Load the archive manifest, creating an empty one in memory if absent."""
+    manifest = read_json(Path(archive_dir) / MANIFEST_NAME)
+    manifest.setdefault('segments', [])
+    manifest.setdefault('runs', [])
+    return manifest
+
+
+def open_db(db_path, readonly=False):
+    """Open an events database with rows accessible by column name."""
+    if readonly:
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    else:
+        conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class SegmentWriter:
+    """Writes one compressed NDJSON segment and accumulates its index entry."""
+
+    def __init__(self, archive_dir, db_name, partition, first_id):
+        year, month, _ = partition.split('-')
+        self.relative_path = Path(year) / month / f'{db_name}-{partition}-{first_id}.ndjson.gz'
+        self.path = Path(archive_dir) / self.relative_path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name('.' + self.path.name + '.tmp')
+        self.raw = open(self.tmp_path, 'wb')
+        self.stream = gzip.GzipFile(fileobj=self.raw, mode='wb')
+        self.entry = {
+            'path': str(self.relative_path),
+            'db': db_name,
+            'partition': partition,
+            'count': 0,
+            'min_ts': None,
+            'max_ts': None,
+            'min_id': None,
+            'max_id': None,
+            'sessions': set(),
+            'workspaces': set(),
+            'working_directories': set(),
+            'event_types': set(),
+        }
+
+    def write(self, event):
+        self.stream.write(json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n')
+        entry = self.entry
+        ts, event_id = event['timestamp'], event['id']
+        entry['count'] += 1
+        entry['min_ts'] = ts if entry['min_ts'] is None else min(entry['min_ts'], ts)
+        entry['max_ts'] = ts if entry['max_ts'] is None else max(entry['max_ts'], ts)
+        entry['min_id'] = event_id if entry['min_id'] is None else min(entry['min_id'], event_id)
+        entry['max_id'] = event_id if entry['max_id'] is None else max(entry['max_id'], event_id)
+        entry['sessions'].add(event['session_id'])
+        entry['event_types'].add(event['event_type'])
+        workspace = event['data'].get('workspace')
+        if workspace:
+            entry['workspaces'].add(workspace)
+        working_directory = event['data'].get('working_directory')
+        if isinstance(working_directory, str) and working_directory:
+            entry['working_directories'].add(working_directory)
+
+    def close(self):
+        """Flush, fsync and rename the segment into place. Returns its index entry."""
+        self.stream.close()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        self.raw.close()
+        os.replace(self.tmp_path, self.path)
+        entry = dict(self.entry)
+        for key in ('sessions', 'workspaces', 'working_directories', 'event_types'):
+            entry[key] = sorted(entry[key])
+        return entry
+
+
+def _delete_archived(conn, cutoff, max_id):
+    """Remove rows covered by an archive run (idempotent)."""
+    with conn:
+        conn.execute('DELETE FROM events WHERE timestamp < ? AND id <= ?', (cutoff, max_id))
+
+
+def _finish_pending_runs(conn, db_name, manifest):
+    """Complete deletes from runs that were archived but interrupted before deleting."""
+    finished = False
+    for run in manifest['runs']:
+        if run['db'] == db_name and not run['deleted']:
+            _delete_archived(conn, run['cutoff'], run['max_id'])
+            run['deleted'] = True
+            finished = True
+    return finished
+
+
+def archive_events(db_path, archive_dir=DEFAULT_ARCHIVE_DIR, older_than_days=30,
+                   max_segment_events=100000, now_ms=None):
+    """Move events older than older_than_days from db_path into archive segments.
+
+    Segments are partitioned by UTC day and written before the manifest is
+    updated; rows are deleted from the live table only after the manifest
+    records the run, so an interrupted archive never loses events.
+    Returns the list of new segment index entries.
+    """
+    db_path = Path(db_path)
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = archive_dir / MANIFEST_NAME
+    db_name = db_path.stem
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    cutoff = now_ms - int(older_than_days * DAY_MS)
+
+    conn = open_db(db_path)
+    try:
+        with file_lock(manifest_path):
+            manifest = load_manifest(archive_dir)
+            if _finish_pending_runs(conn, db_name, manifest):
+                atomic_write_json(manifest_path, manifest)
+
+            max_id = conn.execute(
+                'SELECT MAX(id) FROM events WHERE timestamp < ?', (cutoff,)
+            ).fetchone()[0]
+            if max_id is None:
+                return []
+
+            rows = conn.execute('''
+                SELECT id, session_id, event_type, timestamp, data, created_at
+                FROM events
+                WHERE timestamp < ? AND id <= ?
+                ORDER BY timestamp ASC, id ASC
+            ''', (cutoff, max_id))
+
+            new_segments = []
+            writer = None
+            for row in rows:
+                event = row_to_event(row)
+                partition = partition_key(event['timestamp'])
+                if writer and (writer.entry['partition'] != partition or
+                               writer.entry['count'] >= max_segment_events):
+                    new_segments.append(writer.close())
+                    writer = None
+                if writer is None:
+                    writer = SegmentWriter(archive_dir, db_name, partition, event['id'])
+                writer.write(event)
+            if writer:
+                new_segments.append(writer.close())
+
+            run = {'db': db_name, 'cutoff': cutoff, 'max_id': max_id,
+                   'archived_at': now_ms, 'deleted': False}
+            manifest['segments'].extend(new_segments)
+            manifest['runs'].append(run)
+            atomic_write_json(manifest_path, manifest)
+
+            _delete_archived(conn, cutoff, max_id)
+            run['deleted'] = True
+            atomic_write_json(manifest_path, manifest)
+            return new_segments
+    finally:
+        conn.close()
+
+
+@functools.lru_cache(maxsize=64)
+def _directory_pattern(workspace):
+    """Regex equivalent of SQLite's `working_directory LIKE '%/<workspace>'`.
+
+    LIKE is case-insensitive for ASCII letters only, '_' matches any one
+    character and '%' any run of characters.
+    """
+    body = ''.join('.' if c == '_' else '.*' if c == '%' else re.escape(c) for c in workspace)
+    return re.compile(f'/{body}\\Z', re.IGNORECASE | re.ASCII | re.DOTALL)
+
+
+def workspace_matches(data, workspace):
+    """The server's workspace filter (utils/event-store.js): the event names the
+    workspace, or its working directory ends in /<workspace>."""
+    if data.get('workspace') == workspace:
+        return True
+    working_directory = data.get('working_directory')
+    return isinstance(working_directory, str) and _directory_pattern(workspace).search(working_directory) is not None
+
+
+def _segment_matches(segment, since, until, session_id, workspace, event_type):
+    """Decide from the segment index alone whether a segment can hold matches."""
+    if since is not None and segment['max_ts'] < since:
+        return False
+    if until is not None and segment['min_ts'] >= until:
+        return False
+    if session_id is not None and session_id not in segment['sessions']:
+        return False
+    # Segments written before working directories were indexed can't be ruled out
+    if workspace is not None and 'working_directories' in segment and not (
+        workspace in segment['workspaces'] or any(
+            workspace_matches({'working_directory': d}, workspace) for d in segment['working_directories']
+        )
+    ):
+        return False
+    if event_type is not None and event_type not in segment['event_types']:
+        return False
+    return True
+
+
+def _event_matches(event, since, until, session_id, workspace, event_type):
+    if since is not None and event['timestamp'] < since:
+        return False
+    if until is not None and event['timestamp'] >= until:
+        return False
+    if session_id is not None and event['session_id'] != session_id:
+        return False
+    if event_type is not None and event['event_type'] != event_type:
+        return False
+    if workspace is not None and not workspace_matches(event['data'], workspace):
+        return False
+    return True
+
+
+def _read_segment(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _event_order(event):
+    return (event['timestamp'], event['id'])
+
+
+def iter_archived_events(archive_dir=DEFAULT_ARCHIVE_DIR, since=None, until=None,
+                         session_id=None, workspace=None, event_type=None):
+    """Stream archived events in timestamp order.
+
+    Only segments whose index overlaps the filters are opened. Partitions are
+    disjoint days, so segments are merged within a partition and partitions
+    are chained, keeping at most one partition's segments open at a time.
+    """
+    archive_dir = Path(archive_dir)
+    manifest = load_manifest(archive_dir)
+    filters = (since, until, session_id, workspace, event_type)
+    segments = [s for s in manifest['segments'] if _segment_matches(s, *filters)]
+    segments.sort(key=lambda s: (s['partition'], s['min_ts']))
+
+    for _, group in itertools.groupby(segments, key=lambda s: s['partition']):
+        streams = [_read_segment(archive_dir / s['path']) for s in group]
+        for event in heapq.merge(*streams, key=_event_order):
+            if _event_matches(event, *filters):
+                yield event
+
+
+def iter_live_events(db_paths, since=None, until=None, session_id=None,
+                     workspace=None, event_type=None, pending_runs=None):
+    """Stream events from live databases (or shards) in timestamp order.
+
+    pending_runs maps a database name to archive runs recorded in the
+    manifest whose rows were not deleted yet; those rows are skipped because
+    the archive already serves them.
+    """
+    clauses, params = [], []
+    if since is not None:
+        clauses.append('timestamp >= ?')
+        params.append(since)
+    if until is not None:
+        clauses.append('timestamp < ?')
+        params.append(until)
+    if session_id is not None:
+        clauses.append('session_id = ?')
+        params.append(session_id)
+    if event_type is not None:
+        clauses.append('event_type = ?')
+        params.append(event_type)
+    if workspace is not None:
+        # Same rule as the server's queries
+        clauses.append(
+            "(JSON_EXTRACT(data, '$.workspace') = ? OR JSON_EXTRACT(data, '$.working_directory') LIKE ?)"
+        )
+        params.extend([workspace, f'%/{workspace}'])
+
+    def stream(db_path):
+        db_clauses, db_params = list(clauses), list(params)
+        for run in (pending_runs or {}).get(Path(db_path).stem, []):
+            db_clauses.append('NOT (timestamp < ? AND id <= ?)')
+            db_params.extend([run['cutoff'], run['max_id']])
+        where = f"WHERE {' AND '.join(db_clauses)}" if db_clauses else ''
+        query = f'''
+            SELECT id, session_id, event_type, timestamp, data, created_at
+            FROM events {where}
+            ORDER BY timestamp ASC, id ASC
+        '''
+        conn = open_db(db_path, readonly=True)
+        try:
+            for row in conn.execute(query, db_params):
+                yield row_to_event(row)
+        finally:
+            conn.close()
+
+    yield from heapq.merge(*(stream(p) for p in db_paths if Path(p).exists()), key=_event_order)
+
+
+def iter_events(archive_dir=DEFAULT_ARCHIVE_DIR, db_paths=None, include_live=True, **filters):
+    """Stream archived and live events as one timestamp-ordered generator.
+
+    filters: since, until (ms timestamps), session_id, workspace, event_type.
+    """
+    sources = []
+    pending_runs = {}
+    if archive_dir and Path(archive_dir).exists():
+        sources.append(iter_archived_events(archive_dir, **filters))
+        # An interrupted archive run leaves its rows both archived and live
+        for run in load_manifest(archive_dir)['runs']:
+            if not run['deleted']:
+                pending_runs.setdefault(run['db'], []).append(run)
+    if include_live:
+        if db_paths is None:
+            db_paths = default_db_paths()
+        sources.append(iter_live_events(db_paths, pending_runs=pending_runs, **filters))
+    return heapq.merge(*sources, key=_event_order)
+
+
+def parse_time(value):
+    """Parse an ISO date/datetime or millisecond timestamp into milliseconds."""
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Archive old events into compressed segments and stream them back'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        default=str(DEFAULT_ARCHIVE_DIR),
+        help=f'Archive directory (default: {DEFAULT_ARCHIVE_DIR})'
+    )
+    parser.add_argument(
+        '--db', action='append', dest='db_paths',
+        help='Live events database; repeat for shards (default: db/events.db and db/shards/*.db)'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    archive_parser = subparsers.add_parser('archive', help='Move old events into the archive')
+    archive_parser.add_argument(
+        '--older-than-days', type=float, default=30,
+        help='Archive events older than this many days (default: 30)'
+    )
+    archive_parser.add_argument(
+        '--max-segment-events', type=int, default=100000,
+        help='Roll over to a new segment after this many events (default: 100000)'
+    )
+
+    read_parser = subparsers.add_parser('read', help='Stream events as NDJSON to stdout')
+    read_parser.add_argument('--since', help='Start time (ISO date or ms timestamp)')
+    read_parser.add_argument('--until', help='End time, exclusive (ISO date or ms timestamp)')
+    read_parser.add_argument('--session', help='Only this session_id')
+    read_parser.add_argument('--workspace', help='Only this workspace')
+    read_parser.add_argument('--event-type', help='Only this event type')
+    read_parser.add_argument('--archive-only', action='store_true', help='Skip the live database')
+
+    args = parser.parse_args()
+    db_paths = [Path(p) for p in args.db_paths] if args.db_paths else default_db_paths()
+
+    try:
+        if args.command == 'archive':
+            total = 0
+            for db_path in db_paths:
+                segments = archive_events(
+                    db_path, args.archive_dir, args.older_than_days, args.max_segment_events
+                )
+                archived = sum(s['count'] for s in segments)
+                total += archived
+                print(f"  ✓ {db_path}: archived {archived} events into {len(segments)} segments")
+            print(f"\n✅ Archived {total} events to {args.archive_dir}")
+            return 0
+
+        events = iter_events(
+            args.archive_dir,
+            db_paths=db_paths,
+            include_live=not args.archive_only,
+            since=parse_time(args.since),
+            until=parse_time(args.until),
+            session_id=args.session,
+            workspace=args.workspace,
+            event_type=args.event_type,
+        )
+        out = sys.stdout
+        for event in events:
+            out.write(json.dumps(event, separators=(',', ':')) + '\n')
+        return 0
+
+    except BrokenPipeError:
+        return 0
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Resumable client for the server's streaming event export.
+Reads GET /events/export as NDJSON and, when the connection drops, reconnects
+from the cursor of the last event received. Writing to a file also records
+that cursor next to it, so an interrupted export picks up where it stopped.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+TEMPLATES_DIR = SCRIPT_DIR / 'templates'
+DEFAULT_SERVER = 'http://localhost:3001'
+
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(TEMPLATES_DIR))
+from workspace_store import atomic_write_json, read_json
+
+import event_archive
+
+# Errors after which the export is retried from the last cursor
+RETRYABLE_ERRORS = (
+    urllib.error.URLError, http.client.HTTPException, ConnectionError, socket.timeout, ValueError
+)
+# Persist the resume state every this many events
+STATE_EVERY = 1000
+
+
+class ExportInterrupted(Exception):
+    """The stream ended without the server's end-of-export line."""
+
+
+def export_url(server, cursor=None, **filters):
+    """URL for one export request; filters with value None are left out."""
+    params = {key: value for key, value in filters.items() if value is not None}
+    if cursor:
+        params['cursor'] = cursor
+    query = urllib.parse.urlencode(params)
+    return f"{server.rstrip('/')}/events/export" + (f'?{query}' if query else '')
+
+
+def _stream(url, timeout):
+    """Yield (event, cursor) pairs from one response, then the end line."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        for line in response:
+            if not line.strip():
+                continue
+            if not line.endswith(b'\n'):
+                raise ExportInterrupted('truncated line')
+            record = json.loads(line)
+            if record.get('end'):
+                yield None, record
+                return
+            cursor = record.pop('cursor')
+            yield record, cursor
+    raise ExportInterrupted('stream ended without end line')
+
+
+def iter_export(server=DEFAULT_SERVER, cursor=None, retries=5, backoff=1.0, timeout=30,
+                session_id=None, workspace=None, event_type=None, since=None, until=None):
+    """Stream exported events as (event, cursor) pairs, resuming after disconnects.
+
+    Each retry starts after the last cursor received, so no event is yielded
+    twice. The retry budget resets whenever the stream makes progress.
+    """
+    filters = {
+        'session_id': session_id,
+        'workspace': workspace,
+        'event_type': event_type,
+        # Ignored by the server once a cursor is given
+        'since': since,
+        'until': until,
+    }
+    attempt = 0
+    while True:
+        try:
+            for event, position in _stream(export_url(server, cursor, **filters), timeout):
+                if event is None:
+                    if not position.get('more'):
+                        return
+                    break
+                cursor = position
+                attempt = 0
+                yield event, cursor
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                raise
+            error = e
+        except (ExportInterrupted,) + RETRYABLE_ERRORS as e:
+            error = e
+        else:
+            continue
+
+        attempt += 1
+        if attempt > retries:
+            raise ExportInterrupted(f'giving up after {retries} retries: {error}')
+        delay = backoff * (2 ** (attempt - 1))
+        print(f"⚠️  Export interrupted ({error}); resuming in {delay:.0f}s", file=sys.stderr)
+        time.sleep(delay)
+
+
+def state_path(output_path):
+    """Resume state file kept next to an export file."""
+    output_path = Path(output_path)
+    return output_path.with_name(f'.{output_path.name}.cursor')
+
+
+def export_to_file(output_path, resume=True, start_cursor=None, **options):
+    """Export events into an NDJSON file, resuming a previous partial export.
+
+    The state file records the cursor together with the file length it
+    corresponds to, so lines written after the last saved cursor are cut off
+    and fetched again instead of being duplicated. A new export starts after
+    start_cursor; a partial one only resumes from the same start.
+    """
+    output_path = Path(output_path)
+    state_file = state_path(output_path)
+    state = read_json(state_file) if resume else None
+    if state and output_path.exists():
+        if start_cursor is not None and state.get('start') != start_cursor:
+            raise ValueError(
+                f"{output_path} holds a partial export that started at "
+                f"{state.get('start') or 'the beginning'}; use --restart to start after {start_cursor}"
+            )
+        cursor, offset, count = state['cursor'], state['offset'], state['count']
+    else:
+        cursor, offset, count = start_cursor, 0, 0
+
+    with open(output_path, 'ab') as out:
+        out.truncate(offset)
+        out.seek(offset)
+
+        def save():
+            out.flush()
+            os.fsync(out.fileno())
+            atomic_write_json(state_file, {
+                'start': start_cursor, 'cursor': cursor, 'offset': out.tell(), 'count': count
+            })
+
+        for event, cursor in iter_export(cursor=cursor, **options):
+            out.write(json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n')
+            count += 1
+            if count % STATE_EVERY == 0:
+                save()
+        save()
+
+    state_file.unlink()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export events from the server as NDJSON, resuming after disconnects'
+    )
+    parser.add_argument(
+        '--server', default=DEFAULT_SERVER,
+        help=f'Server URL (default: {DEFAULT_SERVER})'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help='NDJSON file to write; an interrupted export to it resumes (default: stdout)'
+    )
+    parser.add_argument('--restart', action='store_true', help='Ignore saved progress for --output')
+    parser.add_argument('--cursor', help='Start after this cursor')
+    parser.add_argument('--since', help='Start time (ISO date or ms timestamp)')
+    parser.add_argument('--until', help='End time, exclusive (ISO date or ms timestamp)')
+    parser.add_argument('--session', help='Only this session_id')
+    parser.add_argument('--workspace', help='Only this workspace')
+    parser.add_argument('--event-type', help='Only this event type')
+    parser.add_argument(
+        '--retries', type=int, default=5,
+        help='Reconnect attempts without progress before giving up (default: 5)'
+    )
+
+    args = parser.parse_args()
+    options = {
+        'server': args.server,
+        'retries': args.retries,
+        'session_id': args.session,
+        'workspace': args.workspace,
+        'event_type': args.event_type,
+        'since': event_archive.parse_time(args.since),
+        'until': event_archive.parse_time(args.until),
+    }
+
+    try:
+        if args.output:
+            count = export_to_file(
+                args.output, resume=not args.restart, start_cursor=args.cursor, **options
+            )
+            print(f"✅ Exported {count} events to {args.output}", file=sys.stderr)
+            return 0
+
+        out = sys.stdout
+        for event, _ in iter_export(cursor=args.cursor, **options):
+            out.write(json.dumps(event, separators=(',', ':')) + '\n')
+        return 0
+
+    except BrokenPipeError:
+        return 0
+    except KeyboardInterrupt:
+        print("\n⚠️  Export interrupted; run the same command again to resume", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
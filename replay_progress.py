@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Offline replay of knowledge-graph edits for Graph My Mind.
+Streams a workspace's events in timestamp order, re-applies the Write/Edit
+tool calls that touched the knowledge graphs and emits learning-progress
+time series (concepts mastered, gap count, frontier size).
+"""
+
+import argparse
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import event_archive
+
+SCRIPT_DIR = Path(__file__).parent
+TEMPLATES_DIR = SCRIPT_DIR / 'templates'
+
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(TEMPLATES_DIR))
+from graph_merge import EDIT_TOOLS
+from mermaid_graph import learning_frontier, parse_mermaid
+
+GRAPH_FILES = {
+    'claude_knowledge_graph.mmd': 'claude',
+    'user_knowledge_graph.mmd': 'user',
+}
+
+# Graph files as created before any recorded Write: by setup_workspace.py
+# (with and without a topic) and by the SessionStart init in capture_events.py.
+# Edits made before the first Write are matched against these.
+INITIAL_GRAPHS = {
+    'claude': (
+        'graph TD\n'
+        '    %% Knowledge structure will be built during research\n'
+        '    %% Focus: Domain concepts and relationships, not workflow\n',
+        'graph TD\n'
+        '    %% Will be populated with actual domain knowledge\n'
+        '    %% Focus: What to learn, not how to learn it\n',
+        'graph TD\n    Start["Ready to learn about your topic"]\n',
+    ),
+    'user': (
+        'graph TD\n'
+        "    %% Tracks user's actual knowledge and understanding\n"
+        '    %% Not learning intentions or workflow states\n',
+        'graph TD\n    User["User starting learning journey"]\n',
+    ),
+}
+
+# Marker capture_policy.py appends to strings it cut short
+TRUNCATED_RE = re.compile(r'\.\.\.\[truncated \d+ chars\]$')
+
+
+def graph_for_path(file_path):
+    """Return 'claude' or 'user' if file_path is one of the knowledge graphs."""
+    if not isinstance(file_path, str):
+        return None
+    return GRAPH_FILES.get(Path(file_path).name)
+
+
+def graph_metrics(claude_graph, user_graph):
+    """Compute progress metrics for one pair of graphs.
+
+    The frontier is the set of gaps whose prerequisites (parents in Claude's
+    graph) the user already knows, i.e. what can be learned next.
+    """
+    user_labels = set(user_graph.labels())
+    claude_labels = set(claude_graph.labels())
+    gaps = claude_labels - user_labels
+    frontier = len(learning_frontier(claude_graph, user_labels))
+
+    return {
+        'claude_concepts': len(claude_labels),
+        'concepts_mastered': len(user_labels & claude_labels),
+        'user_concepts': len(user_labels),
+        'gap_count': len(gaps),
+        'frontier_size': frontier,
+    }
+
+
+def apply_checked(text, tool_name, tool_input):
+    """Graph text after a Write/Edit/MultiEdit call, or None if an edit does not apply.
+
+    Like the tools themselves, an Edit whose old_string is not in the file
+    fails; an empty old_string only creates a file that is still empty.
+    """
+    if tool_name == 'Write':
+        content = tool_input.get('content')
+        return content if isinstance(content, str) else None
+    edits = tool_input.get('edits', []) if tool_name == 'MultiEdit' else [tool_input]
+    for edit in edits:
+        old_string = edit.get('old_string') or ''
+        new_string = edit.get('new_string') or ''
+        if not old_string:
+            if text:
+                return None
+            text = new_string
+        elif old_string not in text:
+            return None
+        elif edit.get('replace_all', False):
+            text = text.replace(old_string, new_string)
+        else:
+            text = text.replace(old_string, new_string, 1)
+    return text
+
+
+def original_text(data):
+    """File content before an Edit, from the tool_response the hook recorded
+    (older events only have it inside stdin_data)."""
+    stdin_data = data.get('stdin_data')
+    responses = [data.get('tool_response')]
+    if isinstance(stdin_data, dict):
+        responses.append(stdin_data.get('tool_response'))
+    for response in responses:
+        if isinstance(response, dict):
+            original = response.get('originalFile')
+            if isinstance(original, str) and not TRUNCATED_RE.search(original):
+                return original
+    return None
+
+
+def replay(events, stats=None):
+    """Fold graph edits from an event stream into progress points.
+
+    Only the current text of the two graph files is kept, so memory is bounded
+    by graph size rather than history length. Yields one point per edit that
+    changed a graph. An edit applies to the pre-edit file recorded with the
+    event if there is one, else to the replayed text; before a graph's first
+    Write that is one of the INITIAL_GRAPHS. Edits that still do not apply
+    are skipped and counted in stats['unapplied'].
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('applied', 0)
+    stats.setdefault('unapplied', 0)
+    texts = {'claude': None, 'user': None}
+    graphs = {'claude': parse_mermaid(''), 'user': parse_mermaid('')}
+
+    for event in events:
+        if event.get('event_type') != 'PostToolUse':
+            continue
+        data = event.get('data') or {}
+        tool_name = data.get('tool_name')
+        if tool_name not in EDIT_TOOLS:
+            continue
+        tool_input = data.get('tool_input') or {}
+        which = graph_for_path(tool_input.get('file_path'))
+        if which is None:
+            continue
+
+        original = original_text(data) if tool_name != 'Write' else None
+        if original is not None:
+            candidates = [original]
+        elif texts[which] is not None:
+            candidates = [texts[which]]
+        else:
+            candidates = INITIAL_GRAPHS[which] + ('',)
+        for text in candidates:
+            new_text = apply_checked(text, tool_name, tool_input)
+            if new_text is not None:
+                break
+        if new_text is None:
+            stats['unapplied'] += 1
+            continue
+        stats['applied'] += 1
+
+        if new_text == texts[which]:
+            continue
+        texts[which] = new_text
+        graphs[which] = parse_mermaid(new_text)
+
+        point = {
+            'timestamp': event.get('timestamp'),
+            'session_id': event.get('session_id'),
+            'graph': which,
+            'tool': tool_name,
+        }
+        point.update(graph_metrics(graphs['claude'], graphs['user']))
+        yield point
+
+
+def iter_export(path, workspace=None):
+    """Stream events from an NDJSON export (e.g. `event_archive.py read`)."""
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if workspace and (event.get('data') or {}).get('workspace') != workspace:
+                continue
+            yield event
+
+
+def workspace_events(workspace, source=None, archive_dir=None, db_paths=None):
+    """Stream one workspace's events from an export file or the archive + live DB."""
+    if source:
+        return iter_export(source, workspace)
+    return event_archive.iter_events(
+        archive_dir or event_archive.DEFAULT_ARCHIVE_DIR,
+        db_paths=db_paths,
+        workspace=workspace,
+        event_type='PostToolUse',
+    )
+
+
+def replay_workspace_to_file(workspace, output_path, source=None, archive_dir=None, db_paths=None):
+    """Replay one workspace into an NDJSON file. Returns (workspace, points, last point, stats)."""
+    points = 0
+    last = None
+    stats = {}
+    with open(output_path, 'w') as out:
+        for point in replay(workspace_events(workspace, source, archive_dir, db_paths), stats):
+            out.write(json.dumps(point) + '\n')
+            points += 1
+            last = point
+    return workspace, points, last, stats
+
+
+def _unapplied_note(stats):
+    if not stats.get('unapplied'):
+        return ''
+    return f", {stats['unapplied']} of {stats['unapplied'] + stats['applied']} graph edits did not apply"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay knowledge-graph edits from event history into progress time series'
+    )
+    parser.add_argument(
+        '-w', '--workspace', action='append', required=True,
+        help='Workspace to replay; repeat to replay several in parallel'
+    )
+    parser.add_argument(
+        '-i', '--input',
+        help='NDJSON event export to read instead of the archive and live database'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        help=f'Archive directory (default: {event_archive.DEFAULT_ARCHIVE_DIR})'
+    )
+    parser.add_argument(
+        '--db', action='append', dest='db_paths',
+        help='Live events database; repeat for shards (default: db/events.db and db/shards/*.db)'
+    )
+    parser.add_argument(
+        '-o', '--output-dir',
+        help='Write <workspace>.ndjson files here (required for more than one workspace)'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='Worker processes for multi-workspace replay (default: CPU count)'
+    )
+
+    args = parser.parse_args()
+    db_paths = [Path(p) for p in args.db_paths] if args.db_paths else None
+
+    try:
+        if len(args.workspace) == 1 and not args.output_dir:
+            events = workspace_events(args.workspace[0], args.input, args.archive_dir, db_paths)
+            stats = {}
+            for point in replay(events, stats):
+                sys.stdout.write(json.dumps(point) + '\n')
+            if stats['unapplied']:
+                print(f"⚠️  {args.workspace[0]}{_unapplied_note(stats)}", file=sys.stderr)
+            return 0
+
+        if not args.output_dir:
+            print("Error: --output-dir is required when replaying several workspaces", file=sys.stderr)
+            return 1
+
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [
+                pool.submit(
+                    replay_workspace_to_file, workspace, output_dir / f'{workspace}.ndjson',
+                    args.input, args.archive_dir, db_paths
+                )
+                for workspace in args.workspace
+            ]
+            for future in as_completed(futures):
+                workspace, points, last, stats = future.result()
+                summary = ''
+                if last:
+                    summary = (f" (mastered {last['concepts_mastered']}/{last['claude_concepts']}, "
+                               f"gaps {last['gap_count']}, frontier {last['frontier_size']})")
+                print(f"  ✓ {workspace}: {points} points{summary}{_unapplied_note(stats)}")
+        return 0
+
+    except BrokenPipeError:
+        return 0
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Parallel multi-agent research for Graph My Mind.
+Runs the four researcher roles from templates/ as concurrent Claude CLI
+subprocesses, each writing its own kb/ file, then runs the research lead's
+synthesis (kb/synthesis.md and claude_knowledge_graph.mmd) and the gap
+analysis once they finish. Completed stages are cached in kb/logs/ so a re-run
+only repeats what failed or changed.
+"""
+
+import argparse
+import hashlib
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+TEMPLATES_DIR = SCRIPT_DIR / 'templates'
+
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(TEMPLATES_DIR))
+from workspace_store import atomic_write_json, file_lock, read_json
+
+# role -> (prompt template, output file relative to the workspace)
+RESEARCH_ROLES = {
+    'fundamentals': ('fundamentals_researcher.md', 'kb/fundamentals.md'),
+    'advanced': ('advanced_researcher.md', 'kb/advanced.md'),
+    'applications': ('applications_researcher.md', 'kb/applications.md'),
+    'prerequisites': ('prerequisites_researcher.md', 'kb/prerequisites.md'),
+}
+SYNTHESIS_OUTPUTS = ('kb/synthesis.md', 'claude_knowledge_graph.mmd')
+GAP_ANALYSIS_OUTPUT = 'kb/gap_analysis.md'
+
+LOG_DIR = Path('kb') / 'logs'
+CACHE_FILE = LOG_DIR / 'research_cache.json'
+
+DEFAULT_CLAUDE_CMD = 'claude --dangerously-skip-permissions'
+DEFAULT_TIMEOUT = 900
+DEFAULT_RETRIES = 1
+
+
+def load_prompt_template(template_name, topic):
+    """Load a prompt template from templates/ with $ARGUMENTS filled in."""
+    return (TEMPLATES_DIR / template_name).read_text().replace('$ARGUMENTS', topic)
+
+
+def role_prompt(role, topic):
+    """Prompt for one researcher role, redirected to its kb/ output file."""
+    template, output = RESEARCH_ROLES[role]
+    return (
+        load_prompt_template(template, topic)
+        + f"\n\n## Output Location\n\n"
+        f"Write your complete research to `./{output}` in the current directory, "
+        f"instead of any other path mentioned above. Other researchers are working "
+        f"on the other areas in parallel; do not create or edit any other file.\n"
+    )
+
+
+def synthesis_prompt(topic):
+    """Prompt for the research lead once all researcher files exist."""
+    research_files = '\n'.join(f'- `./{output}`' for _, output in RESEARCH_ROLES.values())
+    return (
+        f"The specialist research on \"{topic}\" is already complete and written to:\n\n"
+        f"{research_files}\n\n"
+        f"Do NOT spawn research agents. Read these files, write an integrated overview "
+        f"to `./kb/synthesis.md`, and build `./claude_knowledge_graph.mmd` as the "
+        f"Research Lead described below (skip its Agent Coordination step).\n\n"
+        + load_prompt_template('research_lead.md', topic)
+    )
+
+
+def gap_analysis_prompt(topic):
+    """Prompt for the gap analysis, written to kb/gap_analysis.md."""
+    return (
+        load_prompt_template('gap_analysis.md', topic)
+        + f"\n\n## Output Location\n\nWrite your analysis to `./{GAP_ANALYSIS_OUTPUT}`.\n"
+    )
+
+
+def file_digest(path):
+    """sha256 of a file's content, or None if it is missing or empty."""
+    try:
+        data = Path(path).read_bytes()
+    except IOError:
+        return None
+    return hashlib.sha256(data).hexdigest() if data.strip() else None
+
+
+def output_stamp(path):
+    """(mtime, size) of an output file, or None if missing; changes on every write."""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def stage_key(prompt, inputs=()):
+    """Cache key for a stage: its prompt plus the content of the files it reads."""
+    digest = hashlib.sha256(prompt.encode('utf-8'))
+    for path in inputs:
+        digest.update((file_digest(path) or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResearchCache:
+    """Completed stages, keyed by prompt/input hash and checked against output hashes."""
+
+    def __init__(self, workspace_path):
+        self.workspace_path = Path(workspace_path)
+        self.path = self.workspace_path / CACHE_FILE
+
+    def is_fresh(self, stage, key, outputs):
+        entry = read_json(self.path).get(stage)
+        if not entry or entry.get('key') != key:
+            return False
+        recorded = entry.get('outputs', {})
+        return all(
+            recorded.get(output) is not None
+            and recorded.get(output) == file_digest(self.workspace_path / output)
+            for output in outputs
+        )
+
+    def record(self, stage, key, outputs, duration):
+        entry = {
+            'key': key,
+            'outputs': {output: file_digest(self.workspace_path / output) for output in outputs},
+            'duration_seconds': round(duration, 1),
+            'completed_at': datetime.now().isoformat(),
+        }
+        # Roles finish concurrently, so read-modify-write under the lock
+        with file_lock(self.path):
+            cache = read_json(self.path)
+            cache[stage] = entry
+            atomic_write_json(self.path, cache)
+
+
+def run_cli(claude_cmd, prompt, workspace_path, log_path, timeout, extra_env=None):
+    """Run one Claude CLI call in its own process group.
+
+    Returns (ok, message). On timeout the whole process group is killed so
+    tool subprocesses do not outlive the stage.
+    """
+    env = dict(os.environ, **(extra_env or {}))
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, 'a') as log:
+        log.write(f"\n=== {datetime.now().isoformat()} {' '.join(claude_cmd)} -p ...\n")
+        log.flush()
+        process = subprocess.Popen(
+            claude_cmd + ['-p', prompt],
+            cwd=workspace_path,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env=env,
+            start_new_session=True,
+        )
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.wait()
+            return False, f"timed out after {timeout}s"
+    if returncode != 0:
+        return False, f"exited with status {returncode}"
+    return True, ''
+
+
+def run_stage(stage, prompt, outputs, workspace_path, claude_cmd, cache,
+              inputs=(), timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, force=False):
+    """Run one stage with retries, skipping it if the cache says it is done.
+
+    Returns a result dict: stage, status ('cached', 'completed' or 'failed'),
+    attempts, duration and error.
+    """
+    workspace_path = Path(workspace_path)
+    key = stage_key(prompt, [workspace_path / path for path in inputs])
+    if not force and cache.is_fresh(stage, key, outputs):
+        return {'stage': stage, 'status': 'cached', 'attempts': 0, 'duration': 0.0, 'error': ''}
+
+    start = time.monotonic()
+    error = ''
+    for attempt in range(1, retries + 2):
+        # Outputs may already exist (setup's placeholder graph, files from an
+        # earlier failed attempt), so each one must be written during this run
+        before = {output: output_stamp(workspace_path / output) for output in outputs}
+        ok, error = run_cli(
+            claude_cmd, prompt, workspace_path, workspace_path / LOG_DIR / f'{stage}.log', timeout,
+            extra_env={'RESEARCH_STAGE': stage, 'RESEARCH_OUTPUTS': os.pathsep.join(outputs)}
+        )
+        if ok:
+            missing = [
+                output for output in outputs
+                if not file_digest(workspace_path / output)
+                or output_stamp(workspace_path / output) == before[output]
+            ]
+            if not missing:
+                duration = time.monotonic() - start
+                cache.record(stage, key, outputs, duration)
+                return {'stage': stage, 'status': 'completed', 'attempts': attempt,
+                        'duration': duration, 'error': ''}
+            error = f"did not write {', '.join(missing)}"
+        if attempt <= retries:
+            time.sleep(min(2 ** (attempt - 1), 30))
+
+    return {'stage': stage, 'status': 'failed', 'attempts': retries + 1,
+            'duration': time.monotonic() - start, 'error': error}
+
+
+def print_result(result):
+    if result['status'] == 'cached':
+        print(f"  ↺ {result['stage']}: cached")
+    elif result['status'] == 'completed':
+        retried = f", {result['attempts']} attempts" if result['attempts'] > 1 else ''
+        print(f"  ✓ {result['stage']}: {result['duration']:.1f}s{retried}")
+    else:
+        print(f"  ✗ {result['stage']}: {result['error']}")
+
+
+def run_research(workspace_path, topic, claude_cmd=None, roles=None, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, force=False, gap_analysis=True):
+    """Run the researcher roles in parallel, then synthesis and gap analysis.
+
+    Returns the list of stage results; synthesis runs as long as at least
+    one role produced its file.
+    """
+    workspace_path = Path(workspace_path)
+    (workspace_path / 'kb').mkdir(exist_ok=True)
+    claude_cmd = claude_cmd or shlex.split(os.environ.get('RESEARCH_CLAUDE_CMD', DEFAULT_CLAUDE_CMD))
+    roles = roles or list(RESEARCH_ROLES)
+    cache = ResearchCache(workspace_path)
+    results = []
+
+    print(f"🔬 Researching '{topic}' with {len(roles)} parallel researchers")
+    with ThreadPoolExecutor(max_workers=len(roles)) as pool:
+        futures = [
+            pool.submit(
+                run_stage, role, role_prompt(role, topic), [RESEARCH_ROLES[role][1]],
+                workspace_path, claude_cmd, cache, timeout=timeout, retries=retries, force=force
+            )
+            for role in roles
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            print_result(result)
+            results.append(result)
+
+    research_files = [RESEARCH_ROLES[role][1] for role in RESEARCH_ROLES]
+    if not any(file_digest(workspace_path / path) for path in research_files):
+        print("  ✗ No research was produced; skipping synthesis")
+        return results
+
+    print("🧩 Synthesizing knowledge graph")
+    synthesis = run_stage(
+        'synthesis', synthesis_prompt(topic), list(SYNTHESIS_OUTPUTS), workspace_path, claude_cmd,
+        cache, inputs=research_files, timeout=timeout, retries=retries, force=force
+    )
+    print_result(synthesis)
+    results.append(synthesis)
+
+    if gap_analysis and synthesis['status'] != 'failed':
+        print("🎯 Analyzing knowledge gaps")
+        gaps = run_stage(
+            'gap_analysis', gap_analysis_prompt(topic), [GAP_ANALYSIS_OUTPUT], workspace_path,
+            claude_cmd, cache, inputs=['claude_knowledge_graph.mmd', 'user_knowledge_graph.mmd'],
+            timeout=timeout, retries=retries, force=force
+        )
+        print_result(gaps)
+        results.append(gaps)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the researcher roles in parallel, then synthesize the knowledge graph'
+    )
+    parser.add_argument('topic', help='Topic to research')
+    parser.add_argument(
+        '-w', '--workspace', default='.',
+        help='Workspace directory (default: current directory)'
+    )
+    parser.add_argument(
+        '--claude-cmd',
+        help=f'CLI to run for each stage, e.g. a stub for testing '
+             f'(default: $RESEARCH_CLAUDE_CMD or "{DEFAULT_CLAUDE_CMD}")'
+    )
+    parser.add_argument(
+        '--role', action='append', choices=list(RESEARCH_ROLES), dest='roles',
+        help='Researcher role to run; repeat for several (default: all)'
+    )
+    parser.add_argument(
+        '--timeout', type=int, default=DEFAULT_TIMEOUT,
+        help=f'Per-attempt timeout in seconds for each stage (default: {DEFAULT_TIMEOUT})'
+    )
+    parser.add_argument(
+        '--retries', type=int, default=DEFAULT_RETRIES,
+        help=f'Retries for a failed or timed-out stage (default: {DEFAULT_RETRIES})'
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help='Re-run stages even if cached results are still valid'
+    )
+    parser.add_argument(
+        '--no-gap-analysis', action='store_true',
+        help='Stop after the knowledge graph synthesis'
+    )
+
+    args = parser.parse_args()
+    workspace_path = Path(args.workspace)
+    if not workspace_path.is_dir():
+        print(f"Error: Workspace not found: {workspace_path}", file=sys.stderr)
+        return 1
+
+    try:
+        start = time.monotonic()
+        results = run_research(
+            workspace_path, args.topic,
+            claude_cmd=shlex.split(args.claude_cmd) if args.claude_cmd else None,
+            roles=args.roles, timeout=args.timeout, retries=args.retries,
+            force=args.force, gap_analysis=not args.no_gap_analysis
+        )
+        print(f"\n⏱️  Research finished in {time.monotonic() - start:.1f}s")
+        return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -2,42 +2,74 @@ const express = require('express');
 const cors = require('cors');
 const fs = require('fs');
 const path = require('path');
-const Database = require('better-sqlite3');
 const KnowledgeGraphToMermaid = require('./utils/kg-to-mermaid.js');
+const TurnAnalytics = require('./utils/turn-analytics.js');
+const ShardManager = require('./utils/shard-manager.js');
+const { initEventsSchema } = require('./utils/events-schema.js');
+const EventStore = require('./utils/event-store.js');
+const { applyTuning, MaintenanceScheduler } = require('./utils/sqlite-tuning.js');
+const { GraphIndexCache } = require('./utils/graph-index.js');
+const GraphHistory = require('./utils/graph-history.js');
+const Database = require('better-sqlite3');
 
 const app = express();
 const PORT = process.env.PORT || 3001;
 const ROOT = __dirname;
-const DB_PATH = path.join(ROOT, 'db', 'events.db');
+const DB_DIR = path.join(ROOT, 'db');
 
-// Initialize database
-const initDatabase = () => {
-  const dbDir = path.dirname(DB_PATH);
-  if (!fs.existsSync(dbDir)) {
-    fs.mkdirSync(dbDir, { recursive: true });
-  }
+// WAL journaling, cache and mmap sizes shared by every database the server opens
+const SQLITE_TUNING = {
+  ...(process.env.SQLITE_CACHE_MB && { cacheSizeKb: parseInt(process.env.SQLITE_CACHE_MB) * 1024 }),
+  ...(process.env.SQLITE_MMAP_MB && { mmapSizeBytes: parseInt(process.env.SQLITE_MMAP_MB) * 1024 * 1024 })
+};
 
-  const db = new Database(DB_PATH);
-  
-  db.exec(`
-    CREATE TABLE IF NOT EXISTS events (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      session_id TEXT,
-      event_type TEXT,
-      timestamp INTEGER,
-      data TEXT,
-      created_at INTEGER DEFAULT (strftime('%s', 'now'))
-    );
+// Per-shard state that outlives a handle. A shard evicted from the LRU pool
+// and reopened later only repeats the per-connection setup (pragmas and
+// prepared statements), not the schema, the backfill or its open turns.
+const shardAnalytics = new Map(); // shard name -> TurnAnalytics
 
-    CREATE INDEX IF NOT EXISTS idx_session_id ON events(session_id);
-    CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type);
-    CREATE INDEX IF NOT EXISTS idx_timestamp ON events(timestamp);
-  `);
+// Tune and set up a freshly opened database (or shard)
+const initDatabase = (db, name) => {
+  applyTuning(db, SQLITE_TUNING);
 
-  return db;
+  let turnAnalytics = shardAnalytics.get(name);
+  if (turnAnalytics) {
+    turnAnalytics.attach(db);
+  } else {
+    // First open in this process: create the schema and derive turns for
+    // events ingested before analytics existed (once per database)
+    initEventsSchema(db);
+    turnAnalytics = new TurnAnalytics(db);
+    const backfilledEvents = turnAnalytics.backfillIfEmpty();
+    if (backfilledEvents > 0) {
+      console.log(`Derived turn records from ${backfilledEvents} existing events`);
+    }
+    shardAnalytics.set(name, turnAnalytics);
+  }
+
+  return { events: new EventStore(db), turnAnalytics };
 };
 
-const db = initDatabase();
+// Events live in db/events.db by default; EVENTS_SHARD_MODE=workspace|hash
+// routes each workspace to its own SQLite file under db/shards/
+const shards = new ShardManager({
+  dbDir: DB_DIR,
+  mode: process.env.EVENTS_SHARD_MODE || 'single',
+  buckets: parseInt(process.env.EVENTS_SHARD_BUCKETS) || 16,
+  maxOpen: parseInt(process.env.EVENTS_SHARD_MAX_OPEN) || 32,
+  pinned: (process.env.EVENTS_SHARD_PINNED || '').split(',').map(name => name.trim()).filter(Boolean),
+  onOpen: initDatabase
+});
+
+// Open the default shard eagerly so schema errors surface at startup
+shards.forWorkspace(null);
+
+// Merge per-shard row lists ordered by a numeric field
+const mergeByField = (resultSets, field, descending, limit) => {
+  const merged = [].concat(...resultSets);
+  merged.sort((a, b) => descending ? b[field] - a[field] : a[field] - b[field]);
+  return limit ? merged.slice(0, limit) : merged;
+};
 
 // Input validation and sanitization utilities
 const validateSessionId = (sessionId) => {
@@ -169,20 +201,31 @@ app.post('/events', async (req, res) => {
       });
     }
 
-    // Store event with error handling
+    // Store event in the shard that owns its workspace
+    const shard = shards.forWorkspace(sanitizedData.workspace || null);
     await dbOperation(() => {
-      const stmt = db.prepare(`
-        INSERT INTO events (session_id, event_type, timestamp, data)
-        VALUES (?, ?, ?, ?)
-      `);
-      
-      return stmt.run(
+      return shard.context.events.insert(session_id, event_type, eventTimestamp, sanitizedData);
+    }, 'event insertion');
+
+    // Turn analytics are derived data; never fail ingestion because of them
+    try {
+      shard.context.turnAnalytics.recordEvent({
         session_id,
         event_type,
-        eventTimestamp,
-        JSON.stringify(sanitizedData)
-      );
-    }, 'event insertion');
+        timestamp: eventTimestamp,
+        data: sanitizedData
+      });
+    } catch (error) {
+      console.error('Turn analytics error:', error.message);
+    }
+
+    // Snapshot a knowledge graph shortly after a tool call wrote it
+    const graphFilePath = sanitizedData.tool_input && sanitizedData.tool_input.file_path;
+    if (event_type === 'PostToolUse' && GRAPH_WRITE_TOOLS.includes(sanitizedData.tool_name) &&
+        typeof graphFilePath === 'string') {
+      const graph = Object.keys(GRAPH_FILES).find(name => GRAPH_FILES[name] === path.basename(graphFilePath));
+      if (graph) scheduleGraphSnapshot(sanitizedData.workspace, graph);
+    }
 
     res.json({ 
       success: true, 
@@ -203,20 +246,175 @@ app.post('/events', async (req, res) => {
   }
 });
 
+// Rows per shard fetched per round trip of the export stream
+const EXPORT_PAGE_SIZE = parseInt(process.env.EXPORT_PAGE_SIZE) || 500;
+const EXPORT_CURSOR_RE = /^(\d+):(\d+):([a-zA-Z0-9\-_]+)$/;
+const EXPORT_INTEGER_RE = /^\d+$/;
+
+// Export cursors name the last row sent as timestamp:id:shard; ids are only
+// unique within a shard, so rows are ordered by (timestamp, shard, id)
+const parseExportCursor = (cursor) => {
+  const match = EXPORT_CURSOR_RE.exec(cursor);
+  return match && { timestamp: parseInt(match[1]), id: parseInt(match[2]), shard: match[3] };
+};
+
+// Keyset position (timestamp, id) within one shard for a global cursor
+const shardExportStart = (shardName, after) => {
+  if (shardName === after.shard) return [after.timestamp, after.id];
+  return [after.timestamp, shardName > after.shard ? -1 : Number.MAX_SAFE_INTEGER];
+};
+
+const compareExportRows = (a, b) => a.row.timestamp - b.row.timestamp ||
+  (a.shard < b.shard ? -1 : a.shard > b.shard ? 1 : 0) || a.row.id - b.row.id;
+
+// Resolve once the response can take more data (or the client went away)
+const waitForDrain = (res) => new Promise(resolve => {
+  const done = () => {
+    res.off('drain', done);
+    res.off('close', done);
+    resolve();
+  };
+  res.on('drain', done);
+  res.on('close', done);
+});
+
+// Stream events as NDJSON in (timestamp, id) order. Each line carries the
+// cursor to resume after it; a final {"end": true} line marks a complete export.
+app.get('/events/export', async (req, res) => {
+  const { session_id: sessionId, event_type: eventType, workspace, cursor } = req.query;
+  if (sessionId && !validateSessionId(sessionId)) {
+    return res.status(400).json({ error: 'Invalid session_id format' });
+  }
+  if (eventType && !validateEventType(eventType)) {
+    return res.status(400).json({ error: 'Invalid event_type' });
+  }
+  if (workspace && !validateWorkspace(workspace)) {
+    return res.status(400).json({ error: 'Invalid workspace format' });
+  }
+  // parseInt would accept '12abc' and turn 'abc' into NaN, which compares
+  // false against every row and ends the export early as if it were complete
+  for (const param of ['since', 'until', 'limit']) {
+    if (req.query[param] !== undefined && !EXPORT_INTEGER_RE.test(req.query[param])) {
+      return res.status(400).json({ error: `Invalid ${param}`, details: `${param} must be a non-negative integer` });
+    }
+  }
+  if (req.query.limit !== undefined && parseInt(req.query.limit) < 1) {
+    return res.status(400).json({ error: 'Invalid limit', details: 'limit must be at least 1' });
+  }
+  // Without a cursor, start before every row at or after since (inclusive,
+  // like event_archive.py read) in every shard
+  const after = cursor ? parseExportCursor(cursor) : {
+    timestamp: req.query.since !== undefined ? parseInt(req.query.since) : Number.MIN_SAFE_INTEGER,
+    id: -1,
+    shard: ''
+  };
+  if (!after || isNaN(after.timestamp)) {
+    return res.status(400).json({ error: 'Invalid cursor or since' });
+  }
+  const filters = {
+    sessionId,
+    eventType,
+    workspace,
+    until: req.query.until !== undefined ? parseInt(req.query.until) : null
+  };
+  const maxEvents = req.query.limit !== undefined ? parseInt(req.query.limit) : Infinity;
+
+  let closed = false;
+  res.on('close', () => { closed = !res.writableEnded; });
+
+  let count = 0;
+  let lastCursor = cursor || null;
+  // Shards outside the pool stay open for this export only, without
+  // evicting the shards other requests are using
+  const reader = shards.reader();
+  try {
+    // Per-shard page buffers, merged in (timestamp, shard, id) order. Each
+    // page is read to completion before yielding, so no statement stays open
+    // while other requests use the shard.
+    const sources = (workspace ? shards.shardNamesForQuery(workspace) : shards.listShardNames())
+      .map(name => ({ name, start: shardExportStart(name, after), rows: [], pos: 0, exhausted: false }));
+
+    const fill = (source) => {
+      const page = reader.get(source.name).context.events
+        .exportPage(filters, source.start[0], source.start[1], EXPORT_PAGE_SIZE);
+      source.rows = Array.from(page);
+      source.pos = 0;
+      source.exhausted = source.rows.length < EXPORT_PAGE_SIZE;
+      if (source.rows.length > 0) {
+        const last = source.rows[source.rows.length - 1];
+        source.start = [last.timestamp, last.id];
+      }
+    };
+
+    res.setHeader('Content-Type', 'application/x-ndjson');
+    while (!closed && count < maxEvents) {
+      for (const source of sources) {
+        if (source.pos >= source.rows.length && !source.exhausted) fill(source);
+      }
+      const active = sources.filter(source => source.pos < source.rows.length);
+      if (active.length === 0) break;
+
+      // Emit until some shard needs its next page, then yield to other requests
+      let chunk = '';
+      while (count < maxEvents) {
+        let next = null;
+        for (const source of active) {
+          if (source.pos >= source.rows.length) continue;
+          const candidate = { row: source.rows[source.pos], shard: source.name, source };
+          if (!next || compareExportRows(candidate, next) < 0) next = candidate;
+        }
+        if (!next) break;
+        const { row, shard, source } = next;
+        let data;
+        try {
+          data = JSON.parse(row.data || '{}');
+        } catch (e) {
+          data = {};
+        }
+        lastCursor = `${row.timestamp}:${row.id}:${shard}`;
+        chunk += JSON.stringify({ ...row, data, cursor: lastCursor }) + '\n';
+        count++;
+        source.pos++;
+        if (source.pos >= source.rows.length && !source.exhausted) break;
+      }
+
+      if (!res.write(chunk)) {
+        await waitForDrain(res);
+      } else {
+        await new Promise(resolve => setImmediate(resolve));
+      }
+    }
+
+    if (!closed) {
+      res.end(JSON.stringify({ end: true, count, cursor: lastCursor, more: count >= maxEvents }) + '\n');
+    }
+  } catch (error) {
+    console.error('Error exporting events:', error);
+    if (!res.headersSent) {
+      return res.status(500).json({ error: 'Internal server error' });
+    }
+    // Without the end line the client knows to resume from its last cursor
+    res.destroy();
+  } finally {
+    reader.close();
+  }
+});
+
 // Get events for a session
 app.get('/events/:sessionId', (req, res) => {
   try {
     const { sessionId } = req.params;
     const limit = parseInt(req.query.limit) || 50;
+    const workspace = req.query.workspace;
     
-    const stmt = db.prepare(`
-      SELECT * FROM events 
-      WHERE session_id = ?
-      ORDER BY timestamp DESC
-      LIMIT ?
-    `);
-    
-    const events = stmt.all(sessionId, limit);
+    // Sessions aren't tied to a shard, so fan out unless the caller scopes it
+    const shardNames = workspace && validateWorkspace(workspace)
+      ? shards.shardNamesForQuery(workspace)
+      : undefined;
+    const events = mergeByField(
+      shards.fanOut(shard => shard.context.events.sessionEvents(sessionId, limit), shardNames),
+      'timestamp', true, limit
+    );
     
     // Parse data field
     events.forEach(event => {
@@ -242,23 +440,14 @@ app.get('/events', (req, res) => {
     const eventType = req.query.event_type || 'UserPromptSubmit'; // Default: conversations only
     const workspace = req.query.workspace;
     
-    let query = `
-      SELECT * FROM events 
-      WHERE event_type = ? AND timestamp > ?
-    `;
-    let params = [eventType, since];
-    
-    // Add workspace filtering if specified
-    if (workspace) {
-      query += ` AND (JSON_EXTRACT(data, '$.workspace') = ? OR JSON_EXTRACT(data, '$.working_directory') LIKE ?)`;
-      params.push(workspace, `%/${workspace}`);
-    }
-    
-    query += ` ORDER BY timestamp DESC LIMIT ?`;
-    params.push(limit);
-    
-    const stmt = db.prepare(query);
-    const events = stmt.all(...params);
+    // A workspace query only touches its own shard (plus the default one)
+    const shardNames = workspace && validateWorkspace(workspace)
+      ? shards.shardNamesForQuery(workspace)
+      : undefined;
+    const events = mergeByField(
+      shards.fanOut(shard => shard.context.events.recent(eventType, since, limit, workspace), shardNames),
+      'timestamp', true, limit
+    );
     
     // Parse data field
     events.forEach(event => {
@@ -394,18 +583,24 @@ app.get('/kb/user-profile', (req, res) => {
 // Sessions list endpoint
 app.get('/sessions', (req, res) => {
   try {
-    const stmt = db.prepare(`
-      SELECT 
-        session_id,
-        COUNT(*) as event_count,
-        MIN(timestamp) as first_event,
-        MAX(timestamp) as last_event
-      FROM events
-      GROUP BY session_id
-      ORDER BY last_event DESC
-    `);
-    
-    const sessions = stmt.all();
+    // Aggregate per shard, then merge sessions that span shards
+    const perShard = shards.fanOut(shard => shard.context.events.sessionSummaries());
+    
+    const sessionMap = new Map();
+    for (const rows of perShard) {
+      for (const row of rows) {
+        const existing = sessionMap.get(row.session_id);
+        if (!existing) {
+          sessionMap.set(row.session_id, { ...row });
+          continue;
+        }
+        existing.event_count += row.event_count;
+        existing.first_event = Math.min(existing.first_event, row.first_event);
+        existing.last_event = Math.max(existing.last_event, row.last_event);
+      }
+    }
+    
+    const sessions = mergeByField([Array.from(sessionMap.values())], 'last_event', true);
     res.json(sessions);
   } catch (error) {
     console.error('Error fetching sessions:', error);
@@ -413,15 +608,60 @@ app.get('/sessions', (req, res) => {
   }
 });
 
+// Turn records (UserPromptSubmit -> Stop) for a session
+app.get('/sessions/:sessionId/turns', (req, res) => {
+  try {
+    const { sessionId } = req.params;
+    if (!validateSessionId(sessionId)) {
+      return res.status(400).json({ error: 'Invalid session_id format' });
+    }
+    const limit = parseInt(req.query.limit) || 500;
+    const turns = mergeByField(
+      shards.fanOut(shard => shard.context.turnAnalytics.getSessionTurns(sessionId, limit)),
+      'started_at', false, limit
+    );
+    res.json(turns);
+  } catch (error) {
+    console.error('Error fetching turns:', error);
+    res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
+// Turn latency percentiles and tool mix for a workspace, or for all turns
+app.get('/turns/summary', (req, res) => {
+  try {
+    const workspace = req.query.workspace;
+    if (workspace && !validateWorkspace(workspace)) {
+      return res.status(400).json({ error: 'Invalid workspace format' });
+    }
+    if (workspace) {
+      return res.json(shards.forWorkspace(workspace).context.turnAnalytics.getWorkspaceSummary(workspace));
+    }
+    const names = shards.listShardNames();
+    if (names.length === 1) {
+      return res.json(shards.open(names[0]).context.turnAnalytics.getWorkspaceSummary(null));
+    }
+    // Percentiles over several shards need every duration; turns are one
+    // row per prompt, so this stays far smaller than the events
+    const parts = shards.fanOut(shard => shard.context.turnAnalytics.getSummaryParts(null, true), names);
+    res.json(TurnAnalytics.summarize(null, parts));
+  } catch (error) {
+    console.error('Error summarizing turns:', error);
+    res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
 // Enhanced Health check with system status
 app.get('/health', (req, res) => {
   try {
     // Check database connectivity
-    const dbCheck = db.prepare('SELECT 1 as test').get();
+    const dbCheck = shards.forWorkspace(null).context.events.ping();
     const healthStatus = {
       status: 'ok',
       timestamp: Date.now(),
       database: dbCheck ? 'connected' : 'error',
+      shards: shards.stats(),
+      maintenance: sqliteMaintenance.stats(),
       uptime: process.uptime(),
       memory: process.memoryUsage(),
       version: '1.0.0'
@@ -528,6 +768,177 @@ Format your response in markdown with clear sections.`;
   }
 });
 
+// Indexed knowledge graphs, rebuilt only when the .mmd file changes
+const graphIndexes = new GraphIndexCache();
+const GRAPH_FILES = {
+  claude: 'claude_knowledge_graph.mmd',
+  user: 'user_knowledge_graph.mmd'
+};
+
+// Versioned graph snapshots, stored as deltas next to the events database
+const graphHistoryDb = new Database(path.join(DB_DIR, 'graph-history.db'));
+applyTuning(graphHistoryDb, SQLITE_TUNING);
+const graphHistory = new GraphHistory(graphHistoryDb, {
+  checkpointEvery: parseInt(process.env.GRAPH_CHECKPOINT_EVERY) || 50
+});
+
+// WAL checkpoints, ANALYZE and incremental vacuum on every open database
+// (SQLITE_MAINTENANCE=off disables the schedule)
+const sqliteMaintenance = new MaintenanceScheduler(
+  () => [...shards.openShards().map(shard => shard.db), graphHistory.db]
+);
+if (process.env.SQLITE_MAINTENANCE !== 'off') {
+  sqliteMaintenance.start();
+}
+
+// Snapshots run only from ingest, off the request path: edits arriving in
+// a burst within GRAPH_SNAPSHOT_DELAY_MS produce one snapshot. Reads never
+// snapshot, so history endpoints show what was recorded at ingest.
+const GRAPH_WRITE_TOOLS = ['Write', 'Edit', 'MultiEdit'];
+const GRAPH_SNAPSHOT_DELAY_MS = parseInt(process.env.GRAPH_SNAPSHOT_DELAY_MS) || 1000;
+const pendingGraphSnapshots = new Map(); // "workspace/graph" -> timer
+
+const recordGraphVersion = (workspace, graph) => {
+  try {
+    const filePath = path.join(getWorkspacePath(workspace), GRAPH_FILES[graph]);
+    graphHistory.record(workspace || '', graph, filePath);
+  } catch (error) {
+    console.error('Graph history error:', error.message);
+  }
+};
+
+const scheduleGraphSnapshot = (workspace, graph) => {
+  const key = `${workspace || ''}/${graph}`;
+  if (pendingGraphSnapshots.has(key)) {
+    clearTimeout(pendingGraphSnapshots.get(key).timer);
+  }
+  const timer = setTimeout(() => {
+    pendingGraphSnapshots.delete(key);
+    recordGraphVersion(workspace, graph);
+  }, GRAPH_SNAPSHOT_DELAY_MS);
+  pendingGraphSnapshots.set(key, { timer, workspace, graph });
+};
+
+// Take pending snapshots now (on shutdown)
+const flushGraphSnapshots = () => {
+  for (const { timer, workspace, graph } of pendingGraphSnapshots.values()) {
+    clearTimeout(timer);
+    recordGraphVersion(workspace, graph);
+  }
+  pendingGraphSnapshots.clear();
+};
+
+// Query part of a knowledge graph instead of shipping the whole file
+app.get('/kb/graph/query', (req, res) => {
+  try {
+    const { workspace, concept, name, q } = req.query;
+    const graph = req.query.graph || 'claude';
+    const mode = req.query.mode || 'auto';
+
+    if (workspace && !validateWorkspace(workspace)) {
+      return res.status(400).json({ error: 'Invalid workspace format' });
+    }
+    if (!GRAPH_FILES[graph]) {
+      return res.status(400).json({ error: 'Invalid graph', allowed: Object.keys(GRAPH_FILES) });
+    }
+
+    const workspacePath = getWorkspacePath(workspace);
+    const index = graphIndexes.get(path.join(workspacePath, GRAPH_FILES[graph]));
+    if (!index) {
+      return res.status(404).json({ error: 'Knowledge graph not found' });
+    }
+
+    const depth = Math.min(Math.max(parseInt(req.query.depth) || 1, 1), 5);
+    const limit = Math.min(Math.max(parseInt(req.query.limit) || 50, 1), 500);
+    const offset = Math.max(parseInt(req.query.offset) || 0, 0);
+    const maxNodes = Math.min(Math.max(parseInt(req.query.max_nodes) || 150, 1), 500);
+
+    let result;
+    switch (mode) {
+      case 'overview':
+        return res.json(index.overview());
+      case 'search':
+        return res.json({ matches: index.search(q, limit) });
+      case 'neighborhood':
+        result = index.neighborhood(concept, depth, maxNodes);
+        if (!result) return res.status(404).json({ error: 'Concept not found', concept });
+        break;
+      case 'subgraph':
+        result = index.subgraph(name);
+        if (!result) return res.status(404).json({ error: 'Subgraph not found', name });
+        break;
+      case 'level':
+        result = index.level(parseInt(req.query.level) || 0, offset, limit);
+        break;
+      case 'auto':
+        result = index.top(maxNodes);
+        break;
+      default:
+        return res.status(400).json({
+          error: 'Invalid mode',
+          allowed: ['auto', 'overview', 'search', 'neighborhood', 'subgraph', 'level']
+        });
+    }
+
+    if (req.query.format === 'mermaid') {
+      return res.type('text/plain').send(result.mermaid);
+    }
+    res.json({ mode, graph, ...result });
+  } catch (error) {
+    console.error('Error querying knowledge graph:', error);
+    res.status(500).json({ error: 'Failed to query knowledge graph' });
+  }
+});
+
+// Validate the workspace/graph pair shared by the history endpoints
+const parseHistoryParams = (req, res) => {
+  const workspace = req.query.workspace;
+  const graph = req.query.graph || 'user';
+  if (workspace && !validateWorkspace(workspace)) {
+    res.status(400).json({ error: 'Invalid workspace format' });
+    return null;
+  }
+  if (!GRAPH_FILES[graph]) {
+    res.status(400).json({ error: 'Invalid graph', allowed: Object.keys(GRAPH_FILES) });
+    return null;
+  }
+  return { workspace: workspace || '', graph };
+};
+
+// Version timeline of a knowledge graph
+app.get('/kb/history', (req, res) => {
+  try {
+    const params = parseHistoryParams(req, res);
+    if (!params) return;
+    const since = parseInt(req.query.since) || 0;
+    const limit = Math.min(parseInt(req.query.limit) || 1000, 10000);
+    res.json(graphHistory.timeline(params.workspace, params.graph, since, limit));
+  } catch (error) {
+    console.error('Error reading graph history:', error);
+    res.status(500).json({ error: 'Failed to read graph history' });
+  }
+});
+
+// Net changes between two versions (from/to), or since a timestamp (since=ms)
+app.get('/kb/history/diff', (req, res) => {
+  try {
+    const params = parseHistoryParams(req, res);
+    if (!params) return;
+    const { workspace, graph } = params;
+    const latest = graphHistory.versionAt(workspace, graph, Date.now());
+
+    const from = req.query.since !== undefined
+      ? graphHistory.versionAt(workspace, graph, parseInt(req.query.since) || 0)
+      : parseInt(req.query.from) || 0;
+    const to = req.query.to !== undefined ? parseInt(req.query.to) || 0 : latest;
+
+    res.json(graphHistory.diff(workspace, graph, from, to));
+  } catch (error) {
+    console.error('Error diffing graph history:', error);
+    res.status(500).json({ error: 'Failed to diff graph history' });
+  }
+});
+
 // Knowledge graph delta endpoint
 app.get('/kb/delta', async (req, res) => {
   try {
@@ -553,6 +964,11 @@ app.get('/kb/delta', async (req, res) => {
     }
     
     
+    // summary_only=1 skips rendering three full Mermaid diagrams
+    if (req.query.summary_only === '1' || req.query.summary_only === 'true') {
+      return res.json({ summary: kgConverter.summarizeDelta(userGraph, claudeGraph) });
+    }
+    
     // Create delta analysis
     const delta = kgConverter.createDelta(userGraph, claudeGraph);
     
@@ -661,21 +1077,28 @@ app.use('*', (req, res) => {
 // Graceful shutdown handling
 process.on('SIGTERM', () => {
   console.log('SIGTERM received, shutting down gracefully...');
-  db.close();
+  sqliteMaintenance.stop();
+  flushGraphSnapshots();
+  shards.closeAll();
+  graphHistory.db.close();
   process.exit(0);
 });
 
 process.on('SIGINT', () => {
   console.log('SIGINT received, shutting down gracefully...');
-  db.close();
+  sqliteMaintenance.stop();
+  flushGraphSnapshots();
+  shards.closeAll();
+  graphHistory.db.close();
   process.exit(0);
 });
 
 app.listen(PORT, () => {
   console.log(`🎓 Pedagogy server running on http://localhost:${PORT}`);
   console.log(`📊 Events API: /events`);
-  console.log(`🧠 Knowledge graphs: /kb/claude-graph, /kb/user-graph`);
+  console.log(`🧠 Knowledge graphs: /kb/claude-graph, /kb/user-graph, /kb/graph/query`);
   console.log(`👤 User profile: /kb/user-profile`);
+  console.log(`⏱️  Turn analytics: /sessions/:id/turns, /turns/summary`);
   console.log(`🔧 Health check: /health`);
   console.log(`🏗️  Environment: ${process.env.NODE_ENV || 'development'}`);
 });
\ No newline at end of file
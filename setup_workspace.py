@@ -6,15 +6,24 @@ Creates a workspace with event capture hooks and knowledge tracking files.
 
 import os
 import shutil
-import json
 import argparse
-import subprocess
+import difflib
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 # Get the directory containing this script for template access
 SCRIPT_DIR = Path(__file__).parent
 TEMPLATES_DIR = SCRIPT_DIR / 'templates'
 
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(TEMPLATES_DIR))
+from workspace_store import atomic_write_json, atomic_write_text, file_lock, read_json
+
+from research_orchestrator import run_research
+
 def load_template(template_name, replacements=None):
     """Load a template file and apply replacements."""
     template_path = TEMPLATES_DIR / template_name
@@ -29,48 +38,73 @@ def load_template(template_name, replacements=None):
     
     return content
 
+# Files generated from templates/ (template, path in workspace, file mode, label).
+# These are the only files `--upgrade` rewrites; learner data is never listed here.
+GENERATED_FILES = [
+    ('hook_dispatcher.py', '.claude/hooks/hook_dispatcher.py', 0o755, 'Hook'),
+    ('capture_events.py', '.claude/hooks/capture_events.py', 0o755, 'Hook plugin'),
+    ('inject_learning_context.py', '.claude/hooks/inject_learning_context.py', 0o755, 'Hook plugin'),
+    ('workspace_store.py', '.claude/hooks/workspace_store.py', None, 'Hook helper'),
+    ('capture_policy.py', '.claude/hooks/capture_policy.py', None, 'Hook helper'),
+    ('review_queue.py', '.claude/hooks/review_queue.py', 0o755, 'Hook helper'),
+    ('mermaid_graph.py', '.claude/hooks/mermaid_graph.py', None, 'Hook helper'),
+    ('concept_relevance.py', '.claude/hooks/concept_relevance.py', None, 'Hook helper'),
+    ('graph_merge.py', '.claude/hooks/graph_merge.py', 0o755, 'Hook plugin'),
+    ('capture_policy.json', '.claude/capture_policy.json', None, 'Capture policy'),
+    ('settings.json', '.claude/settings.json', None, 'Settings'),
+    ('study_init.md', '.claude/commands/study::init.md', None, 'Command'),
+    ('claude_md.md', '.claude/CLAUDE.md', None, 'Instructions'),
+]
+
+# Records which template content each generated file was written from
+MANIFEST_PATH = '.claude/template_manifest.json'
+
+CLAUDE_MD_HEADING = "# Pedagogy Mode - Learning System"
+TOPIC_PREFIX = "**Current Topic**: "
+
+def content_hash(content):
+    """sha256 of text content."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def render_generated_file(template_name, topic=None):
+    """Render a generated file's content from its template."""
+    content = load_template(template_name)
+    if template_name == 'claude_md.md' and topic:
+        content = content.replace(
+            CLAUDE_MD_HEADING,
+            f"{CLAUDE_MD_HEADING}\n\n{TOPIC_PREFIX}{topic}"
+        )
+    return content
+
+def write_manifest(workspace_path, topic, files):
+    """Write the template manifest: topic plus template and installed hashes per file."""
+    atomic_write_json(workspace_path / MANIFEST_PATH, {
+        'version': 1,
+        'topic': topic or '',
+        'updated_at': datetime.now().isoformat(),
+        'files': files
+    })
+
 def create_claude_directory(workspace_path, topic=None):
     """Create .claude directory with hooks, commands, and settings."""
-    claude_dir = workspace_path / '.claude'
-    claude_dir.mkdir(exist_ok=True)
-    
-    hooks_dir = claude_dir / 'hooks'
-    hooks_dir.mkdir(exist_ok=True)
-    
-    commands_dir = claude_dir / 'commands'
-    commands_dir.mkdir(exist_ok=True)
+    for subdir in ('.claude/hooks', '.claude/commands'):
+        (workspace_path / subdir).mkdir(parents=True, exist_ok=True)
     
     created_files = []
+    manifest_files = {}
     
-    # Create capture_events.py hook
-    hook_content = load_template('capture_events.py')
-    hook_path = hooks_dir / 'capture_events.py'
-    hook_path.write_text(hook_content)
-    hook_path.chmod(0o755)
-    created_files.append(f"Hook: {hook_path.relative_to(workspace_path)}")
-    
-    # Create settings.json
-    settings_content = load_template('settings.json')
-    settings_path = claude_dir / 'settings.json'
-    settings_path.write_text(settings_content)
-    created_files.append(f"Settings: {settings_path.relative_to(workspace_path)}")
-    
-    # Create study::init command
-    study_content = load_template('study_init.md')
-    study_path = commands_dir / 'study::init.md'
-    study_path.write_text(study_content)
-    created_files.append(f"Command: {study_path.relative_to(workspace_path)}")
+    for template_name, relative_path, mode, label in GENERATED_FILES:
+        content = render_generated_file(template_name, topic)
+        atomic_write_text(workspace_path / relative_path, content, mode=mode)
+        manifest_files[relative_path] = {
+            'template': template_name,
+            'template_hash': content_hash(load_template(template_name)),
+            'installed_hash': content_hash(content)
+        }
+        created_files.append(f"{label}: {relative_path}")
     
-    # Create CLAUDE.md
-    claude_md_content = load_template('claude_md.md')
-    if topic:
-        claude_md_content = claude_md_content.replace(
-            "# Pedagogy Mode - Learning System",
-            f"# Pedagogy Mode - Learning System\n\n**Current Topic**: {topic}"
-        )
-    claude_md_path = claude_dir / 'CLAUDE.md'
-    claude_md_path.write_text(claude_md_content)
-    created_files.append(f"Instructions: {claude_md_path.relative_to(workspace_path)}")
+    write_manifest(workspace_path, topic, manifest_files)
+    created_files.append(f"Template manifest: {MANIFEST_PATH}")
     
     return created_files
 
@@ -96,7 +130,8 @@ def create_knowledge_files(workspace_path, topic=None):
 """
     
     claude_graph_path = workspace_path / 'claude_knowledge_graph.mmd'
-    claude_graph_path.write_text(claude_graph_content)
+    with file_lock(claude_graph_path):
+        atomic_write_text(claude_graph_path, claude_graph_content)
     created_files.append(f"Claude knowledge: {claude_graph_path.relative_to(workspace_path)}")
     
     user_graph_content = """graph TD
@@ -104,7 +139,8 @@ def create_knowledge_files(workspace_path, topic=None):
     %% Not learning intentions or workflow states
 """
     user_graph_path = workspace_path / 'user_knowledge_graph.mmd'
-    user_graph_path.write_text(user_graph_content)
+    with file_lock(user_graph_path):
+        atomic_write_text(user_graph_path, user_graph_content)
     created_files.append(f"User knowledge: {user_graph_path.relative_to(workspace_path)}")
     
     # Create user.json
@@ -143,7 +179,8 @@ def create_knowledge_files(workspace_path, topic=None):
     }
     
     user_json_path = workspace_path / 'user.json'
-    user_json_path.write_text(json.dumps(user_data, indent=2))
+    with file_lock(user_json_path):
+        atomic_write_json(user_json_path, user_data)
     created_files.append(f"User profile: {user_json_path.relative_to(workspace_path)}")
     
     return created_files
@@ -172,11 +209,8 @@ def setup_workspace(directory_name, topic=None):
 
 def verify_setup(workspace_path):
     """Verify that all components were created correctly."""
-    required_files = [
-        '.claude/hooks/capture_events.py',
-        '.claude/commands/study::init.md', 
-        '.claude/settings.json',
-        '.claude/CLAUDE.md',
+    required_files = [relative_path for _, relative_path, _, _ in GENERATED_FILES] + [
+        MANIFEST_PATH,
         'claude_knowledge_graph.mmd',
         'user_knowledge_graph.mmd',
         'user.json',
@@ -196,7 +230,7 @@ def test_hook_execution(workspace_path):
     try:
         import subprocess
         
-        hook_path = workspace_path / '.claude/hooks/capture_events.py'
+        hook_path = workspace_path / '.claude/hooks/hook_dispatcher.py'
         test_input = '{"session_id":"test-setup"}'
         
         result = subprocess.run(
@@ -212,6 +246,147 @@ def test_hook_execution(workspace_path):
     except Exception as e:
         return False, "", str(e)
 
+def workspace_topic(workspace_path, manifest):
+    """Topic the workspace was set up with, from the manifest or its CLAUDE.md."""
+    if manifest.get('topic') is not None:
+        return manifest['topic']
+    try:
+        for line in (workspace_path / '.claude/CLAUDE.md').read_text().splitlines():
+            if line.startswith(TOPIC_PREFIX):
+                return line[len(TOPIC_PREFIX):].strip()
+    except (IOError, UnicodeDecodeError):
+        pass
+    return ''
+
+def find_workspaces(root):
+    """Find workspaces (directories with the generated hooks) under root."""
+    workspaces = []
+    for dirpath, dirnames, _ in os.walk(root):
+        if (Path(dirpath) / '.claude/hooks/capture_events.py').exists():
+            workspaces.append(Path(dirpath))
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != 'node_modules']
+    return sorted(workspaces)
+
+def plan_upgrade(workspace_path, assume_unmodified=False):
+    """Compare a workspace's generated files against the current templates.
+
+    Each file gets one action:
+      current  - already matches the template
+      add      - missing, will be created
+      update   - unmodified copy of an older template, will be rewritten
+      modified - edited locally since it was generated, left alone
+      untracked - no manifest entry to tell whether it was edited, left alone
+    """
+    manifest = read_json(workspace_path / MANIFEST_PATH)
+    recorded = manifest.get('files', {})
+    topic = workspace_topic(workspace_path, manifest)
+    actions = []
+    
+    for template_name, relative_path, mode, _ in GENERATED_FILES:
+        new_content = render_generated_file(template_name, topic)
+        try:
+            local_content = (workspace_path / relative_path).read_text()
+        except (IOError, UnicodeDecodeError):
+            local_content = None
+        entry = recorded.get(relative_path)
+        
+        if local_content is None:
+            action = 'add'
+        elif local_content == new_content:
+            action = 'current'
+        elif entry and content_hash(local_content) == entry.get('installed_hash'):
+            action = 'update'
+        elif entry:
+            action = 'modified'
+        else:
+            action = 'update' if assume_unmodified else 'untracked'
+        
+        actions.append({
+            'template': template_name,
+            'path': relative_path,
+            'mode': mode,
+            'action': action,
+            'old': local_content,
+            'new': new_content
+        })
+    
+    return {'workspace': workspace_path, 'topic': topic, 'manifest': manifest, 'actions': actions}
+
+def apply_upgrade(plan):
+    """Write the added/updated files and record their hashes in the manifest."""
+    workspace_path = plan['workspace']
+    files = dict(plan['manifest'].get('files', {}))
+    for item in plan['actions']:
+        if item['action'] in ('add', 'update'):
+            atomic_write_text(workspace_path / item['path'], item['new'], mode=item['mode'])
+        if item['action'] in ('add', 'update', 'current'):
+            files[item['path']] = {
+                'template': item['template'],
+                'template_hash': content_hash(load_template(item['template'])),
+                'installed_hash': content_hash(item['new'])
+            }
+    write_manifest(workspace_path, plan['topic'], files)
+
+def upgrade_workspace(workspace_path, dry_run=False, assume_unmodified=False):
+    """Plan (and unless dry_run, apply) a template upgrade for one workspace."""
+    workspace_path = Path(workspace_path)
+    with file_lock(workspace_path / MANIFEST_PATH):
+        plan = plan_upgrade(workspace_path, assume_unmodified)
+        if not dry_run:
+            apply_upgrade(plan)
+    return plan
+
+def print_upgrade_report(plan, dry_run=False):
+    symbols = {'add': '+', 'update': '↑', 'modified': '⚠', 'untracked': '⚠'}
+    notes = {
+        'add': 'missing, created' if not dry_run else 'missing, would be created',
+        'update': 'updated' if not dry_run else 'would be updated',
+        'modified': 'edited locally, skipped',
+        'untracked': 'not in manifest, skipped (use --assume-unmodified to overwrite)'
+    }
+    changes = [item for item in plan['actions'] if item['action'] != 'current']
+    print(f"\n📁 {plan['workspace']}" + (f" (topic: {plan['topic']})" if plan['topic'] else ''))
+    if not changes:
+        print("  ✓ Up to date")
+        return
+    for item in changes:
+        print(f"  {symbols[item['action']]} {item['path']}: {notes[item['action']]}")
+        if dry_run and item['old'] is not None:
+            diff = difflib.unified_diff(
+                item['old'].splitlines(keepends=True),
+                item['new'].splitlines(keepends=True),
+                fromfile=f"a/{item['path']}",
+                tofile=f"b/{item['path']}"
+            )
+            for line in diff:
+                print(f"      {line}", end='' if line.endswith('\n') else '\n')
+
+def run_upgrade(workspaces, dry_run=False, assume_unmodified=False, jobs=None):
+    """Upgrade many workspaces in parallel. Returns a process exit code."""
+    if not workspaces:
+        print("No workspaces found to upgrade")
+        return 1
+    
+    print(f"{'Checking' if dry_run else 'Upgrading'} {len(workspaces)} workspace(s) against {TEMPLATES_DIR}")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            (workspace, pool.submit(upgrade_workspace, workspace, dry_run, assume_unmodified))
+            for workspace in workspaces
+        ]
+        for workspace, future in futures:
+            try:
+                print_upgrade_report(future.result(), dry_run)
+            except Exception as e:
+                failed += 1
+                print(f"\n📁 {workspace}\n  ✗ Upgrade failed: {e}")
+    
+    if dry_run:
+        print("\nDry run: no files were written")
+    return 1 if failed else 0
+
 def main():
     parser = argparse.ArgumentParser(
         description='Set up a pedagogy learning workspace with event capture and knowledge tracking'
@@ -225,9 +400,37 @@ def main():
         '-t', '--topic', 
         help='Learning topic to focus on (optional)'
     )
+    parser.add_argument(
+        '--upgrade', nargs='*', metavar='WORKSPACE',
+        help='Upgrade existing workspaces to the current templates instead of creating one'
+    )
+    parser.add_argument(
+        '--scan', action='append', metavar='DIR',
+        help='With --upgrade: also upgrade every workspace found under DIR (repeatable)'
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help='With --upgrade: report what would change, with diffs, without writing'
+    )
+    parser.add_argument(
+        '--assume-unmodified', action='store_true',
+        help='With --upgrade: overwrite files in workspaces that predate the template manifest'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='With --upgrade: workspaces to process in parallel'
+    )
     
     args = parser.parse_args()
     
+    if args.upgrade is not None or args.scan:
+        workspaces = [Path(w) for w in args.upgrade or []]
+        for root in args.scan or []:
+            workspaces.extend(find_workspaces(root))
+        # De-duplicate while keeping order
+        workspaces = list(dict.fromkeys(w.resolve() for w in workspaces))
+        return run_upgrade(workspaces, args.dry_run, args.assume_unmodified, args.jobs)
+    
     try:
         # Check if templates directory exists
         if not TEMPLATES_DIR.exists():
@@ -270,52 +473,28 @@ def main():
         # Automatically trigger research if topic is provided
         if args.topic:
             print(f"\n🚀 Automatically starting research for '{args.topic}'...")
-            print(f"⏱️  IMPORTANT: Comprehensive research takes 20-30 minutes to complete")
-            print(f"⏱️  This includes multi-agent analysis and knowledge graph synthesis")
-            print(f"⏱️  The process will run until completion - please be patient!")
+            print(f"⏱️  The four researcher roles run in parallel, then the knowledge graph is synthesized")
+            print(f"⏱️  Expect roughly the time of the slowest researcher plus synthesis")
             print(f"📊 Monitor progress at: http://localhost:3001")
+            print(f"  Per-stage logs: {workspace_path.absolute() / 'kb' / 'logs'}")
             
             try:
-                # Change to workspace directory and run Claude
-                study_prompt = f"/study::init {args.topic}"
-                claude_cmd = [
-                    'claude', 
-                    '-p', study_prompt,
-                    '--dangerously-skip-permissions'
-                ]
-                
-                print(f"\n  Running: {' '.join(claude_cmd)}")
-                print(f"  In directory: {workspace_path.absolute()}")
-                print(f"  Starting comprehensive research... (this will take 20-30 minutes)")
-                
-                # Run without timeout to allow full research completion
-                result = subprocess.run(
-                    claude_cmd,
-                    cwd=workspace_path,
-                    capture_output=True,
-                    text=True
-                    # No timeout - let research complete naturally
-                )
+                results = run_research(workspace_path, args.topic)
                 
-                if result.returncode == 0:
+                if all(r['status'] != 'failed' for r in results):
                     print("  ✅ Comprehensive research completed successfully!")
                     print("  📊 View results at: http://localhost:3001")
                     print("  🎓 Knowledge graphs have been populated with research findings")
                 else:
-                    print("  ⚠️ Research completed with issues:")
-                    if result.stderr:
-                        print(f"    {result.stderr}")
+                    print("  ⚠️ Research completed with issues")
                     print("  📊 Check http://localhost:3001 for partial results")
-                    print("  You can re-run research manually:")
-                    print(f"    cd {args.directory}")
-                    print(f"    claude -p '/study::init {args.topic}'")
+                    print("  Re-run to retry only the failed stages (completed ones are cached):")
+                    print(f"    python3 {SCRIPT_DIR / 'research_orchestrator.py'} '{args.topic}' -w {args.directory}")
                     
             except Exception as e:
                 print(f"  ⚠️ Could not start research: {e}")
                 print("  You can manually start research:")
-                print(f"    cd {args.directory}")
-                print(f"    claude -p '/study::init {args.topic}'")
-                print(f"  Expected duration: 20-30 minutes for comprehensive research")
+                print(f"    python3 {SCRIPT_DIR / 'research_orchestrator.py'} '{args.topic}' -w {args.directory}")
         
         # Success message
         print(f"\n" + "="*60)
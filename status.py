@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Terminal status for Graph My Mind workspaces.
+Reads the knowledge graphs of one or many workspaces directly (no server
+needed) and prints mastered and gap counts, the learning frontier and an
+ASCII tree of Claude's graph. Parse results are cached per workspace and
+reused until a graph file changes; --watch redraws only on such changes.
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+TEMPLATES_DIR = SCRIPT_DIR / 'templates'
+
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(TEMPLATES_DIR))
+from mermaid_graph import PLACEHOLDER_LABELS, MermaidGraph, learning_frontier, read_mermaid
+from workspace_store import atomic_write_text
+
+GRAPH_FILES = ('claude_knowledge_graph.mmd', 'user_knowledge_graph.mmd')
+CACHE_FILE = Path('.claude') / 'cache' / 'status.pickle'
+CACHE_VERSION = 2
+
+MASTERED, FRONTIER, GAP = '✓', '▸', '·'
+FRONTIER_PREVIEW = 8
+
+
+def source_stamps(workspace_dir):
+    """(mtime, size) of each graph file, to detect changes with two stat calls."""
+    stamps = []
+    for name in GRAPH_FILES:
+        try:
+            stat = (Path(workspace_dir) / name).stat()
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append(None)
+    return stamps
+
+
+def ascii_tree(graph, markers):
+    """Render a graph as tree lines, roots with the most children first.
+
+    Nodes reached again (cycles, shared prerequisites) are shown once as
+    [↻ label]; nodes not reachable from a root are listed at the end.
+    """
+    children = graph.children()
+    parents = graph.parents()
+    relations = {(src, dst): relation for src, dst, relation in graph.edges if relation}
+
+    roots = [node_id for node_id in graph.nodes if not parents.get(node_id)]
+    if not roots and graph.nodes:
+        roots = [max(graph.nodes, key=lambda node_id: len(children.get(node_id, ())))]
+    roots.sort(key=lambda node_id: -len(children.get(node_id, ())))
+
+    lines = []
+    visited = set()
+
+    def walk(root, prefix, is_last):
+        # Iterative DFS: graphs can be deeper than Python's recursion limit
+        stack = [(root, None, prefix, is_last)]
+        while stack:
+            node_id, parent, prefix, is_last = stack.pop()
+            connector = '└─ ' if is_last else '├─ '
+            label = graph.nodes.get(node_id, node_id)
+            relation = relations.get((parent, node_id))
+            suffix = f'  ({relation})' if relation else ''
+            if node_id in visited:
+                lines.append(f'{prefix}{connector}[↻ {label}]{suffix}')
+                continue
+            visited.add(node_id)
+            lines.append(f'{prefix}{connector}{markers(label)} {label}{suffix}')
+            kids = children.get(node_id, [])
+            child_prefix = prefix + ('   ' if is_last else '│  ')
+            for i in reversed(range(len(kids))):
+                stack.append((kids[i], node_id, child_prefix, i == len(kids) - 1))
+
+    for i, root in enumerate(roots):
+        walk(root, '', i == len(roots) - 1)
+    unvisited = [node_id for node_id in graph.nodes if node_id not in visited]
+    if unvisited:
+        lines.append('─── Disconnected Nodes ───')
+        for node_id in unvisited:
+            if node_id not in visited:
+                walk(node_id, '  ', True)
+    return lines
+
+
+def without_placeholders(graph):
+    """The graph minus the placeholder nodes a new workspace starts with."""
+    kept = MermaidGraph()
+    for node_id, label in graph.nodes.items():
+        if label not in PLACEHOLDER_LABELS:
+            kept.add_node(node_id, label, graph.node_subgraph.get(node_id))
+    kept.edges = [(a, b, rel) for a, b, rel in graph.edges if a in kept.nodes and b in kept.nodes]
+    return kept
+
+
+def build_status(workspace_dir, stamps=None):
+    """Parse a workspace's graphs into the summary shown by the status view."""
+    workspace_dir = Path(workspace_dir)
+    claude_graph = without_placeholders(read_mermaid(workspace_dir / GRAPH_FILES[0]))
+    user_graph = without_placeholders(read_mermaid(workspace_dir / GRAPH_FILES[1]))
+
+    user_labels = set(user_graph.labels())
+    claude_labels = set(claude_graph.labels())
+    frontier = list(dict.fromkeys(learning_frontier(claude_graph, user_labels)))
+    frontier_set = set(frontier)
+
+    def marker(label):
+        if label in user_labels:
+            return MASTERED
+        return FRONTIER if label in frontier_set else GAP
+
+    return {
+        'stamps': stamps if stamps is not None else source_stamps(workspace_dir),
+        'claude_concepts': len(claude_labels),
+        'mastered': len(claude_labels & user_labels),
+        'user_concepts': len(user_labels),
+        'gaps': len(claude_labels - user_labels),
+        'frontier': frontier,
+        # One joined string unpickles much faster than thousands of lines
+        'tree': '\n'.join(ascii_tree(claude_graph, marker)),
+    }
+
+
+def load_status(workspace_dir):
+    """Cached status for a workspace, rebuilt only when a graph file changed."""
+    workspace_dir = Path(workspace_dir)
+    cache_path = workspace_dir / CACHE_FILE
+    stamps = source_stamps(workspace_dir)
+    try:
+        with open(cache_path, 'rb') as f:
+            version, status = pickle.load(f)
+        if version == CACHE_VERSION and status['stamps'] == stamps:
+            return status
+    except Exception:
+        pass
+
+    status = build_status(workspace_dir, stamps)
+    try:
+        atomic_write_text(cache_path, pickle.dumps((CACHE_VERSION, status), protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass  # Read-only workspace: still show the status
+    return status
+
+
+def _fit(line, width):
+    return line if len(line) <= width else line[:max(0, width - 1)] + '…'
+
+
+def render_status(workspace_dir, status, tree_lines=40, width=80):
+    """Lines of the status view for one workspace."""
+    workspace_dir = Path(workspace_dir)
+    lines = [f"📚 {workspace_dir.resolve().name}  ({workspace_dir})"]
+    if status['stamps'] == [None, None]:
+        return lines + ['   No knowledge graphs yet']
+    if not status['claude_concepts'] and not status['user_concepts']:
+        return lines + ['   No concepts yet (run /study::init)']
+
+    total = status['claude_concepts']
+    percent = (100 * status['mastered'] // total) if total else 0
+    lines.append(
+        f"   Mastered {status['mastered']}/{total} concepts ({percent}%) · "
+        f"{status['gaps']} gaps · {len(status['frontier'])} on the frontier"
+    )
+    frontier = status['frontier']
+    if frontier:
+        preview = ', '.join(frontier[:FRONTIER_PREVIEW])
+        more = f" (+{len(frontier) - FRONTIER_PREVIEW} more)" if len(frontier) > FRONTIER_PREVIEW else ''
+        lines.append(_fit(f"   Next up: {preview}{more}", width))
+
+    if tree_lines and status['tree']:
+        lines.append('')
+        tree = status['tree'].split('\n', tree_lines)
+        for line in tree[:tree_lines]:
+            lines.append(_fit('   ' + line, width))
+        if len(tree) > tree_lines:
+            remaining = tree[tree_lines].count('\n') + 1
+            lines.append(f"   … {remaining} more lines (--tree-lines to show more)")
+    return lines
+
+
+def render_all(workspaces, tree_lines, width):
+    """The full view for every workspace, separated by blank lines."""
+    blocks = []
+    for workspace in workspaces:
+        blocks.append('\n'.join(render_status(workspace, load_status(workspace), tree_lines, width)))
+    legend = f"{MASTERED} mastered   {FRONTIER} ready to learn   {GAP} gap"
+    return '\n\n'.join(blocks) + ('\n\n' + legend if tree_lines else '')
+
+
+def watch(workspaces, tree_lines, interval):
+    """Redraw whenever a graph file of any watched workspace changes."""
+    last = None
+    while True:
+        stamps = [source_stamps(workspace) for workspace in workspaces]
+        if stamps != last:
+            width = _terminal_width()
+            view = render_all(workspaces, tree_lines, width)
+            sys.stdout.write('\033[H\033[2J' + view + f"\n\nUpdated {time.strftime('%H:%M:%S')} · Ctrl+C to exit\n")
+            sys.stdout.flush()
+            last = stamps
+        time.sleep(interval)
+
+
+def _terminal_width():
+    try:
+        return os.get_terminal_size().columns
+    except OSError:
+        return 80
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Show learning progress of one or more workspaces without the web server'
+    )
+    parser.add_argument(
+        'workspaces', nargs='*',
+        help='Workspace directories (default: current directory)'
+    )
+    parser.add_argument('--scan', metavar='DIR', help='Also show every workspace found under DIR')
+    parser.add_argument(
+        '-n', '--tree-lines', type=int, default=40,
+        help='Lines of the concept tree per workspace, 0 for none (default: 40)'
+    )
+    parser.add_argument('-w', '--watch', action='store_true', help='Redraw when a graph file changes')
+    parser.add_argument(
+        '--interval', type=float, default=1.0,
+        help='Seconds between change checks in --watch mode (default: 1)'
+    )
+
+    args = parser.parse_args()
+    workspaces = [Path(w) for w in args.workspaces]
+    if args.scan:
+        # Imported lazily: setup_workspace is slow to import and only needed here
+        from setup_workspace import find_workspaces
+        workspaces.extend(find_workspaces(Path(args.scan)))
+    if not workspaces:
+        workspaces = [Path('.')]
+
+    missing = [w for w in workspaces if not w.is_dir()]
+    if missing:
+        print(f"Error: not a directory: {', '.join(str(w) for w in missing)}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.watch:
+            watch(workspaces, args.tree_lines, args.interval)
+        print(render_all(workspaces, args.tree_lines, _terminal_width()))
+        return 0
+
+    except KeyboardInterrupt:
+        print()
+        return 0
+    except BrokenPipeError:
+        return 0
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,7 +5,8 @@
 
 """
 Event capture hook for Claude Code.
-Captures all events and sends them to the pedagogy server.
+Captures events selected by .claude/capture_policy.json and sends them to
+the pedagogy server.
 """
 
 import json
@@ -15,6 +16,9 @@ import urllib.error
 from datetime import datetime
 from pathlib import Path
 
+from capture_policy import load_policy
+from workspace_store import update_json, write_text_if_missing
+
 def send_event_to_server(event_data):
     """Send event data to server. Fail silently if server unavailable."""
     try:
@@ -30,6 +34,11 @@ def send_event_to_server(event_data):
     except Exception:
         return False
 
+def capture_event(policy, capture, event_data, send=send_event_to_server):
+    """Send the event if the policy selected it, shaped to its capture level, fields and caps."""
+    if capture:
+        send(policy.shape(event_data, capture))
+
 def determine_event_type(parsed_input):
     """Determine which Claude Code hook is calling us."""
     if 'prompt' in parsed_input:
@@ -51,31 +60,102 @@ def initialize_workspace_on_session_start():
         kb_dir = workspace_dir / 'kb'
         kb_dir.mkdir(exist_ok=True)
         
-        # Create basic knowledge files if they don't exist
-        claude_graph = workspace_dir / 'claude_knowledge_graph.mmd'
-        if not claude_graph.exists():
-            claude_graph.write_text("graph TD\n    Start[\"Ready to learn about your topic\"]\n")
-            
-        user_graph = workspace_dir / 'user_knowledge_graph.mmd'
-        if not user_graph.exists():
-            user_graph.write_text("graph TD\n    User[\"User starting learning journey\"]\n")
+        # Create basic knowledge files if they don't exist. Creation happens
+        # under the file lock so concurrent sessions don't clobber each other.
+        write_text_if_missing(
+            workspace_dir / 'claude_knowledge_graph.mmd',
+            "graph TD\n    Start[\"Ready to learn about your topic\"]\n"
+        )
+        write_text_if_missing(
+            workspace_dir / 'user_knowledge_graph.mmd',
+            "graph TD\n    User[\"User starting learning journey\"]\n"
+        )
             
-        user_json = workspace_dir / 'user.json'
-        if not user_json.exists():
-            user_data = {
-                "name": "",
-                "learning_goals": [],
-                "current_topic": "",
-                "knowledge_level": "beginner",
-                "progress": {}
-            }
-            user_json.write_text(json.dumps(user_data, indent=2))
+        user_data = {
+            "name": "",
+            "learning_goals": [],
+            "current_topic": "",
+            "knowledge_level": "beginner",
+            "progress": {}
+        }
+        # Fill in missing top-level keys only; progress written by other
+        # sessions is kept
+        update_json(workspace_dir / 'user.json', lambda current: {**user_data, **current})
         
         return True
     except Exception as e:
         print(f"Workspace initialization error: {e}", file=sys.stderr)
         return False
 
+def handle_event(stdin_data, parsed_input, event_type, send=send_event_to_server):
+    """Capture one hook event. Returns the hook's stdout text, or None for no output."""
+    session_id = parsed_input.get('session_id', 'unknown')
+    
+    # Decide from the capture policy before any payload is serialized
+    policy = load_policy()
+    capture = policy.capture_level(
+        event_type, parsed_input.get('tool_name'), parsed_input.get('tool_input')
+    )
+    
+    # Determine workspace context
+    current_dir = Path.cwd()
+    workspace_name = current_dir.name if current_dir.name != 'long_context_pedagogy' else None
+    
+    # Build event data
+    event_data = {
+        'session_id': session_id,
+        'event_type': event_type,
+        'timestamp': int(datetime.now().timestamp() * 1000),
+        'workspace': workspace_name,
+        'working_directory': str(current_dir),
+        'stdin_data': parsed_input,
+        'raw_stdin': stdin_data,
+    }
+    
+    # Add specific fields based on event type
+    if event_type == 'UserPromptSubmit':
+        event_data['user_prompt'] = parsed_input.get('prompt', '')
+        
+    elif event_type == 'PostToolUse':
+        event_data['tool_name'] = parsed_input.get('tool_name', '')
+        event_data['tool_input'] = parsed_input.get('tool_input', {})
+        event_data['tool_response'] = parsed_input.get('tool_response', {})
+        
+    elif event_type == 'Stop':
+        event_data['transcript_path'] = parsed_input.get('transcript_path', '')
+        
+    elif event_type == 'SessionStart':
+        # Initialize workspace and trigger study::init
+        init_success = initialize_workspace_on_session_start()
+        event_data['workspace_initialized'] = init_success
+        
+        # Add study::init command to the prompt
+        if init_success:
+            enhanced_prompt = "/study::init"
+            event_data['stdout_output'] = enhanced_prompt
+            capture_event(policy, capture, event_data, send)
+            return enhanced_prompt
+    
+    # Handle output for other event types
+    stdout_output = None
+    if event_type == 'UserPromptSubmit':
+        stdout_output = parsed_input.get('prompt', '')
+    
+    event_data['stdout_output'] = stdout_output or ""
+    capture_event(policy, capture, event_data, send)
+    return stdout_output
+
+def run_plugin(context):
+    """Dispatcher plugin: capture the event, sending it on a worker thread."""
+    output = handle_event(
+        context.stdin_data,
+        context.parsed_input,
+        context.event_type,
+        send=lambda event_data: context.run_in_background(send_event_to_server, event_data)
+    )
+    if output is not None:
+        context.output = output
+
 def main():
     try:
         # Read stdin
@@ -89,57 +169,10 @@ def main():
         
         # Determine event type
         event_type = determine_event_type(parsed_input)
-        session_id = parsed_input.get('session_id', 'unknown')
-        
-        # Determine workspace context
-        current_dir = Path.cwd()
-        workspace_name = current_dir.name if current_dir.name != 'long_context_pedagogy' else None
-        
-        # Build event data
-        event_data = {
-            'session_id': session_id,
-            'event_type': event_type,
-            'timestamp': int(datetime.now().timestamp() * 1000),
-            'workspace': workspace_name,
-            'working_directory': str(current_dir),
-            'stdin_data': parsed_input,
-            'raw_stdin': stdin_data,
-        }
-        
-        # Add specific fields based on event type
-        if event_type == 'UserPromptSubmit':
-            event_data['user_prompt'] = parsed_input.get('prompt', '')
-            
-        elif event_type == 'PostToolUse':
-            event_data['tool_name'] = parsed_input.get('tool_name', '')
-            event_data['tool_input'] = parsed_input.get('tool_input', {})
-            event_data['tool_output'] = parsed_input.get('tool_output', {})
-            
-        elif event_type == 'Stop':
-            event_data['transcript_path'] = parsed_input.get('transcript_path', '')
-            
-        elif event_type == 'SessionStart':
-            # Initialize workspace and trigger study::init
-            init_success = initialize_workspace_on_session_start()
-            event_data['workspace_initialized'] = init_success
-            
-            # Add study::init command to the prompt
-            if init_success:
-                enhanced_prompt = "/study::init"
-                print(enhanced_prompt)
-                event_data['stdout_output'] = enhanced_prompt
-                send_event_to_server(event_data)
-                return
-        
-        # Handle output for other event types
-        stdout_output = ""
-        if event_type == 'UserPromptSubmit':
-            original_prompt = parsed_input.get('prompt', '')
-            print(original_prompt)
-            stdout_output = original_prompt
         
-        event_data['stdout_output'] = stdout_output
-        send_event_to_server(event_data)
+        output = handle_event(stdin_data, parsed_input, event_type)
+        if output is not None:
+            print(output)
         
     except Exception as e:
         print(f"Event capture error: {e}", file=sys.stderr)
@@ -0,0 +1,148 @@
+"""
+Capture policy for the event hook.
+Loads .claude/capture_policy.json once per hook run and compiles it into
+cheap checks: which tools to capture in full, per-event-type sampling, field
+allow-lists and payload size caps with truncation markers.
+"""
+
+import fnmatch
+import json
+import random
+import re
+from pathlib import Path
+
+POLICY_FILE = Path('.claude') / 'capture_policy.json'
+
+# Fields every captured event keeps regardless of the allow-list
+CORE_FIELDS = ('session_id', 'event_type', 'timestamp', 'workspace', 'working_directory')
+
+# Capture levels: the whole (shaped) event, or for tools the policy filters
+# out a stub of the core fields plus tool_name, so per-turn tool counts
+# stay complete
+CAPTURE_FULL = 'full'
+CAPTURE_STUB = 'stub'
+STUB_FIELDS = CORE_FIELDS + ('tool_name',)
+
+# Writes of these files are replayed from their tool_input and the pre-edit
+# file in tool_response (originalFile), so both are always kept whole
+GRAPH_FILES = ('claude_knowledge_graph.mmd', 'user_knowledge_graph.mmd')
+GRAPH_WRITE_TOOLS = ('Write', 'Edit', 'MultiEdit')
+GRAPH_WRITE_FIELDS = ('tool_input', 'tool_response')
+
+TRUNCATION_MARKER = '...[truncated {omitted} chars]'
+
+
+class CapturePolicy:
+    """Compiled capture policy. A missing policy captures everything, as before."""
+
+    def __init__(self, config=None):
+        config = config or {}
+        tools = config.get('tools', {})
+        self.include_tools = self._compile_patterns(tools.get('include', ['*']))
+        self.exclude_tools = self._compile_patterns(tools.get('exclude', []))
+        self.sample_rates = {k: float(v) for k, v in config.get('sample_rates', {}).items()}
+        self.fields = {k: frozenset(v) for k, v in config.get('fields', {}).items()}
+        self.max_field_chars = config.get('max_field_chars')
+        self.max_payload_bytes = config.get('max_payload_bytes')
+
+    @staticmethod
+    def _compile_patterns(patterns):
+        """Compile shell-style tool name patterns into one regex (None if empty)."""
+        if not patterns:
+            return None
+        return re.compile('|'.join(fnmatch.translate(p) for p in patterns))
+
+    def capture_level(self, event_type, tool_name=None, tool_input=None):
+        """Decide cheaply, before any event payload is built, how much to send.
+
+        Returns CAPTURE_FULL, CAPTURE_STUB for a PostToolUse of a tool the
+        include/exclude lists filter out, or None if the event is sampled out.
+        Graph writes are always captured in full: replay needs every one.
+        """
+        level = CAPTURE_FULL
+        if event_type == 'PostToolUse':
+            if self.is_graph_write(tool_name, tool_input):
+                return CAPTURE_FULL
+            name = tool_name or ''
+            if self.include_tools is not None and not self.include_tools.match(name):
+                level = CAPTURE_STUB
+            elif self.exclude_tools is not None and self.exclude_tools.match(name):
+                level = CAPTURE_STUB
+        rate = self.sample_rates.get(event_type, 1.0)
+        return level if rate >= 1.0 or random.random() < rate else None
+
+    def allows_field(self, event_type, field):
+        """True if field should be built for event_type (core fields always are)."""
+        allowed = self.fields.get(event_type)
+        return allowed is None or field in CORE_FIELDS or field in allowed
+
+    def truncate(self, value):
+        """Recursively cap string lengths, marking how much was dropped."""
+        limit = self.max_field_chars
+        if not limit:
+            return value
+        if isinstance(value, str):
+            if len(value) <= limit:
+                return value
+            return value[:limit] + TRUNCATION_MARKER.format(omitted=len(value) - limit)
+        if isinstance(value, dict):
+            return {k: self.truncate(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.truncate(v) for v in value]
+        return value
+
+    @staticmethod
+    def is_graph_write(tool_name, tool_input):
+        """True for a Write/Edit/MultiEdit of one of the knowledge graph files."""
+        if tool_name not in GRAPH_WRITE_TOOLS:
+            return False
+        file_path = tool_input.get('file_path') if isinstance(tool_input, dict) else None
+        return isinstance(file_path, str) and Path(file_path).name in GRAPH_FILES
+
+    def shape(self, event_data, level=CAPTURE_FULL):
+        """Apply the field allow-list and size caps to an assembled event.
+
+        A stub keeps only STUB_FIELDS. The tool_input and tool_response of
+        a graph write are kept whole, even if the allow-list omits them
+        (progress replay rebuilds the graphs from them); the size caps
+        apply to the other fields.
+        """
+        if level == CAPTURE_STUB:
+            shaped = {key: event_data[key] for key in STUB_FIELDS if key in event_data}
+            shaped['stub'] = True
+            return shaped
+
+        event_type = event_data.get('event_type')
+        is_graph_write = self.is_graph_write(event_data.get('tool_name'), event_data.get('tool_input'))
+        exempt = GRAPH_WRITE_FIELDS if is_graph_write else ()
+        shaped = {
+            key: value if key in exempt else self.truncate(value)
+            for key, value in event_data.items()
+            if key in exempt or self.allows_field(event_type, key)
+        }
+
+        if self.max_payload_bytes:
+            # Largest fields go first until the payload fits
+            sizes = sorted(
+                ((len(json.dumps(v)), k) for k, v in shaped.items()
+                 if k not in CORE_FIELDS and k not in exempt),
+                reverse=True
+            )
+            total = len(json.dumps(shaped))
+            for size, key in sizes:
+                if total <= self.max_payload_bytes:
+                    break
+                shaped[key] = {'_truncated': True, 'original_bytes': size}
+                total -= size - len(json.dumps(shaped[key]))
+
+        return shaped
+
+
+def load_policy(path=None):
+    """Load and compile the workspace capture policy."""
+    policy_path = Path(path) if path else Path.cwd() / POLICY_FILE
+    try:
+        with open(policy_path, 'r') as f:
+            return CapturePolicy(json.load(f))
+    except (IOError, json.JSONDecodeError):
+        return CapturePolicy()
@@ -0,0 +1,304 @@
+"""
+Prompt relevance ranking for knowledge graph concepts.
+Keeps a per-workspace BM25 index over concept labels and their kb/
+descriptions, rebuilt only when the graphs or kb/ change, and scores a
+prompt against it so the context hook injects the concepts that matter
+for what was actually asked. Uses NumPy when available, with a pure
+Python fallback.
+"""
+
+import bisect
+import heapq
+import math
+import os
+import pickle
+import re
+from array import array
+from pathlib import Path
+
+from workspace_store import atomic_write_text, file_lock
+
+try:
+    import numpy as np
+except ImportError:  # hook_dispatcher.py declares numpy; plain python3 runs may lack it
+    np = None
+
+INDEX_FILE = Path('.claude') / 'cache' / 'relevance_index.pickle'
+INDEX_VERSION = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Label tokens count this many times, so a concept's own name outweighs its description
+LABEL_WEIGHT = 2
+MAX_DESCRIPTION_CHARS = 2000
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+HEADING_RE = re.compile(r'^#{1,6}\s+(.*)$')
+BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+STOPWORDS = frozenset(
+    'a an and are as at be but by can do does for from how i in is it its me my of on or '
+    'so that the their them then there these this to was we what when where which who why '
+    'will with you your about into explain tell show help want know understand please'.split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords, with plural 's' folded."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _idf(n, df):
+    """BM25 idf (the +1 variant, which is never negative)."""
+    return math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+
+
+def _normalize(text):
+    return ' '.join(TOKEN_RE.findall(text.lower()))
+
+
+def kb_descriptions(kb_dir):
+    """Map normalized terms to kb/ text describing them.
+
+    A term is described by the section under a heading naming it and by
+    any line that introduces it in bold (e.g. "- **Gradient**: ...").
+    """
+    descriptions = {}
+
+    def add(term, text):
+        key = _normalize(term)
+        if key and text:
+            descriptions[key] = (descriptions.get(key, '') + ' ' + text)[:MAX_DESCRIPTION_CHARS]
+
+    for path in sorted(Path(kb_dir).rglob('*.md')):
+        try:
+            lines = path.read_text().splitlines()
+        except (IOError, UnicodeDecodeError):
+            continue
+        heading, section = None, []
+        for line in lines + ['# ']:
+            match = HEADING_RE.match(line)
+            if match:
+                if heading:
+                    add(heading, ' '.join(section))
+                heading, section = re.sub(r'^[\d.\s]+', '', match.group(1)), []
+                continue
+            section.append(line)
+            for term in BOLD_RE.findall(line):
+                add(term, line)
+    return descriptions
+
+
+def source_stamps(workspace_dir):
+    """(path, mtime, size) for every input of the index, to detect changes cheaply."""
+    workspace_dir = Path(workspace_dir)
+    paths = [workspace_dir / 'claude_knowledge_graph.mmd', workspace_dir / 'user_knowledge_graph.mmd']
+    kb_dir = workspace_dir / 'kb'
+    if kb_dir.is_dir():
+        for dirpath, dirnames, filenames in os.walk(kb_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            paths.extend(Path(dirpath) / name for name in filenames if name.endswith('.md'))
+    stamps = []
+    for path in sorted(paths):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        stamps.append((str(path.relative_to(workspace_dir)), stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+class RelevanceIndex:
+    """BM25 index over concepts, with known/gap membership precomputed.
+
+    Posting lists are stored CSR-style: one flat array of document ids and
+    one of BM25 weights, with each sorted term's start offset, so the
+    pickled index loads quickly and NumPy can view the arrays without copying.
+    """
+
+    def __init__(self, concepts, texts, known, stamps=None):
+        self.stamps = stamps or []
+        self.known = bytes(concept in known for concept in concepts)
+        # Fallback orders used to fill up when few concepts match the prompt:
+        # known concepts in graph order, gaps shortest-first (as before)
+        self.known_order = array('i', (i for i, is_known in enumerate(self.known) if is_known))
+        self.gap_order = array('i', sorted(
+            (i for i, is_known in enumerate(self.known) if not is_known),
+            key=lambda i: (len(concepts[i]), concepts[i])
+        ))
+
+        term_counts = []
+        for text in texts:
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            term_counts.append(counts)
+
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+        postings = {}
+        for doc_id, counts in enumerate(term_counts):
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, tf))
+
+        # Precompute each term's BM25 weight per document: scoring a prompt is
+        # then just summing a few posting lists
+        n = len(concepts)
+        terms = sorted(postings)
+        self.doc_ids = array('i')
+        self.weights = array('f')
+        self.term_starts = array('i')
+        for token in terms:
+            entries = postings[token]
+            idf = _idf(n, len(entries))
+            self.term_starts.append(len(self.doc_ids))
+            for doc_id, tf in entries:
+                norm = K1 * (1 - B + B * lengths[doc_id] / (avg_length or 1.0))
+                self.doc_ids.append(doc_id)
+                self.weights.append(idf * tf * (K1 + 1) / (tf + norm))
+        self.term_starts.append(len(self.doc_ids))
+
+        # Labels and terms never contain newlines; one joined string per list
+        # unpickles far faster than tens of thousands of separate str objects
+        self.concept_text = '\n'.join(concepts)
+        self.term_text = '\n'.join(terms)
+        self._reset_caches()
+
+    def _reset_caches(self):
+        self._concepts = None
+        self._terms = None
+        self._arrays = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ('_concepts', '_terms', '_arrays'):
+            state[key] = None
+        return state
+
+    @property
+    def concepts(self):
+        if self._concepts is None:
+            self._concepts = self.concept_text.split('\n') if self.concept_text else []
+        return self._concepts
+
+    def span(self, term):
+        """(start, end) of term's posting list, or None if it is not indexed."""
+        if self._terms is None:
+            self._terms = self.term_text.split('\n') if self.term_text else []
+        i = bisect.bisect_left(self._terms, term)
+        if i < len(self._terms) and self._terms[i] == term:
+            return self.term_starts[i], self.term_starts[i + 1]
+        return None
+
+    def _numpy_arrays(self):
+        """Zero-copy NumPy views of the postings and known mask, made on first use."""
+        if self._arrays is None:
+            self._arrays = (
+                np.frombuffer(self.doc_ids, dtype=np.int32) if self.doc_ids else np.zeros(0, np.int32),
+                np.frombuffer(self.weights, dtype=np.float32) if self.weights else np.zeros(0, np.float32),
+                np.frombuffer(self.known, dtype=np.uint8).astype(bool)
+            )
+        return self._arrays
+
+    def scores(self, prompt):
+        """BM25 score of every concept for prompt (array, or dict of non-zero scores)."""
+        spans = [span for span in map(self.span, set(tokenize(prompt))) if span is not None]
+        if np is not None:
+            doc_ids, weights, _ = self._numpy_arrays()
+            scores = np.zeros(len(self.known), dtype=np.float32)
+            for start, end in spans:
+                # Document ids are unique within a posting list
+                scores[doc_ids[start:end]] += weights[start:end]
+            return scores
+        scores = {}
+        for start, end in spans:
+            for doc_id, weight in zip(self.doc_ids[start:end], self.weights[start:end]):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return scores
+
+    def _top(self, scores, want_known, limit):
+        if limit <= 0:
+            return []
+        if isinstance(scores, dict):
+            matches = [(score, -i) for i, score in scores.items()
+                       if bool(self.known[i]) == want_known and score > 0]
+            return [-i for score, i in heapq.nlargest(limit, matches)]
+        known_mask = self._numpy_arrays()[2]
+        mask = known_mask if want_known else ~known_mask
+        candidates = np.flatnonzero(mask & (scores > 0))
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        # Highest score first, graph order on ties
+        return sorted(candidates.tolist(), key=lambda i: (-float(scores[i]), i))
+
+    def rank(self, prompt, known_limit=10, gap_limit=5):
+        """Most relevant known concepts and gaps for prompt.
+
+        Each list is topped up from the default order (graph order for known
+        concepts, shortest gaps first) when fewer concepts match the prompt.
+        """
+        scores = self.scores(prompt)
+        result = []
+        for want_known, limit, fallback in ((True, known_limit, self.known_order),
+                                            (False, gap_limit, self.gap_order)):
+            chosen = self._top(scores, want_known, limit)
+            seen = set(chosen)
+            for i in fallback:
+                if len(chosen) >= limit:
+                    break
+                if i not in seen:
+                    chosen.append(i)
+            result.append([self.concepts[i] for i in chosen])
+        return result[0], result[1]
+
+
+def build_index(workspace_dir, claude_concepts, user_concepts, stamps=None):
+    """Build the index for a workspace's concepts and kb/ descriptions."""
+    descriptions = kb_descriptions(Path(workspace_dir) / 'kb')
+    concepts = list(dict.fromkeys(list(user_concepts) + list(claude_concepts)))
+    texts = [
+        ' '.join([concept] * LABEL_WEIGHT) + ' ' + descriptions.get(_normalize(concept), '')
+        for concept in concepts
+    ]
+    return RelevanceIndex(concepts, texts, set(user_concepts), stamps)
+
+
+def load_index(workspace_dir, claude_concepts, user_concepts):
+    """Load the cached index, rebuilding it if the graphs or kb/ changed."""
+    workspace_dir = Path(workspace_dir)
+    index_path = workspace_dir / INDEX_FILE
+    stamps = source_stamps(workspace_dir)
+
+    index = _read_index(index_path)
+    if index is not None and index.stamps == stamps:
+        return index
+
+    with file_lock(index_path):
+        index = _read_index(index_path)
+        if index is not None and index.stamps == stamps:
+            return index
+        index = build_index(workspace_dir, claude_concepts, user_concepts, stamps)
+        atomic_write_text(index_path, pickle.dumps((INDEX_VERSION, index), protocol=pickle.HIGHEST_PROTOCOL))
+    return index
+
+
+def _read_index(index_path):
+    try:
+        with open(index_path, 'rb') as f:
+            version, index = pickle.load(f)
+    except Exception:
+        return None
+    return index if version == INDEX_VERSION else None
+
+
+def rank_concepts(workspace_dir, prompt, claude_concepts, user_concepts, known_limit=10, gap_limit=5):
+    """Known concepts and focus areas ranked by relevance to prompt."""
+    index = load_index(workspace_dir, claude_concepts, user_concepts)
+    return index.rank(prompt, known_limit, gap_limit)
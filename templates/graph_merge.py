@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Three-way merge of concurrent knowledge graph edits.
+Each Write/Edit of a graph file is treated as a node/edge change set against
+the version its session last read, and merged structurally into the latest
+committed version (the head) under a per-workspace lock, so parallel
+sessions and research subagents never overwrite each other's concepts.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from mermaid_graph import DEFAULT_EDGE_OP, MermaidGraph, parse_mermaid, render_mermaid
+from workspace_store import atomic_write_text, file_lock
+
+GRAPH_FILES = ('claude_knowledge_graph.mmd', 'user_knowledge_graph.mmd')
+MERGE_DIR = Path('.claude') / 'graph_merge'
+EDIT_TOOLS = ('Write', 'Edit', 'MultiEdit')
+# Session bases untouched for this long belong to finished sessions
+BASE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+HEADER_RE = re.compile(r'^\s*(graph|flowchart)\s+(\w+)')
+# Styling lines kept from the inputs when a merged graph is re-rendered
+# (linkStyle is dropped: it refers to edge positions, which a merge changes)
+STYLE_RE = re.compile(r'^\s*(classDef|class|style|click)\s')
+
+_MISSING = object()
+
+
+# -- structural merge ---------------------------------------------------------
+
+def _state(graph):
+    """Nodes, edges, edge operators and subgraph membership of a graph as comparable dicts."""
+    edges = {}
+    for src, dst, relation in graph.edges:
+        edges[(src, dst)] = relation
+    ops = {pair: graph.edge_ops.get(pair, DEFAULT_EDGE_OP) for pair in edges}
+    return dict(graph.nodes), edges, ops, dict(graph.node_subgraph)
+
+
+def _merge_values(base, ours, theirs, key, conflicts, kind):
+    """Three-way merge of one key. A side that changed wins over one that did not;
+    when both changed, a modification beats a deletion and otherwise ours wins."""
+    b, o, t = base.get(key, _MISSING), ours.get(key, _MISSING), theirs.get(key, _MISSING)
+    if o == t:
+        return o
+    if o == b:
+        return t
+    if t == b:
+        return o
+    if o is _MISSING or t is _MISSING:
+        conflicts.append(f"{kind} {key!r} deleted on one side and changed on the other: kept")
+        return t if o is _MISSING else o
+    conflicts.append(f"{kind} {key!r} changed on both sides ({t!r} vs {o!r}): kept {o!r}")
+    return o
+
+
+def _align_ids(base, ours, theirs):
+    """Map ids of nodes ours added onto theirs: the same label is the same concept,
+    and an id theirs already used for a different concept gets a fresh id."""
+    base_nodes, ours_nodes, theirs_nodes = base.nodes, ours.nodes, theirs.nodes
+    theirs_by_label = {}
+    for node_id, label in theirs_nodes.items():
+        theirs_by_label.setdefault(label, node_id)
+    taken = set(base_nodes) | set(ours_nodes) | set(theirs_nodes)
+
+    mapping = {}
+    for node_id, label in ours_nodes.items():
+        if node_id in base_nodes:
+            continue
+        match = theirs_by_label.get(label)
+        if match is not None and match not in ours_nodes:
+            mapping[node_id] = match
+        elif node_id in theirs_nodes and theirs_nodes[node_id] != label:
+            suffix = 2
+            while f'{node_id}_{suffix}' in taken:
+                suffix += 1
+            mapping[node_id] = f'{node_id}_{suffix}'
+            taken.add(mapping[node_id])
+    return mapping
+
+
+def _remap(graph, mapping):
+    if not mapping:
+        return graph
+    remapped = MermaidGraph()
+    for node_id, label in graph.nodes.items():
+        remapped.add_node(mapping.get(node_id, node_id), label, graph.node_subgraph.get(node_id))
+    remapped.edges = [(mapping.get(a, a), mapping.get(b, b), rel) for a, b, rel in graph.edges]
+    remapped.edge_ops = {
+        (mapping.get(a, a), mapping.get(b, b)): op for (a, b), op in graph.edge_ops.items()
+    }
+    return remapped
+
+
+def merge_graphs(base, ours, theirs):
+    """Merge two graphs that both started from base.
+
+    Nodes, edges (one per ordered node pair), edge styles and subgraph membership are
+    merged independently, and a node that a surviving edge still needs is
+    kept even if one side deleted it. Returns (merged MermaidGraph, conflicts)
+    where conflicts describes every decision that picked one side.
+    """
+    ours = _remap(ours, _align_ids(base, ours, theirs))
+    base_nodes, base_edges, base_ops, base_members = _state(base)
+    ours_nodes, ours_edges, ours_ops, ours_members = _state(ours)
+    theirs_nodes, theirs_edges, theirs_ops, theirs_members = _state(theirs)
+    conflicts = []
+
+    # Theirs is the committed version: keep its order, then append ours' additions
+    node_order = list(dict.fromkeys(list(theirs_nodes) + list(ours_nodes) + list(base_nodes)))
+    nodes = {}
+    for node_id in node_order:
+        label = _merge_values(base_nodes, ours_nodes, theirs_nodes, node_id, conflicts, 'node')
+        if label is not _MISSING:
+            nodes[node_id] = label
+
+    edge_order = list(dict.fromkeys(list(theirs_edges) + list(ours_edges) + list(base_edges)))
+    edges = []
+    for pair in edge_order:
+        relation = _merge_values(base_edges, ours_edges, theirs_edges, pair, conflicts, 'edge')
+        if relation is _MISSING:
+            continue
+        for node_id in pair:
+            if node_id not in nodes:
+                for source in (ours_nodes, theirs_nodes, base_nodes):
+                    if node_id in source:
+                        nodes[node_id] = source[node_id]
+                        break
+                conflicts.append(f"node {node_id!r} was deleted but is still linked: kept")
+        edges.append((pair[0], pair[1], relation))
+
+    merged = MermaidGraph()
+    for node_id, label in nodes.items():
+        subgraph = _merge_values(base_members, ours_members, theirs_members, node_id, conflicts, 'subgraph of')
+        merged.add_node(node_id, label, None if subgraph is _MISSING else subgraph)
+    merged.edges = edges
+    for src, dst, _ in edges:
+        op = _merge_values(base_ops, ours_ops, theirs_ops, (src, dst), conflicts, 'edge style of')
+        if op is not _MISSING and op != DEFAULT_EDGE_OP:
+            merged.edge_ops[(src, dst)] = op
+    return merged, conflicts
+
+
+def same_structure(a, b):
+    """True if two graphs have the same nodes, edges and subgraph membership."""
+    return _state(a) == _state(b)
+
+
+def merge_texts(base_text, ours_text, theirs_text):
+    """Three-way merge of Mermaid texts. Returns (merged text, conflicts).
+
+    When the structural result equals one side, that side's text is returned
+    unchanged so comments and formatting survive; otherwise the merged graph
+    is re-rendered with the inputs' style lines appended.
+    """
+    ours, theirs = parse_mermaid(ours_text), parse_mermaid(theirs_text)
+    merged, conflicts = merge_graphs(parse_mermaid(base_text), ours, theirs)
+    if same_structure(merged, ours):
+        return ours_text, conflicts
+    if same_structure(merged, theirs):
+        return theirs_text, conflicts
+
+    header = HEADER_RE.match(ours_text) or HEADER_RE.match(theirs_text)
+    text = render_mermaid(merged, header.group(2) if header else 'TD')
+    styles = [
+        line.strip() for line in (theirs_text + '\n' + ours_text).splitlines() if STYLE_RE.match(line)
+    ]
+    if styles:
+        text += ''.join(f'    {line}\n' for line in dict.fromkeys(styles))
+    return text, conflicts
+
+
+# -- tool calls -----------------------------------------------------------------
+
+def apply_edit(text, old_string, new_string, replace_all=False):
+    """Apply an Edit tool call the way the tool does; unmatched edits are no-ops."""
+    if not old_string:
+        return text
+    if replace_all:
+        return text.replace(old_string, new_string)
+    return text.replace(old_string, new_string, 1)
+
+
+def apply_tool_call(text, tool_name, tool_input):
+    """Return the graph text after a Write/Edit/MultiEdit tool call."""
+    if tool_name == 'Write':
+        return tool_input.get('content', '')
+    if tool_name == 'Edit':
+        return apply_edit(
+            text,
+            tool_input.get('old_string', ''),
+            tool_input.get('new_string', ''),
+            tool_input.get('replace_all', False),
+        )
+    if tool_name == 'MultiEdit':
+        for edit in tool_input.get('edits', []):
+            text = apply_edit(
+                text,
+                edit.get('old_string', ''),
+                edit.get('new_string', ''),
+                edit.get('replace_all', False),
+            )
+    return text
+
+
+# -- per-workspace merge service --------------------------------------------------
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except (IOError, UnicodeDecodeError):
+        return None
+
+
+def _session_key(session_id):
+    return re.sub(r'[^A-Za-z0-9_-]', '_', str(session_id or 'unknown'))[:100]
+
+
+def _head_path(workspace_dir, graph_name):
+    return Path(workspace_dir) / MERGE_DIR / f'{graph_name}.head'
+
+
+def _base_path(workspace_dir, session_id, graph_name):
+    return Path(workspace_dir) / MERGE_DIR / 'bases' / f'{_session_key(session_id)}.{graph_name}'
+
+
+def workspace_lock(workspace_dir):
+    """The per-workspace lock every graph commit is serialized through."""
+    return file_lock(Path(workspace_dir) / MERGE_DIR)
+
+
+def _sync_head(workspace_dir, graph_name):
+    """Current head, adopting the file on disk when it was changed outside the
+    merge service (e.g. edited by hand) or no head was recorded yet."""
+    disk = _read(Path(workspace_dir) / graph_name)
+    head = _read(_head_path(workspace_dir, graph_name))
+    if disk is not None and disk != head:
+        atomic_write_text(_head_path(workspace_dir, graph_name), disk)
+        return disk
+    return head
+
+
+def record_read(workspace_dir, session_id, graph_name):
+    """Remember the version a session just read as the base of its next write."""
+    with workspace_lock(workspace_dir):
+        head = _sync_head(workspace_dir, graph_name)
+        if head is not None:
+            atomic_write_text(_base_path(workspace_dir, session_id, graph_name), head)
+
+
+def commit_edit(workspace_dir, session_id, graph_name, tool_name, tool_input):
+    """Merge a session's Write/Edit of a graph into the head and write the result.
+
+    A Write replaces the whole file with a version based on the session's
+    last read, so it is merged three-way against the head. An Edit is a
+    patch the tool applied to the current file, so only differences between
+    the edited file and the head need merging. Returns a dict with whether
+    the result differs from the session's version and the conflicts resolved.
+    """
+    workspace_dir = Path(workspace_dir)
+    graph_path = workspace_dir / graph_name
+    with workspace_lock(workspace_dir):
+        disk = _read(graph_path)
+        head = _read(_head_path(workspace_dir, graph_name))
+        if tool_name == 'Write':
+            ours = tool_input.get('content', '')
+        else:
+            ours = disk if disk is not None else ''
+        conflicts = []
+
+        if disk is not None and disk not in (ours, head):
+            # The file no longer holds what the session wrote: it was edited
+            # by hand or another session's Write landed before its hook ran.
+            # The two can't be told apart, so fold the file into the head
+            # without deleting anything rather than adopting it wholesale.
+            if head is None:
+                head = disk
+            else:
+                head, _ = merge_texts('', disk, head)
+                conflicts.append(
+                    f"{graph_name} was changed outside this write (by hand or by another "
+                    f"session): merged its additions, deletions in it were not applied"
+                )
+
+        if tool_name == 'Write':
+            base = _read(_base_path(workspace_dir, session_id, graph_name))
+            if head is None or ours == head or base == head:
+                merged = ours
+            elif base is None:
+                # No recorded read, so the session's deletions can't be told
+                # from the head's additions: the Write replaces the file as-is
+                merged = ours
+                conflicts.append(
+                    f"{graph_name} was written without a recorded read: kept this session's "
+                    f"version, changes committed since were replaced"
+                )
+            else:
+                merged, merge_conflicts = merge_texts(base, ours, head)
+                conflicts.extend(merge_conflicts)
+        else:
+            # The tool patched the file as it was; the file now holds the
+            # session's view. Replaying the patch onto the head and merging
+            # keeps changes the head is missing (e.g. edits made by hand).
+            patched = apply_tool_call(head, tool_name, tool_input) if head is not None else None
+            if patched is None or patched == head or patched == ours:
+                merged = ours
+            else:
+                merged, merge_conflicts = merge_texts(head, ours, patched)
+                conflicts.extend(merge_conflicts)
+
+        if disk != merged:
+            atomic_write_text(graph_path, merged)
+        atomic_write_text(_head_path(workspace_dir, graph_name), merged)
+        # The session now believes the file holds its own version
+        atomic_write_text(_base_path(workspace_dir, session_id, graph_name), ours)
+        _prune_bases(workspace_dir)
+
+    return {'merged': merged != ours, 'conflicts': conflicts}
+
+
+def _prune_bases(workspace_dir, now=None):
+    now = time.time() if now is None else now
+    bases_dir = Path(workspace_dir) / MERGE_DIR / 'bases'
+    try:
+        entries = list(os.scandir(bases_dir))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if now - entry.stat().st_mtime > BASE_TTL_SECONDS:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def graph_file_for(context):
+    """The graph file name a tool call touched in this workspace, or None."""
+    tool_input = context.parsed_input.get('tool_input') or {}
+    file_path = tool_input.get('file_path') if isinstance(tool_input, dict) else None
+    if not isinstance(file_path, str):
+        return None
+    path = Path(file_path)
+    if path.name not in GRAPH_FILES:
+        return None
+    if path.is_absolute() and path.resolve().parent != context.workspace_dir.resolve():
+        return None
+    return path.name
+
+
+def sync_heads(workspace_dir):
+    """Adopt graph files changed outside Claude as the heads."""
+    with workspace_lock(workspace_dir):
+        for graph_name in GRAPH_FILES:
+            _sync_head(workspace_dir, graph_name)
+
+
+def run_plugin(context):
+    """Dispatcher plugin: record graph reads and merge graph writes."""
+    if context.event_type == 'UserPromptSubmit':
+        # Hand edits usually happen between prompts. Adopting them now lets
+        # a later Write based on an earlier Read merge with them instead of
+        # overwriting them.
+        if (Path(context.workspace_dir) / MERGE_DIR).is_dir():
+            sync_heads(context.workspace_dir)
+        return
+    if context.event_type != 'PostToolUse':
+        return
+    graph_name = graph_file_for(context)
+    if graph_name is None:
+        return
+    tool_name = context.parsed_input.get('tool_name')
+    if tool_name == 'Read':
+        record_read(context.workspace_dir, context.session_id, graph_name)
+    elif tool_name in EDIT_TOOLS:
+        result = commit_edit(
+            context.workspace_dir, context.session_id, graph_name,
+            tool_name, context.parsed_input.get('tool_input') or {}
+        )
+        for conflict in result['conflicts']:
+            print(f"Graph merge ({graph_name}): {conflict}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Three-way merge of Mermaid knowledge graphs'
+    )
+    parser.add_argument('base', help='Common ancestor version')
+    parser.add_argument('ours', help='Our version (wins conflicting changes)')
+    parser.add_argument('theirs', help='Their version')
+    parser.add_argument('-o', '--output', help='Write the merged graph here (default: stdout)')
+
+    args = parser.parse_args()
+
+    try:
+        texts = [Path(p).read_text() for p in (args.base, args.ours, args.theirs)]
+        merged, conflicts = merge_texts(*texts)
+        if args.output:
+            atomic_write_text(args.output, merged)
+        else:
+            sys.stdout.write(merged)
+        for conflict in conflicts:
+            print(f"⚠️  {conflict}", file=sys.stderr)
+        return 0
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
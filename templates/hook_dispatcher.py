@@ -0,0 +1,136 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["numpy"]
+# ///
+
+"""
+Single hook entry point for Claude Code.
+Reads and parses stdin once, loads workspace state lazily and once, and runs
+the hook plugins (event capture, learning context injection, ...) in order.
+Independent I/O such as the server send runs on worker threads so it
+overlaps with the remaining plugins.
+"""
+
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Plugins live next to this file in .claude/hooks/
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from capture_events import determine_event_type
+from mermaid_graph import read_mermaid
+from workspace_store import read_json
+
+# Plugin modules run in this order; each exposes run_plugin(context).
+# HOOK_PLUGINS (comma-separated module names) overrides the list.
+# graph_merge goes first so the other plugins see the merged graphs.
+PLUGINS = ['graph_merge', 'capture_events', 'inject_learning_context']
+
+# How long to wait for background work (e.g. the server send) before exiting
+BACKGROUND_TIMEOUT = 5.0
+
+
+class HookContext:
+    """Per-invocation state shared by every plugin."""
+
+    def __init__(self, stdin_data, parsed_input, event_type, workspace_dir=None):
+        self.stdin_data = stdin_data
+        self.parsed_input = parsed_input
+        self.event_type = event_type
+        self.session_id = parsed_input.get('session_id', 'unknown')
+        self.workspace_dir = Path(workspace_dir or Path.cwd())
+        # Text printed to stdout when all plugins have run (None = no output)
+        self.output = None
+        self._cache = {}
+        self._threads = []
+
+    def _load(self, key, loader):
+        if key not in self._cache:
+            self._cache[key] = loader()
+        return self._cache[key]
+
+    @property
+    def user_data(self):
+        """Parsed user.json, read on first use."""
+        return self._load('user_data', lambda: read_json(self.workspace_dir / 'user.json'))
+
+    @property
+    def claude_graph(self):
+        """Claude's knowledge graph as a MermaidGraph, parsed on first use."""
+        return self._load(
+            'claude_graph', lambda: read_mermaid(self.workspace_dir / 'claude_knowledge_graph.mmd')
+        )
+
+    @property
+    def user_graph(self):
+        """The user's knowledge graph as a MermaidGraph, parsed on first use."""
+        return self._load(
+            'user_graph', lambda: read_mermaid(self.workspace_dir / 'user_knowledge_graph.mmd')
+        )
+
+    def run_in_background(self, fn, *args):
+        """Run fn(*args) on a worker thread, joined before the hook exits."""
+        thread = threading.Thread(target=fn, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def join_background(self, timeout=BACKGROUND_TIMEOUT):
+        """Wait for background work, sharing one deadline across all threads."""
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                print("Hook background work timed out", file=sys.stderr)
+                break
+
+
+def plugin_names():
+    """Plugin module names in run order."""
+    override = os.environ.get('HOOK_PLUGINS')
+    if override is not None:
+        return [name.strip() for name in override.split(',') if name.strip()]
+    return PLUGINS
+
+
+def run_plugins(context, names=None):
+    """Run each plugin in order; a failing plugin is reported and skipped."""
+    for name in names or plugin_names():
+        try:
+            module = importlib.import_module(name)
+            module.run_plugin(context)
+        except Exception as e:
+            print(f"Hook plugin {name} error: {e}", file=sys.stderr)
+
+
+def main():
+    try:
+        stdin_data = sys.stdin.read()
+        try:
+            parsed_input = json.loads(stdin_data)
+        except json.JSONDecodeError:
+            parsed_input = {'raw_stdin': stdin_data}
+        if not isinstance(parsed_input, dict):
+            parsed_input = {'raw_stdin': stdin_data}
+
+        context = HookContext(stdin_data, parsed_input, determine_event_type(parsed_input))
+        run_plugins(context)
+
+        if context.output is not None:
+            print(context.output)
+            sys.stdout.flush()
+        context.join_background()
+
+    except Exception as e:
+        print(f"Hook dispatcher error: {e}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
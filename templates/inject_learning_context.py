@@ -8,46 +8,29 @@ Encourages proactive knowledge graph updates during conversations.
 import json
 import sys
 from pathlib import Path
-from datetime import datetime
+
+from concept_relevance import rank_concepts
+from mermaid_graph import read_mermaid
+from review_queue import due_reviews as load_due_reviews
+from workspace_store import read_json
+
+# Concepts injected per prompt
+KNOWN_LIMIT = 10
+GAP_LIMIT = 5
+REVIEW_LIMIT = 3
 
 def read_json_safely(filepath):
-    """Safely read JSON file, return empty dict if not found or invalid."""
-    try:
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        pass
-    return {}
+    """Safely read JSON file, return empty dict if not found or invalid.
+
+    Files are written atomically by workspace_store, and read_json retries
+    briefly if it catches another writer mid-write.
+    """
+    return read_json(filepath)
 
 def parse_mermaid_graph(filepath):
-    """Extract nodes and relationships from Mermaid graph file."""
-    concepts = []
-    relationships = []
-    
-    try:
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                lines = f.readlines()
-                
-            for line in lines:
-                line = line.strip()
-                # Extract node definitions (various Mermaid formats)
-                if '[' in line and ']' in line:
-                    start = line.find('[')
-                    end = line.find(']')
-                    concept = line[start+1:end].strip('"').strip("'")
-                    if concept and concept not in ['graph TD', 'graph LR']:
-                        concepts.append(concept)
-                
-                # Extract relationships (arrows)
-                if '-->' in line or '---' in line:
-                    relationships.append(line)
-                    
-    except IOError:
-        pass
-    
-    return concepts, relationships
+    """Extract concept labels and (from, to, relation) edges from a Mermaid graph file."""
+    graph = read_mermaid(filepath)
+    return graph.labels(), graph.label_edges()
 
 def analyze_knowledge_gaps(claude_concepts, user_concepts):
     """Identify concepts Claude knows that user doesn't."""
@@ -58,7 +41,7 @@ def analyze_knowledge_gaps(claude_concepts, user_concepts):
     # Prioritize fundamental concepts (shorter names often = more fundamental)
     gaps.sort(key=lambda x: (len(x), x))
     
-    return gaps[:5]  # Top 5 gaps
+    return gaps[:GAP_LIMIT]
 
 def extract_recent_topics(user_data):
     """Extract recent learning topics from user profile."""
@@ -98,21 +81,34 @@ def get_learning_style(user_data):
             
     return style
 
-def build_context_injection(original_prompt):
-    """Build the context injection for the prompt."""
+def build_context_injection(original_prompt, user_data=None, claude_concepts=None, user_concepts=None,
+                            due_reviews=None):
+    """Build the context injection for the prompt.
+
+    Knowledge state not passed in (e.g. already loaded by the hook
+    dispatcher) is read from the current workspace.
+    """
     workspace_dir = Path.cwd()
     
     # Read knowledge files
-    user_json_path = workspace_dir / 'user.json'
-    claude_graph_path = workspace_dir / 'claude_knowledge_graph.mmd'
-    user_graph_path = workspace_dir / 'user_knowledge_graph.mmd'
-    
-    user_data = read_json_safely(user_json_path)
-    claude_concepts, _ = parse_mermaid_graph(claude_graph_path)
-    user_concepts, _ = parse_mermaid_graph(user_graph_path)
+    if user_data is None:
+        user_data = read_json_safely(workspace_dir / 'user.json')
+    if claude_concepts is None:
+        claude_concepts, _ = parse_mermaid_graph(workspace_dir / 'claude_knowledge_graph.mmd')
+    if user_concepts is None:
+        user_concepts, _ = parse_mermaid_graph(workspace_dir / 'user_knowledge_graph.mmd')
+    if due_reviews is None:
+        due_reviews = [concept for concept, _ in load_due_reviews(workspace_dir, REVIEW_LIMIT, user_data=user_data)]
     
-    # Analyze knowledge state
-    knowledge_gaps = analyze_knowledge_gaps(claude_concepts, user_concepts)
+    # Analyze knowledge state: the known concepts and gaps most relevant to the prompt
+    try:
+        relevant_concepts, knowledge_gaps = rank_concepts(
+            workspace_dir, original_prompt, claude_concepts, user_concepts, KNOWN_LIMIT, GAP_LIMIT
+        )
+    except Exception as e:
+        print(f"Relevance ranking error: {e}", file=sys.stderr)
+        relevant_concepts = user_concepts[:KNOWN_LIMIT]
+        knowledge_gaps = analyze_knowledge_gaps(claude_concepts, user_concepts)
     recent_topics = extract_recent_topics(user_data)
     learning_style = get_learning_style(user_data)
     
@@ -120,11 +116,14 @@ def build_context_injection(original_prompt):
     context_parts = []
     
     # Add learning context if we have meaningful data
-    if user_concepts or knowledge_gaps or recent_topics:
+    if relevant_concepts or knowledge_gaps or recent_topics or due_reviews:
         context_parts.append("[LEARNING CONTEXT]")
         
-        if user_concepts:
-            context_parts.append(f"User knows: {', '.join(user_concepts[:10])}")
+        if relevant_concepts:
+            context_parts.append(f"User knows: {', '.join(relevant_concepts)}")
+        
+        if due_reviews:
+            context_parts.append(f"Due for review: {', '.join(due_reviews)}")
         
         if knowledge_gaps:
             context_parts.append(f"Focus areas: {', '.join(knowledge_gaps)}")
@@ -154,13 +153,36 @@ def build_context_injection(original_prompt):
     context_parts.append("- Track concept mastery: introduced → explained_back → mastered")
     context_parts.append("- Suggest next learning steps based on interests")
     context_parts.append("- Update knowledge graphs as new concepts are learned")
-    context_parts.append("- Update user.json with progress and preferences discovered")
+    context_parts.append("- Update user.json with progress and preferences discovered (python3 .claude/hooks/workspace_store.py patch user.json '{...}')")
     context_parts.append("- Add key insights to ./kb repository")
     context_parts.append("- The more the user shares, the better you can help")
     context_parts.append("- Remember: User explanation = Knowledge graph update")
+    if due_reviews:
+        context_parts.append("- Weave in a quick recall question on one 'Due for review' concept, then grade it:")
+        context_parts.append("  python3 .claude/hooks/review_queue.py review \"<concept>\" -q <0-5>")
     
     return '\n'.join(context_parts)
 
+def run_plugin(context):
+    """Dispatcher plugin: enhance UserPromptSubmit prompts using the shared workspace state."""
+    if context.event_type != 'UserPromptSubmit':
+        return
+    original_prompt = context.parsed_input.get('prompt', '')
+    if not original_prompt:
+        return
+    context.output = build_context_injection(
+        original_prompt,
+        user_data=context.user_data,
+        claude_concepts=context.claude_graph.labels(),
+        user_concepts=context.user_graph.labels(),
+        due_reviews=[
+            concept for concept, _ in load_due_reviews(
+                context.workspace_dir, REVIEW_LIMIT,
+                user_data=context.user_data, user_graph=context.user_graph
+            )
+        ]
+    )
+
 def main():
     """Main hook function."""
     try:
@@ -0,0 +1,195 @@
+"""
+Mermaid knowledge graph parsing shared by the hooks and command-line tools.
+Understands the flowchart subset the knowledge graphs are written in: node
+definitions, chained edges with optional labels, and subgraphs.
+"""
+
+import re
+
+DIRECTIVE_RE = re.compile(r'^(graph|flowchart|classDef|class|style|linkStyle|click)(\s|$)')
+
+# Edge operators: -->, ---, -.->, -.-, ==>, ===, optionally followed by |label|
+EDGE_SPLIT_RE = re.compile(r'\s*(-->|---|-\.->|-\.-|==>|===)\s*(?:\|\s*"?([^|"]*)"?\s*\|\s*)?')
+
+# Node reference with optional shape: A, A[Label], A["Label"], A(Label), A((Label)), A{Label}, A[[Label]]
+NODE_RE = re.compile(
+    r'^(\w+)\s*'
+    r'(?:(\[\[|\(\(|\[\(|\(\[|\[|\(|\{\{|\{|>)\s*(.*?)\s*(\]\]|\)\)|\)\]|\]\)|\]|\)|\}\}|\}))?'
+    r'(?::::\w+)?$'
+)
+
+DEFAULT_EDGE_OP = '-->'
+# Mermaid has no backslash escapes; a double quote inside a quoted label is
+# written as this entity
+QUOTE_ENTITY = '#quot;'
+
+SUBGRAPH_RE = re.compile(r'^subgraph\s+(?:(\w+)\s*\[\s*"?([^"\]]*)"?\s*\]|"([^"]*)"|(.+))$')
+
+# Labels of the placeholder nodes the SessionStart init writes into new
+# graphs (capture_events.py); they stand for no concept
+PLACEHOLDER_LABELS = frozenset({
+    'Ready to learn about your topic',
+    'User starting learning journey',
+})
+
+
+class MermaidGraph:
+    """Nodes (id -> label), labelled edges and subgraph membership of one diagram.
+
+    edge_ops maps (from_id, to_id) to the edge's operator when it is not
+    the plain -->, so a rendered graph keeps dotted and thick edges.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.edges = []
+        self.edge_ops = {}
+        self.subgraphs = {}
+        self.node_subgraph = {}
+
+    def add_node(self, node_id, label=None, subgraph=None):
+        """Add a node, upgrading a bare-id label when a real label appears later."""
+        current = self.nodes.get(node_id)
+        if current is None or (label and current == node_id):
+            self.nodes[node_id] = label or current or node_id
+        if subgraph and node_id not in self.node_subgraph:
+            self.node_subgraph[node_id] = subgraph
+            self.subgraphs.setdefault(subgraph, []).append(node_id)
+
+    def labels(self):
+        """Concept labels in definition order."""
+        return list(self.nodes.values())
+
+    def label_edges(self):
+        """Edges as (from_label, to_label, relation) triples."""
+        return [(self.nodes.get(a, a), self.nodes.get(b, b), rel) for a, b, rel in self.edges]
+
+    def parents(self):
+        """Map each node id to the set of node ids with an edge into it."""
+        parents = {node_id: set() for node_id in self.nodes}
+        for src, dst, _ in self.edges:
+            if src != dst:
+                parents.setdefault(dst, set()).add(src)
+        return parents
+
+    def children(self):
+        """Map each node id to its child node ids, in edge order."""
+        children = {node_id: [] for node_id in self.nodes}
+        for src, dst, _ in self.edges:
+            if src != dst and dst not in children.setdefault(src, []):
+                children[src].append(dst)
+        return children
+
+
+def _clean_label(label):
+    label = label.strip()
+    if len(label) >= 2 and label[0] == label[-1] and label[0] in '"\'':
+        label = label[1:-1]
+    return _unescape(label).strip()
+
+
+def _unescape(text):
+    # Older renders escaped quotes with a backslash
+    return text.replace(QUOTE_ENTITY, '"').replace('\\"', '"')
+
+
+def _parse_node(token):
+    """Parse one node reference into (node_id, label or None)."""
+    match = NODE_RE.match(token.strip())
+    if not match:
+        return None, None
+    node_id, _, label, _ = match.groups()
+    return node_id, (_clean_label(label) if label else None)
+
+
+def parse_mermaid(text):
+    """Parse Mermaid flowchart text into a MermaidGraph."""
+    graph = MermaidGraph()
+    current_subgraph = None
+
+    for raw_line in (text or '').splitlines():
+        line = raw_line.split('%%', 1)[0].strip().rstrip(';')
+        if not line or DIRECTIVE_RE.match(line):
+            continue
+
+        if line.startswith('subgraph'):
+            match = SUBGRAPH_RE.match(line)
+            if match:
+                sub_id, sub_label, quoted, bare = match.groups()
+                current_subgraph = _unescape(sub_label or quoted or sub_id or bare.strip())
+                graph.subgraphs.setdefault(current_subgraph, [])
+            continue
+        if line == 'end':
+            current_subgraph = None
+            continue
+
+        parts = EDGE_SPLIT_RE.split(line)
+        # parts = [node, op, label, node, op, label, node, ...]
+        previous_id = None
+        for index in range(0, len(parts), 3):
+            node_id, label = _parse_node(parts[index])
+            if node_id is None:
+                previous_id = None
+                continue
+            graph.add_node(node_id, label, current_subgraph)
+            if previous_id is not None:
+                operator, relation = parts[index - 2], parts[index - 1]
+                graph.edges.append((previous_id, node_id, _unescape(relation or '').strip()))
+                if operator != DEFAULT_EDGE_OP:
+                    graph.edge_ops[(previous_id, node_id)] = operator
+            previous_id = node_id
+
+    return graph
+
+
+def read_mermaid(path):
+    """Parse a .mmd file, returning an empty graph if it is missing or unreadable."""
+    try:
+        with open(path, 'r') as f:
+            return parse_mermaid(f.read())
+    except (IOError, UnicodeDecodeError):
+        return MermaidGraph()
+
+
+def learning_frontier(claude_graph, user_labels):
+    """Gaps whose prerequisites (parents in Claude's graph) the user already knows.
+
+    These are the concepts that can be learned next, in graph order.
+    """
+    user_labels = set(user_labels)
+    parents = claude_graph.parents()
+    return [
+        label for node_id, label in claude_graph.nodes.items()
+        if label not in user_labels and all(
+            claude_graph.nodes.get(parent, parent) in user_labels for parent in parents.get(node_id, ())
+        )
+    ]
+
+
+def _quote(label):
+    return '"' + label.replace('"', QUOTE_ENTITY) + '"'
+
+
+def render_mermaid(graph, direction='TD'):
+    """Render a MermaidGraph back to Mermaid text, grouping nodes by subgraph."""
+    lines = [f'graph {direction}']
+    grouped = set()
+    for title, node_ids in graph.subgraphs.items():
+        members = [n for n in node_ids if n in graph.nodes]
+        if not members:
+            continue
+        lines.append(f'    subgraph {_quote(title)}')
+        for node_id in members:
+            lines.append(f'        {node_id}[{_quote(graph.nodes[node_id])}]')
+            grouped.add(node_id)
+        lines.append('    end')
+    for node_id, label in graph.nodes.items():
+        if node_id not in grouped:
+            lines.append(f'    {node_id}[{_quote(label)}]')
+    for src, dst, relation in graph.edges:
+        operator = graph.edge_ops.get((src, dst), DEFAULT_EDGE_OP)
+        if relation:
+            lines.append(f'    {src} {operator}|{_quote(relation)}| {dst}')
+        else:
+            lines.append(f'    {src} {operator} {dst}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Spaced-repetition review queue for mastered concepts.
+Keeps each concept's next-due time and ease (SM-2 style) in a SQLite table
+(review_queue.db next to user.json) indexed by due time, so listing the most
+overdue concepts is an index range scan and a review updates a single row.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from mermaid_graph import PLACEHOLDER_LABELS, read_mermaid
+from workspace_store import read_json
+
+QUEUE_DB = 'review_queue.db'
+# Queue file of older workspaces, imported once into QUEUE_DB
+LEGACY_QUEUE_FILE = 'review_queue.json'
+DAY_SECONDS = 24 * 60 * 60
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Intervals (days) for the first two successful reviews, as in SM-2
+FIRST_INTERVALS = (1, 6)
+PASSING_QUALITY = 3
+
+ITEM_FIELDS = ('due', 'ease', 'interval', 'reps', 'lapses', 'last_review')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    concept TEXT PRIMARY KEY,
+    due REAL NOT NULL,
+    ease REAL NOT NULL,
+    interval REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    lapses INTEGER NOT NULL,
+    last_review REAL
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_due ON reviews (due, concept);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error. Taking the write lock
+    up front serializes read-modify-write cycles across hook processes."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+class ReviewQueue:
+    """Concepts ordered by due time, stored in a workspace's review_queue.db.
+
+    Items are dicts of {due, ease, interval, reps, lapses, last_review}. The
+    (due, concept) index serves due() without reading the whole table, and
+    add/remove/review each touch one row, so their cost is O(log n) in the
+    B-tree. Only sync() reads every concept, and it runs only when the
+    user graph or user.json changed.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def transaction(self):
+        return _Transaction(self.conn)
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM reviews').fetchone()[0]
+
+    def __contains__(self, concept):
+        return self.get(concept) is not None
+
+    def get(self, concept):
+        """The item scheduled for a concept, or None."""
+        row = self.conn.execute(
+            f'SELECT {", ".join(ITEM_FIELDS)} FROM reviews WHERE concept = ?', (concept,)
+        ).fetchone()
+        return dict(zip(ITEM_FIELDS, row)) if row else None
+
+    def _put(self, concept, item):
+        self.conn.execute(
+            f'INSERT OR REPLACE INTO reviews (concept, {", ".join(ITEM_FIELDS)}) '
+            f'VALUES (?, {", ".join("?" * len(ITEM_FIELDS))})',
+            (concept,) + tuple(item[field] for field in ITEM_FIELDS)
+        )
+
+    @staticmethod
+    def new_item(now):
+        return {
+            'due': now + FIRST_INTERVALS[0] * DAY_SECONDS,
+            'ease': DEFAULT_EASE,
+            'interval': FIRST_INTERVALS[0],
+            'reps': 0,
+            'lapses': 0,
+            'last_review': None,
+        }
+
+    def add(self, concept, now=None):
+        """Start tracking a newly mastered concept; first review is due in a day."""
+        if concept in self:
+            return False
+        self._put(concept, self.new_item(time.time() if now is None else now))
+        return True
+
+    def remove(self, concept):
+        """Stop tracking a concept (e.g. removed from the user's graph)."""
+        return self.conn.execute('DELETE FROM reviews WHERE concept = ?', (concept,)).rowcount > 0
+
+    def due(self, now=None, limit=5):
+        """Up to limit (concept, item) pairs due at now, most overdue first."""
+        now = time.time() if now is None else now
+        rows = self.conn.execute(
+            f'SELECT concept, {", ".join(ITEM_FIELDS)} FROM reviews '
+            f'WHERE due <= ? ORDER BY due, concept LIMIT ?',
+            (now, limit)
+        )
+        return [(row[0], dict(zip(ITEM_FIELDS, row[1:]))) for row in rows]
+
+    def review(self, concept, quality, now=None):
+        """Reschedule a concept after a review graded 0-5 (SM-2). Returns its item."""
+        item = self.get(concept)
+        if item is None:
+            raise KeyError(concept)
+        quality = max(0, min(5, int(quality)))
+        now = time.time() if now is None else now
+
+        if quality < PASSING_QUALITY:
+            item['reps'] = 0
+            item['lapses'] += 1
+            item['interval'] = FIRST_INTERVALS[0]
+        else:
+            item['reps'] += 1
+            if item['reps'] <= len(FIRST_INTERVALS):
+                item['interval'] = FIRST_INTERVALS[item['reps'] - 1]
+            else:
+                item['interval'] = round(item['interval'] * item['ease'], 1)
+        item['ease'] = max(
+            MIN_EASE,
+            round(item['ease'] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02), 3)
+        )
+        item['due'] = now + item['interval'] * DAY_SECONDS
+        item['last_review'] = now
+
+        self._put(concept, item)
+        return item
+
+    def sync(self, mastered, now=None):
+        """Track exactly the given mastered concepts: add new ones, drop removed ones."""
+        mastered = set(mastered)
+        tracked = {row[0] for row in self.conn.execute('SELECT concept FROM reviews')}
+        self.conn.executemany(
+            'DELETE FROM reviews WHERE concept = ?', [(c,) for c in tracked - mastered]
+        )
+        now = time.time() if now is None else now
+        for concept in sorted(mastered - tracked):
+            self._put(concept, self.new_item(now))
+
+    @property
+    def sources(self):
+        """Stamps of user.json and the user graph at the last sync."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'sources'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    @sources.setter
+    def sources(self, sources):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('sources', ?)", (json.dumps(sources),)
+        )
+
+    def import_items(self, items):
+        """Import {concept: item} scheduled by an older review_queue.json."""
+        for concept, item in (items or {}).items():
+            if isinstance(item, dict) and all(field in item for field in ITEM_FIELDS):
+                self._put(concept, item)
+
+
+def mastered_concepts(user_data, user_graph_labels=()):
+    """Concepts the user has mastered: the user graph plus user.json progress lists.
+
+    The init placeholder node of a new user graph is not a concept.
+    """
+    progress = (user_data or {}).get('progress', {}) or {}
+    concepts = set(user_graph_labels)
+    for key in ('concepts_mastered', 'concepts_learned'):
+        concepts.update(c for c in progress.get(key, []) if isinstance(c, str))
+    concepts.discard('')
+    return concepts - PLACEHOLDER_LABELS
+
+
+def _source_stamp(path):
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def open_queue(workspace_dir):
+    """Open (creating if needed) a workspace's review queue.
+
+    The connection autocommits; group changes with queue.transaction(). A
+    queue left by an older version in review_queue.json is imported on first
+    open. The caller closes queue.conn.
+    """
+    workspace_dir = Path(workspace_dir)
+    # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(str(workspace_dir / QUEUE_DB), timeout=5, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.executescript(SCHEMA)
+    queue = ReviewQueue(conn)
+
+    legacy = workspace_dir / LEGACY_QUEUE_FILE
+    if legacy.exists():
+        with queue.transaction():
+            if legacy.exists():
+                data = read_json(legacy)
+                queue.import_items(data.get('items'))
+                queue.sources = data.get('sources')
+                legacy.unlink()
+    return queue
+
+
+def due_reviews(workspace_dir, limit=5, now=None, user_data=None, user_graph=None):
+    """Top due reviews for a workspace, first syncing newly mastered concepts.
+
+    The sync (which reads every tracked concept) only runs when user.json or
+    user_knowledge_graph.mmd changed since the last one, so a typical hook
+    run is one indexed query returning at most limit rows.
+    """
+    workspace_dir = Path(workspace_dir)
+    sources = {
+        'user.json': _source_stamp(workspace_dir / 'user.json'),
+        'user_knowledge_graph.mmd': _source_stamp(workspace_dir / 'user_knowledge_graph.mmd'),
+    }
+
+    queue = open_queue(workspace_dir)
+    try:
+        if queue.sources != sources:
+            with queue.transaction():
+                if queue.sources != sources:
+                    if user_data is None:
+                        user_data = read_json(workspace_dir / 'user.json')
+                    if user_graph is None:
+                        user_graph = read_mermaid(workspace_dir / 'user_knowledge_graph.mmd')
+                    queue.sync(mastered_concepts(user_data, user_graph.labels()), now)
+                    queue.sources = sources
+        return queue.due(now, limit)
+    finally:
+        queue.conn.close()
+
+
+def record_review(workspace_dir, concept, quality, now=None):
+    """Grade a review and persist the new schedule (one row update)."""
+    queue = open_queue(workspace_dir)
+    try:
+        with queue.transaction():
+            return queue.review(concept, quality, now)
+    finally:
+        queue.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Spaced-repetition review queue for mastered concepts'
+    )
+    parser.add_argument(
+        '-w', '--workspace', default='.',
+        help='Workspace directory (default: current directory)'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    due_parser = subparsers.add_parser('due', help='List concepts due for review')
+    due_parser.add_argument('-n', '--limit', type=int, default=10, help='Maximum concepts (default: 10)')
+
+    review_parser = subparsers.add_parser('review', help='Record a review and reschedule the concept')
+    review_parser.add_argument('concept', help='Concept label as it appears in the user graph')
+    review_parser.add_argument(
+        '-q', '--quality', type=int, required=True, choices=range(6),
+        help='Recall quality: 0 = forgot ... 3 = recalled with effort ... 5 = perfect'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'due':
+            for concept, item in due_reviews(args.workspace, args.limit):
+                overdue = (time.time() - item['due']) / DAY_SECONDS
+                print(f"  • {concept} (overdue {overdue:.1f}d, ease {item['ease']})")
+            return 0
+
+        item = record_review(args.workspace, args.concept, args.quality)
+        print(f"✓ {args.concept}: next review in {item['interval']} days (ease {item['ease']})")
+        return 0
+
+    except KeyError:
+        print(f"Error: '{args.concept}' is not in the review queue", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
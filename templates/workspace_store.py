@@ -0,0 +1,201 @@
+"""
+Workspace storage helpers shared by the hooks and setup_workspace.py.
+Provides atomic writes, advisory file locking and JSON merge-patch updates
+so concurrent sessions never see torn files or lose each other's writes.
+Run as a script, it applies a merge patch to a workspace JSON file:
+
+    python3 .claude/hooks/workspace_store.py patch user.json '{"progress": {...}}'
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to best-effort, lock-free behaviour
+    fcntl = None
+
+LOCK_SUFFIX = '.lock'
+READ_RETRIES = 5
+READ_RETRY_DELAY = 0.02
+
+
+def lock_path_for(path):
+    """Return the hidden sidecar lock file used to guard writes to path."""
+    path = Path(path)
+    return path.with_name('.' + path.name + LOCK_SUFFIX)
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Hold an advisory lock on path's sidecar lock file for the block."""
+    lock_path = lock_path_for(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_directory(directory):
+    """Flush a directory entry so a completed rename survives a crash."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    try:
+        fd = os.open(str(directory), os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path, content, mode=None):
+    """Write content (str or bytes) to path via fsync'd temp file and rename.
+
+    Readers either see the previous complete file or the new complete file,
+    never a partially written one. Callers that read-modify-write should hold
+    file_lock(path) around the whole sequence.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(content, bytes) else 'w') as tmp_file:
+            tmp_file.write(content)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        if mode is not None:
+            os.chmod(tmp_name, mode)
+        elif path.exists():
+            os.chmod(tmp_name, path.stat().st_mode & 0o777)
+        else:
+            os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, str(path))
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(path.parent)
+
+
+def atomic_write_json(path, data):
+    """Serialize data and write it atomically to path."""
+    atomic_write_text(path, json.dumps(data, indent=2))
+
+
+def write_text_if_missing(path, content):
+    """Create path with content unless it already exists. Returns True if written."""
+    path = Path(path)
+    with file_lock(path):
+        if path.exists():
+            return False
+        atomic_write_text(path, content)
+        return True
+
+
+def read_json(path, default=None):
+    """Read JSON from path, retrying briefly if a non-atomic writer is mid-write.
+
+    Returns default (an empty dict if not given) when the file is missing or
+    stays unparseable after the retries.
+    """
+    path = Path(path)
+    for attempt in range(READ_RETRIES):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            break
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            time.sleep(READ_RETRY_DELAY * (attempt + 1))
+        except IOError:
+            break
+    return {} if default is None else default
+
+
+def merge_patch(target, patch):
+    """Apply an RFC 7386 JSON merge patch and return the merged value.
+
+    Objects are merged recursively, null removes a key and any other value
+    (including lists) replaces the target wholesale. Inputs are not mutated.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def update_json(path, patch):
+    """Merge-patch the JSON document at path under an exclusive lock.
+
+    patch may be a dict (applied as a merge patch) or a callable receiving
+    the current document and returning the new one. A missing or corrupt file
+    is treated as an empty object. Returns the document that was written.
+    """
+    path = Path(path)
+    with file_lock(path):
+        current = read_json(path)
+        if callable(patch):
+            updated = patch(current)
+        else:
+            updated = merge_patch(current, patch)
+        atomic_write_json(path, updated)
+        return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Update workspace JSON files without losing concurrent writes'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    patch_parser = commands.add_parser(
+        'patch', help='Apply a JSON merge patch (RFC 7386) to a file under its lock'
+    )
+    patch_parser.add_argument('path', help='JSON file to update, e.g. user.json')
+    patch_parser.add_argument(
+        'patch', nargs='?', default='-',
+        help='Merge patch as JSON; null removes a key (default: read from stdin)'
+    )
+
+    args = parser.parse_args()
+    try:
+        patch = json.loads(sys.stdin.read() if args.patch == '-' else args.patch)
+    except json.JSONDecodeError as e:
+        print(f"Error: patch is not valid JSON: {e}", file=sys.stderr)
+        return 1
+    if not isinstance(patch, dict):
+        print("Error: patch must be a JSON object", file=sys.stderr)
+        return 1
+
+    try:
+        update_json(args.path, patch)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"✅ Updated {args.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Shared pytest setup: make the top-level scripts and hook modules importable."""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Hook helper modules live in templates/ so they can be shipped into workspaces
+sys.path.insert(0, str(ROOT_DIR / 'templates'))
+sys.path.insert(0, str(ROOT_DIR))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the Claude CLI when testing research_orchestrator.py.
+Called as `stub_claude.py -p <prompt>` in the workspace, it writes every file
+in $RESEARCH_OUTPUTS and logs the call to kb/logs/stub_calls.ndjson.
+Misbehaviour for tests is switched on through the environment:
+
+    STUB_CLAUDE_SLEEP     seconds to sleep before writing
+    STUB_CLAUDE_FAIL      number of first attempts per stage that exit with status 1
+    STUB_CLAUDE_NO_WRITE  exit successfully without writing anything
+    STUB_CLAUDE_ONLY      comma-separated stages the settings above apply to (default: all)
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+CALLS_FILE = Path('kb') / 'logs' / 'stub_calls.ndjson'
+
+
+def stub_content(stage, output):
+    """Plausible content for one output file."""
+    if output.endswith('.mmd'):
+        return f'graph TD\n    A["{stage} root"] --> B["{stage} concept"]\n'
+    return f'# {stage}\n\nStub research written to {output}.\n'
+
+
+def main():
+    stage = os.environ.get('RESEARCH_STAGE', 'unknown')
+    outputs = [o for o in os.environ.get('RESEARCH_OUTPUTS', '').split(os.pathsep) if o]
+    only = os.environ.get('STUB_CLAUDE_ONLY')
+    applies = not only or stage in only.split(',')
+
+    started = time.time()
+    attempts_file = Path('kb') / 'logs' / f'stub_{stage}.attempts'
+    attempts_file.parent.mkdir(parents=True, exist_ok=True)
+    attempt = int(attempts_file.read_text()) + 1 if attempts_file.exists() else 1
+    attempts_file.write_text(str(attempt))
+
+    if applies:
+        time.sleep(float(os.environ.get('STUB_CLAUDE_SLEEP', 0)))
+    failed = applies and attempt <= int(os.environ.get('STUB_CLAUDE_FAIL', 0))
+    if not failed and not (applies and os.environ.get('STUB_CLAUDE_NO_WRITE')):
+        for output in outputs:
+            Path(output).parent.mkdir(parents=True, exist_ok=True)
+            Path(output).write_text(stub_content(stage, output))
+
+    with open(CALLS_FILE, 'a') as f:
+        f.write(json.dumps({'stage': stage, 'attempt': attempt, 'start': started, 'end': time.time()}) + '\n')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
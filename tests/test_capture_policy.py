@@ -0,0 +1,95 @@
+"""Tests for the capture policy applied by the event hook."""
+
+import json
+
+from capture_policy import CAPTURE_FULL, CAPTURE_STUB, TRUNCATION_MARKER, CapturePolicy
+from conftest import ROOT_DIR
+
+DEFAULT_POLICY = json.loads((ROOT_DIR / 'templates' / 'capture_policy.json').read_text())
+
+
+def tool_event(tool_name, tool_input, tool_response=None):
+    return {
+        'session_id': 'session-1',
+        'event_type': 'PostToolUse',
+        'timestamp': 1700000000000,
+        'workspace': 'linear-algebra',
+        'working_directory': '/home/ada/linear-algebra',
+        'stdin_data': {'tool_name': tool_name, 'tool_input': tool_input},
+        'tool_name': tool_name,
+        'tool_input': tool_input,
+        'tool_response': tool_response or {},
+    }
+
+
+def test_filtered_tools_are_sent_as_stubs():
+    policy = CapturePolicy(DEFAULT_POLICY)
+    assert policy.capture_level('PostToolUse', 'Write') == CAPTURE_FULL
+    assert policy.capture_level('PostToolUse', 'Read') == CAPTURE_STUB
+
+    shaped = policy.shape(tool_event('Read', {'file_path': '/etc/hosts'}), CAPTURE_STUB)
+    assert shaped == {
+        'session_id': 'session-1',
+        'event_type': 'PostToolUse',
+        'timestamp': 1700000000000,
+        'workspace': 'linear-algebra',
+        'working_directory': '/home/ada/linear-algebra',
+        'tool_name': 'Read',
+        'stub': True,
+    }
+
+
+def test_sampled_out_events_are_not_sent():
+    policy = CapturePolicy({'sample_rates': {'PostToolUse': 0.0}})
+    assert policy.capture_level('PostToolUse', 'Write') is None
+    assert policy.capture_level('Stop') == CAPTURE_FULL
+
+
+def test_graph_writes_are_never_sampled_or_filtered_out():
+    policy = CapturePolicy({
+        'tools': {'include': ['Task'], 'exclude': ['Write']},
+        'sample_rates': {'PostToolUse': 0.0},
+    })
+    graph = {'file_path': '/home/ada/linear-algebra/user_knowledge_graph.mmd', 'content': 'graph TD\n'}
+    notes = {'file_path': '/home/ada/linear-algebra/kb/notes.md', 'content': 'Eigenvalues'}
+    for tool_name in ('Write', 'Edit', 'MultiEdit'):
+        assert policy.capture_level('PostToolUse', tool_name, graph) == CAPTURE_FULL
+        assert policy.capture_level('PostToolUse', tool_name, notes) is None
+    assert policy.capture_level('PostToolUse', 'Read', graph) is None
+
+
+def test_graph_writes_are_never_truncated():
+    policy = CapturePolicy({'max_field_chars': 100, 'max_payload_bytes': 2000})
+    content = 'graph TD\n' + ''.join(f'    N{i}["Concept {i}"]\n' for i in range(500))
+
+    graph_write = policy.shape(tool_event(
+        'Write', {'file_path': '/home/ada/linear-algebra/claude_knowledge_graph.mmd', 'content': content}
+    ))
+    assert graph_write['tool_input']['content'] == content
+    # The other copy of the content is still capped
+    assert len(json.dumps(graph_write['stdin_data'])) < len(content)
+
+    other_write = policy.shape(tool_event(
+        'Write', {'file_path': '/home/ada/linear-algebra/kb/notes.md', 'content': content}
+    ))
+    assert other_write['tool_input']['content'] == content[:100] + TRUNCATION_MARKER.format(
+        omitted=len(content) - 100
+    )
+
+
+def test_graph_edit_keeps_the_original_file_for_replay():
+    policy = CapturePolicy(dict(DEFAULT_POLICY, max_field_chars=100))
+    original = 'graph TD\n' + ''.join(f'    N{i}["Concept {i}"]\n' for i in range(500))
+    edit = {
+        'file_path': '/home/ada/linear-algebra/user_knowledge_graph.mmd',
+        'old_string': '    N0["Concept 0"]\n',
+        'new_string': '    N0["Vectors"]\n',
+    }
+    shaped = policy.shape(tool_event('Edit', edit, {'filePath': edit['file_path'], 'originalFile': original}))
+    assert shaped['tool_response']['originalFile'] == original
+
+    # Even under an older allow-list that does not name tool_response
+    old_policy = CapturePolicy(dict(DEFAULT_POLICY, fields={'PostToolUse': ['tool_name', 'tool_input']}))
+    shaped = old_policy.shape(tool_event('Edit', edit, {'originalFile': original}))
+    assert shaped['tool_response'] == {'originalFile': original}
+    assert 'tool_response' not in old_policy.shape(tool_event('Write', {'file_path': 'notes.md'}, {'x': 1}))
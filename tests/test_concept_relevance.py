@@ -0,0 +1,60 @@
+"""Tests for prompt relevance ranking of graph concepts."""
+
+import pytest
+
+import concept_relevance
+from concept_relevance import build_index, rank_concepts
+
+USER = ['Vectors', 'Matrices', 'Dot Product', 'Eigenvalues']
+CLAUDE = USER + ['Eigenvectors', 'Linear Transformations', 'Determinants', 'SVD']
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        if concept_relevance.np is None:
+            pytest.skip('NumPy is not installed')
+    else:
+        monkeypatch.setattr(concept_relevance, 'np', None)
+    return request.param
+
+
+def test_relevant_concepts_outrank_graph_order(tmp_path, backend):
+    known, gaps = rank_concepts(tmp_path, 'How do eigenvalues relate to eigenvectors?', CLAUDE, USER, 2, 1)
+    assert known == ['Eigenvalues', 'Vectors']
+    assert gaps == ['Eigenvectors']
+
+
+def test_fallback_fills_in_default_order(tmp_path, backend):
+    known, gaps = rank_concepts(tmp_path, 'Anything new today?', CLAUDE, USER, 3, 3)
+    assert known == ['Vectors', 'Matrices', 'Dot Product']
+    # Gaps fall back to shortest label first
+    assert gaps == ['SVD', 'Determinants', 'Eigenvectors']
+
+    # A partial match is topped up with the rest in default order
+    known, gaps = rank_concepts(tmp_path, 'Multiplying matrices', CLAUDE, USER, 3, 1)
+    assert known == ['Matrices', 'Vectors', 'Dot Product']
+    assert gaps == ['SVD']
+
+
+def test_kb_descriptions_count_towards_relevance(tmp_path, backend):
+    (tmp_path / 'kb').mkdir()
+    (tmp_path / 'kb' / 'notes.md').write_text('## Determinants\nThe signed volume scaling factor of a matrix.\n')
+    known, gaps = rank_concepts(tmp_path, 'What is a volume scaling factor?', CLAUDE, USER, 1, 1)
+    assert gaps == ['Determinants']
+
+
+def test_index_is_rebuilt_when_the_graph_changes(tmp_path):
+    graph = tmp_path / 'user_knowledge_graph.mmd'
+    graph.write_text('graph TD\n    V["Vectors"]\n')
+    first = concept_relevance.load_index(tmp_path, CLAUDE, ['Vectors'])
+    assert concept_relevance.load_index(tmp_path, CLAUDE, ['Vectors']).stamps == first.stamps
+
+    graph.write_text('graph TD\n    V["Vectors"] --> M["Matrices"]\n')
+    rebuilt = concept_relevance.load_index(tmp_path, CLAUDE, ['Vectors', 'Matrices'])
+    assert rebuilt.stamps != first.stamps
+    assert rebuilt.rank('matrices', 1, 0)[0] == ['Matrices']
+
+
+def test_index_without_concepts_ranks_nothing(tmp_path, backend):
+    assert build_index(tmp_path, [], []).rank('vectors') == ([], [])
@@ -0,0 +1,185 @@
+"""Tests for the time-partitioned event archive."""
+
+import json
+import sqlite3
+
+import pytest
+
+import event_archive
+from event_archive import DAY_MS, archive_events, iter_events, load_manifest
+
+START = 1_700_000_000_000
+NOW = START + 40 * DAY_MS
+
+SCHEMA = '''
+CREATE TABLE events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT,
+    event_type TEXT,
+    timestamp INTEGER,
+    data TEXT,
+    created_at INTEGER DEFAULT (strftime('%s', 'now'))
+)
+'''
+
+
+def make_db(path, events):
+    conn = sqlite3.connect(str(path))
+    conn.execute(SCHEMA)
+    with conn:
+        conn.executemany(
+            'INSERT INTO events (session_id, event_type, timestamp, data, created_at) VALUES (?, ?, ?, ?, ?)',
+            [(s, t, ts, json.dumps(data), ts // 1000) for s, t, ts, data in events]
+        )
+    conn.close()
+    return path
+
+
+def sample_events(days=20, per_day=3, workspaces=('alpha', 'beta')):
+    events = []
+    for day in range(days):
+        for n in range(per_day):
+            workspace = workspaces[(day + n) % len(workspaces)]
+            events.append((
+                f'session-{day}', ['UserPromptSubmit', 'PostToolUse', 'Stop'][n],
+                START + day * DAY_MS + n * 1000, {'workspace': workspace, 'n': n}
+            ))
+    return events
+
+
+def live_rows(db_path):
+    return list(event_archive.iter_live_events([db_path]))
+
+
+def test_archive_round_trip_reads_back_identical_events(tmp_path):
+    db = make_db(tmp_path / 'events.db', sample_events())
+    before = live_rows(db)
+    archive_dir = tmp_path / 'archive'
+
+    segments = archive_events(db, archive_dir, older_than_days=30, now_ms=NOW)
+
+    assert sum(s['count'] for s in segments) == 30
+    assert all(s['partition'] == event_archive.partition_key(s['min_ts']) for s in segments)
+    assert len(live_rows(db)) == len(before) - 30
+    assert list(iter_events(archive_dir, db_paths=[db])) == before
+    assert list(iter_events(archive_dir, include_live=False)) == before[:30]
+
+    # Archiving again moves nothing and changes nothing
+    assert archive_events(db, archive_dir, older_than_days=30, now_ms=NOW) == []
+    assert list(iter_events(archive_dir, db_paths=[db])) == before
+
+
+def test_archived_and_live_events_merge_in_order_across_databases(tmp_path):
+    first = sample_events(workspaces=('alpha',))
+    # A shard whose events interleave with the first database's
+    second = [(s, t, ts + 500, {'workspace': 'beta'}) for s, t, ts, _ in sample_events()]
+    db = make_db(tmp_path / 'events.db', first)
+    shard = make_db(tmp_path / 'ws-beta.db', second)
+    archive_dir = tmp_path / 'archive'
+    archive_events(db, archive_dir, older_than_days=25, now_ms=NOW)
+    archive_events(shard, archive_dir, older_than_days=35, now_ms=NOW)
+
+    events = list(iter_events(archive_dir, db_paths=[db, shard]))
+    assert len(events) == len(first) + len(second)
+    assert events == sorted(events, key=lambda e: (e['timestamp'], e['id']))
+    window = list(iter_events(archive_dir, db_paths=[db, shard], since=START + 3 * DAY_MS,
+                              until=START + 18 * DAY_MS))
+    assert window == [e for e in events if START + 3 * DAY_MS <= e['timestamp'] < START + 18 * DAY_MS]
+
+
+def test_filters_are_pushed_down_to_the_segment_index(tmp_path, monkeypatch):
+    db = make_db(tmp_path / 'events.db', sample_events(workspaces=('alpha',)) + [
+        ('session-x', 'Stop', START + 2 * DAY_MS + 5000, {'workspace': 'gamma'}),
+    ])
+    archive_dir = tmp_path / 'archive'
+    archive_events(db, archive_dir, older_than_days=0, now_ms=NOW)
+
+    opened = []
+    read_segment = event_archive._read_segment
+    monkeypatch.setattr(event_archive, '_read_segment', lambda path: opened.append(path) or read_segment(path))
+
+    events = list(iter_events(archive_dir, include_live=False, workspace='gamma'))
+    assert [e['session_id'] for e in events] == ['session-x']
+    assert len(opened) == 1
+
+    opened.clear()
+    events = list(iter_events(archive_dir, include_live=False, session_id='session-4'))
+    assert len(events) == 3 and len(opened) == 1
+
+    opened.clear()
+    assert list(iter_events(archive_dir, include_live=False, since=NOW)) == []
+    assert opened == []
+
+
+def test_interrupted_archive_loses_and_duplicates_nothing(tmp_path, monkeypatch):
+    db = make_db(tmp_path / 'events.db', sample_events())
+    before = live_rows(db)
+    archive_dir = tmp_path / 'archive'
+
+    # Crash while writing segments: nothing is recorded or deleted
+    write = event_archive.SegmentWriter.write
+    calls = []
+
+    def failing_write(self, event):
+        calls.append(event['id'])
+        if len(calls) == 10:
+            raise OSError('disk full')
+        write(self, event)
+
+    monkeypatch.setattr(event_archive.SegmentWriter, 'write', failing_write)
+    with pytest.raises(OSError):
+        archive_events(db, archive_dir, older_than_days=30, now_ms=NOW)
+    monkeypatch.setattr(event_archive.SegmentWriter, 'write', write)
+    assert load_manifest(archive_dir)['segments'] == []
+    assert live_rows(db) == before
+
+    # Crash after the manifest records the run, before the live rows go
+    delete = event_archive._delete_archived
+    monkeypatch.setattr(event_archive, '_delete_archived', lambda *args: (_ for _ in ()).throw(OSError('killed')))
+    with pytest.raises(OSError):
+        archive_events(db, archive_dir, older_than_days=30, now_ms=NOW)
+    monkeypatch.setattr(event_archive, '_delete_archived', delete)
+    assert [run['deleted'] for run in load_manifest(archive_dir)['runs']] == [False]
+    # Archived rows are still live; reading must not yield them twice
+    assert len(live_rows(db)) == len(before)
+    assert list(iter_events(archive_dir, db_paths=[db])) == before
+
+    # The next run finishes the pending delete first
+    assert archive_events(db, archive_dir, older_than_days=30, now_ms=NOW) == []
+    assert [run['deleted'] for run in load_manifest(archive_dir)['runs']] == [True]
+    assert list(iter_events(archive_dir, db_paths=[db])) == before
+
+
+def test_workspace_filter_matches_like_the_server(tmp_path):
+    db = make_db(tmp_path / 'events.db', [
+        ('s1', 'UserPromptSubmit', START, {'workspace': 'ml_study'}),
+        ('s2', 'UserPromptSubmit', START + 1, {'working_directory': '/home/a/ml_study'}),
+        ('s3', 'UserPromptSubmit', START + 2, {'working_directory': '/home/a/ML_Study'}),
+        ('s4', 'UserPromptSubmit', START + 3, {'working_directory': '/home/a/mlxstudy'}),
+        ('s5', 'UserPromptSubmit', START + 4, {'working_directory': '/home/a/not-ml_study'}),
+        ('s6', 'UserPromptSubmit', START + 5, {'working_directory': '/home/a/ml_study/kb'}),
+        ('s7', 'UserPromptSubmit', START + 6, {'workspace': 'other'}),
+    ])
+    live = [e['session_id'] for e in iter_events(None, db_paths=[db], workspace='ml_study')]
+    # LIKE: case-insensitive ASCII, '_' matches any character
+    assert live == ['s1', 's2', 's3', 's4']
+
+    archive_dir = tmp_path / 'archive'
+    archive_events(db, archive_dir, older_than_days=0, now_ms=NOW)
+    archived = [e['session_id'] for e in iter_events(archive_dir, include_live=False, workspace='ml_study')]
+    assert archived == live
+
+
+def test_segments_without_a_directory_index_are_still_read(tmp_path):
+    db = make_db(tmp_path / 'events.db', [
+        ('s1', 'Stop', START, {'working_directory': '/home/a/alpha'}),
+    ])
+    archive_dir = tmp_path / 'archive'
+    archive_events(db, archive_dir, older_than_days=0, now_ms=NOW)
+    manifest_path = archive_dir / event_archive.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    for segment in manifest['segments']:
+        del segment['working_directories']
+    manifest_path.write_text(json.dumps(manifest))
+
+    assert [e['session_id'] for e in iter_events(archive_dir, include_live=False, workspace='alpha')] == ['s1']
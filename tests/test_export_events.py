@@ -0,0 +1,47 @@
+"""Tests for the resumable export client."""
+
+import json
+
+import pytest
+
+import export_events
+
+
+def fake_export(events, seen):
+    def iter_export(cursor=None, **options):
+        seen.append(cursor)
+        start = int(cursor.split(':')[1]) if cursor else 0
+        for event in events[start:]:
+            yield event, f"{event['timestamp']}:{event['id']}:events"
+    return iter_export
+
+
+EVENTS = [{'id': i, 'timestamp': 1000 + i} for i in range(1, 6)]
+
+
+def test_cursor_starts_a_new_file_export(tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setattr(export_events, 'iter_export', fake_export(EVENTS, seen))
+    output = tmp_path / 'events.ndjson'
+
+    assert export_events.export_to_file(output, start_cursor='1002:2:events') == 3
+    assert seen == ['1002:2:events']
+    assert [json.loads(line)['id'] for line in output.read_text().splitlines()] == [3, 4, 5]
+    assert not export_events.state_path(output).exists()
+
+
+def test_partial_export_only_resumes_from_its_own_start(tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setattr(export_events, 'iter_export', fake_export(EVENTS, seen))
+    output = tmp_path / 'events.ndjson'
+    output.write_text('{"id":2}\n{"id":3}\n')
+    export_events.state_path(output).write_text(json.dumps(
+        {'start': '1001:1:events', 'cursor': '1002:2:events', 'offset': 9, 'count': 1}
+    ))
+
+    with pytest.raises(ValueError):
+        export_events.export_to_file(output, start_cursor='1003:3:events')
+
+    assert export_events.export_to_file(output, start_cursor='1001:1:events') == 4
+    assert seen == ['1002:2:events']
+    assert [json.loads(line)['id'] for line in output.read_text().splitlines()] == [2, 3, 4, 5]
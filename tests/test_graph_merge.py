@@ -0,0 +1,163 @@
+"""Tests for the three-way merge of concurrent graph edits."""
+
+from graph_merge import commit_edit, merge_texts, record_read, run_plugin
+from hook_dispatcher import HookContext
+from mermaid_graph import parse_mermaid
+
+GRAPH = 'claude_knowledge_graph.mmd'
+BASE = 'graph TD\n    A["Vectors"] --> B["Matrices"]\n'
+
+
+def labels(text):
+    return parse_mermaid(text).nodes
+
+
+def edges(text):
+    return {(src, dst) for src, dst, _ in parse_mermaid(text).edges}
+
+
+def test_disjoint_additions_are_both_kept():
+    ours = BASE + '    B --> C["Eigenvalues"]\n'
+    theirs = BASE + '    A --> D["Dot Product"]\n'
+    merged, conflicts = merge_texts(BASE, ours, theirs)
+    assert labels(merged) == {'A': 'Vectors', 'B': 'Matrices', 'C': 'Eigenvalues', 'D': 'Dot Product'}
+    assert edges(merged) == {('A', 'B'), ('B', 'C'), ('A', 'D')}
+    assert conflicts == []
+
+
+def test_id_collision_renames_our_node():
+    base = 'graph TD\n    A["Vectors"]\n'
+    ours = base + '    A --> B["Eigenvalues"]\n'
+    theirs = base + '    A --> B["Dot Product"]\n'
+    merged, _ = merge_texts(base, ours, theirs)
+    assert labels(merged) == {'A': 'Vectors', 'B': 'Dot Product', 'B_2': 'Eigenvalues'}
+    assert edges(merged) == {('A', 'B'), ('A', 'B_2')}
+
+
+def test_same_label_added_on_both_sides_is_one_concept():
+    base = 'graph TD\n    A["Vectors"]\n'
+    merged, _ = merge_texts(base, base + '    A --> X["Norms"]\n', base + '    A --> N["Norms"]\n')
+    assert labels(merged) == {'A': 'Vectors', 'N': 'Norms'}
+    assert edges(merged) == {('A', 'N')}
+
+
+def test_deletions_apply_unless_the_node_is_still_linked():
+    base = BASE + '    B --> C["Eigenvalues"]\n'
+    # Ours deletes the edge and node C; theirs leaves them alone
+    merged, conflicts = merge_texts(base, BASE, base + '    A --> D["Dot Product"]\n')
+    assert 'C' not in labels(merged)
+    assert edges(merged) == {('A', 'B'), ('A', 'D')}
+    assert conflicts == []
+
+    # Ours deletes node C, but theirs links a new concept to it
+    ours = BASE + '    B --> C["Eigenvalues"]\n'
+    merged, conflicts = merge_texts(base + '    D["Spectra"]\n', BASE, ours + '    C --> D["Spectra"]\n')
+    assert labels(merged)['C'] == 'Eigenvalues'
+    assert ('C', 'D') in edges(merged)
+    assert any('still linked' in conflict for conflict in conflicts)
+
+
+def test_concurrent_writes_from_the_same_read_keep_both(tmp_path):
+    (tmp_path / GRAPH).write_text(BASE)
+    record_read(tmp_path, 's1', GRAPH)
+    record_read(tmp_path, 's2', GRAPH)
+
+    first = BASE + '    B --> C["Eigenvalues"]\n'
+    (tmp_path / GRAPH).write_text(first)
+    assert commit_edit(tmp_path, 's1', GRAPH, 'Write', {'content': first})['merged'] is False
+
+    second = BASE + '    A --> D["Dot Product"]\n'
+    (tmp_path / GRAPH).write_text(second)
+    assert commit_edit(tmp_path, 's2', GRAPH, 'Write', {'content': second})['merged'] is True
+    assert set(labels((tmp_path / GRAPH).read_text())) == {'A', 'B', 'C', 'D'}
+
+
+def test_hand_edit_after_read_survives_a_write(tmp_path):
+    (tmp_path / GRAPH).write_text(BASE)
+    record_read(tmp_path, 's1', GRAPH)
+
+    # Edited by hand after the read; the hook sees the file before the tool's
+    # output lands (or after someone changed it again)
+    (tmp_path / GRAPH).write_text(BASE + '    A --> H["Hand Added"]\n')
+    ours = BASE + '    B --> C["Eigenvalues"]\n'
+    commit_edit(tmp_path, 's1', GRAPH, 'Write', {'content': ours})
+    assert set(labels((tmp_path / GRAPH).read_text())) == {'A', 'B', 'C', 'H'}
+
+
+def test_hand_edit_between_prompts_survives_a_write(tmp_path):
+    (tmp_path / GRAPH).write_text(BASE)
+    record_read(tmp_path, 's1', GRAPH)
+
+    (tmp_path / GRAPH).write_text(BASE + '    A --> H["Hand Added"]\n')
+    run_plugin(HookContext('{}', {'session_id': 's1'}, 'UserPromptSubmit', tmp_path))
+
+    # The Write tool replaces the file with the session's version
+    ours = BASE + '    B --> C["Eigenvalues"]\n'
+    (tmp_path / GRAPH).write_text(ours)
+    assert commit_edit(tmp_path, 's1', GRAPH, 'Write', {'content': ours})['merged'] is True
+    assert set(labels((tmp_path / GRAPH).read_text())) == {'A', 'B', 'C', 'H'}
+
+
+def test_write_without_a_recorded_read_keeps_deletions(tmp_path):
+    (tmp_path / GRAPH).write_text(BASE + '    B --> C["Eigenvalues"]\n')
+    commit_edit(tmp_path, 'setup', GRAPH, 'Write', {'content': (tmp_path / GRAPH).read_text()})
+
+    # A session that never read the file deletes C
+    (tmp_path / GRAPH).write_text(BASE)
+    result = commit_edit(tmp_path, 's1', GRAPH, 'Write', {'content': BASE})
+    assert (tmp_path / GRAPH).read_text() == BASE
+    assert any('without a recorded read' in conflict for conflict in result['conflicts'])
+
+
+def test_deletion_after_read_is_committed(tmp_path):
+    (tmp_path / GRAPH).write_text(BASE + '    B --> C["Eigenvalues"]\n')
+    record_read(tmp_path, 's1', GRAPH)
+    (tmp_path / GRAPH).write_text(BASE)
+    result = commit_edit(tmp_path, 's1', GRAPH, 'Write', {'content': BASE})
+    assert (tmp_path / GRAPH).read_text() == BASE
+    assert result == {'merged': False, 'conflicts': []}
+
+
+def test_concurrent_write_landing_before_the_hook_is_not_adopted_wholesale(tmp_path):
+    (tmp_path / GRAPH).write_text(BASE)
+    record_read(tmp_path, 's1', GRAPH)
+    record_read(tmp_path, 's2', GRAPH)
+    record_read(tmp_path, 's3', GRAPH)
+
+    # s3 commits first
+    third = BASE + '    A --> E["Norms"]\n'
+    (tmp_path / GRAPH).write_text(third)
+    commit_edit(tmp_path, 's3', GRAPH, 'Write', {'content': third})
+
+    # s1's and s2's Write tools both run before either hook does
+    first = BASE + '    B --> C["Eigenvalues"]\n'
+    second = BASE + '    A --> D["Dot Product"]\n'
+    (tmp_path / GRAPH).write_text(first)
+    (tmp_path / GRAPH).write_text(second)
+    result = commit_edit(tmp_path, 's1', GRAPH, 'Write', {'content': first})
+    assert any('changed outside this write' in conflict for conflict in result['conflicts'])
+    commit_edit(tmp_path, 's2', GRAPH, 'Write', {'content': second})
+
+    assert set(labels((tmp_path / GRAPH).read_text())) == {'A', 'B', 'C', 'D', 'E'}
+
+
+def test_merge_keeps_dotted_and_thick_edges():
+    base = 'graph TD\n    A["Vectors"] -.-> B["Matrices"]\n    B ==>|"builds on"| C["Eigenvalues"]\n'
+    ours = base + '    C --- D["Spectra"]\n'
+    theirs = base + '    A -.- E["Norms"]\n'
+    merged, conflicts = merge_texts(base, ours, theirs)
+    assert conflicts == []
+    assert '    A -.-> B\n' in merged
+    assert '    B ==>|"builds on"| C\n' in merged
+    assert '    C --- D\n' in merged
+    assert '    A -.- E\n' in merged
+    graph = parse_mermaid(merged)
+    assert graph.edge_ops == {('A', 'B'): '-.->', ('B', 'C'): '==>', ('C', 'D'): '---', ('A', 'E'): '-.-'}
+
+
+def test_edge_style_changed_on_one_side_is_merged():
+    base = 'graph TD\n    A["Vectors"] --> B["Matrices"]\n'
+    ours = 'graph TD\n    A["Vectors"] ==> B["Matrices"]\n'
+    theirs = base + '    B --> C["Eigenvalues"]\n'
+    merged, _ = merge_texts(base, ours, theirs)
+    assert parse_mermaid(merged).edge_ops == {('A', 'B'): '==>'}
@@ -0,0 +1,39 @@
+"""Tests for Mermaid graph parsing and rendering."""
+
+from mermaid_graph import MermaidGraph, parse_mermaid, render_mermaid
+
+
+def test_quotes_round_trip_as_entities():
+    graph = MermaidGraph()
+    graph.add_node('A', 'The "kernel" trick', 'Methods "core"')
+    graph.add_node('B', 'SVMs')
+    graph.edges.append(('A', 'B', 'used by "soft" margins'))
+
+    text = render_mermaid(graph)
+    assert '\\"' not in text
+    assert 'A["The #quot;kernel#quot; trick"]' in text
+    assert 'A -->|"used by #quot;soft#quot; margins"| B' in text
+
+    parsed = parse_mermaid(text)
+    assert parsed.nodes == {'A': 'The "kernel" trick', 'B': 'SVMs'}
+    assert parsed.edges == [('A', 'B', 'used by "soft" margins')]
+    assert parsed.node_subgraph == {'A': 'Methods "core"'}
+
+
+def test_edge_operators_round_trip():
+    text = (
+        'graph LR\n'
+        '    A["a"] --> B["b"]\n'
+        '    B -.-> C["c"]\n'
+        '    C ==>|"x"| D["d"]\n'
+        '    D --- E["e"]\n'
+        '    E -.- F["f"]\n'
+        '    F === G["g"]\n'
+    )
+    graph = parse_mermaid(text)
+    assert graph.edge_ops == {
+        ('B', 'C'): '-.->', ('C', 'D'): '==>', ('D', 'E'): '---', ('E', 'F'): '-.-', ('F', 'G'): '==='
+    }
+    rendered = parse_mermaid(render_mermaid(graph, 'LR'))
+    assert rendered.edges == graph.edges
+    assert rendered.edge_ops == graph.edge_ops
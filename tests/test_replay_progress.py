@@ -0,0 +1,133 @@
+"""Tests for replaying knowledge graph edits from event history."""
+
+import json
+import os
+
+import capture_events
+from conftest import ROOT_DIR
+from replay_progress import INITIAL_GRAPHS, replay
+
+CLAUDE_GRAPH = '/home/ada/linear-algebra/claude_knowledge_graph.mmd'
+USER_GRAPH = '/home/ada/linear-algebra/user_knowledge_graph.mmd'
+
+
+def edit_event(timestamp, file_path, old_string, new_string, **data):
+    return {
+        'timestamp': timestamp,
+        'session_id': 'session-1',
+        'event_type': 'PostToolUse',
+        'data': {
+            'tool_name': 'Edit',
+            'tool_input': {'file_path': file_path, 'old_string': old_string, 'new_string': new_string},
+            **data,
+        },
+    }
+
+
+def test_edit_only_history_starts_from_the_initial_graphs():
+    events = [
+        edit_event(
+            1, CLAUDE_GRAPH,
+            '    Start["Ready to learn about your topic"]\n',
+            '    V["Vectors"] --> M["Matrices"]\n    M --> E["Eigenvalues"]\n',
+        ),
+        edit_event(
+            2, USER_GRAPH,
+            '    User["User starting learning journey"]\n',
+            '    V["Vectors"]\n',
+        ),
+        edit_event(3, USER_GRAPH, '    V["Vectors"]\n', '    V["Vectors"] --> M["Matrices"]\n'),
+    ]
+    stats = {}
+    points = list(replay(events, stats))
+
+    assert [point['timestamp'] for point in points] == [1, 2, 3]
+    assert points[-1]['claude_concepts'] == 3
+    assert points[-1]['concepts_mastered'] == 2
+    assert points[-1]['gap_count'] == 1
+    assert stats == {'applied': 3, 'unapplied': 0}
+
+
+def test_unapplicable_edits_are_counted():
+    events = [
+        edit_event(1, CLAUDE_GRAPH, '    Nowhere["Not in any graph"]\n', '    X["X"]\n'),
+    ]
+    stats = {}
+    assert list(replay(events, stats)) == []
+    assert stats == {'applied': 0, 'unapplied': 1}
+
+
+def test_recorded_original_file_resyncs_the_replayed_text():
+    hand_edited = 'graph TD\n    A["Limits"] --> B["Derivatives"]\n'
+    events = [
+        edit_event(
+            1, CLAUDE_GRAPH, '    A["Limits"] --> B["Derivatives"]\n',
+            '    A["Limits"] --> B["Derivatives"]\n    B --> C["Integrals"]\n',
+            tool_response={'originalFile': hand_edited},
+        ),
+    ]
+    points = list(replay(events))
+    assert points[0]['claude_concepts'] == 3
+
+
+def test_session_start_graphs_are_known_initial_graphs(tmp_path):
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        assert capture_events.initialize_workspace_on_session_start()
+    finally:
+        os.chdir(cwd)
+    assert (tmp_path / 'claude_knowledge_graph.mmd').read_text() in INITIAL_GRAPHS['claude']
+    assert (tmp_path / 'user_knowledge_graph.mmd').read_text() in INITIAL_GRAPHS['user']
+
+
+def test_captured_graph_edit_replays_from_its_original_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert capture_events.initialize_workspace_on_session_start()
+    (tmp_path / '.claude').mkdir(exist_ok=True)
+    (tmp_path / '.claude' / 'capture_policy.json').write_text(
+        (ROOT_DIR / 'templates' / 'capture_policy.json').read_text()
+    )
+
+    # The graph was changed outside any captured event before this edit
+    original = 'graph TD\n    A["Limits"] --> B["Derivatives"]\n'
+    graph_path = str(tmp_path / 'claude_knowledge_graph.mmd')
+    payload = {
+        'session_id': 'session-1',
+        'hook_event_name': 'PostToolUse',
+        'tool_name': 'Edit',
+        'tool_input': {
+            'file_path': graph_path,
+            'old_string': '    A["Limits"] --> B["Derivatives"]\n',
+            'new_string': '    A["Limits"] --> B["Derivatives"]\n    B --> C["Integrals"]\n',
+        },
+        'tool_response': {'filePath': graph_path, 'originalFile': original},
+    }
+    sent = []
+    capture_events.handle_event(json.dumps(payload), payload, 'PostToolUse', send=sent.append)
+
+    assert sent[0]['tool_response']['originalFile'] == original
+    events = [{'timestamp': 1, 'session_id': 'session-1', 'event_type': 'PostToolUse', 'data': sent[0]}]
+    points = list(replay(events))
+    assert points[-1]['claude_concepts'] == 3
+
+
+def test_sampled_out_hook_still_sends_graph_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.claude').mkdir()
+    (tmp_path / '.claude' / 'capture_policy.json').write_text(json.dumps({'sample_rates': {'PostToolUse': 0.0}}))
+
+    graph_path = str(tmp_path / 'user_knowledge_graph.mmd')
+    content = 'graph TD\n    A["Limits"] --> B["Derivatives"]\n'
+    sent = []
+    for tool_name, tool_input in (
+        ('Write', {'file_path': graph_path, 'content': content}),
+        ('Write', {'file_path': str(tmp_path / 'kb' / 'notes.md'), 'content': 'Limits'}),
+        ('Read', {'file_path': graph_path}),
+    ):
+        payload = {'session_id': 'session-1', 'tool_name': tool_name, 'tool_input': tool_input}
+        capture_events.handle_event(json.dumps(payload), payload, 'PostToolUse', send=sent.append)
+
+    assert [event['tool_input'] for event in sent] == [{'file_path': graph_path, 'content': content}]
+    events = [{'timestamp': 1, 'session_id': 'session-1', 'event_type': 'PostToolUse', 'data': sent[0]}]
+    assert list(replay(events))[-1]['user_concepts'] == 2
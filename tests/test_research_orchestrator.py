@@ -0,0 +1,100 @@
+"""Tests for the parallel research runner, driven by the stub CLI."""
+
+import json
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+from research_orchestrator import RESEARCH_ROLES, run_research, run_stage, ResearchCache
+
+STUB_CMD = [sys.executable, str(ROOT_DIR / 'tests' / 'stub_claude.py')]
+PLACEHOLDER_GRAPH = 'graph TD\n    %% Will be populated with actual domain knowledge\n'
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / 'kb').mkdir()
+    (tmp_path / 'claude_knowledge_graph.mmd').write_text(PLACEHOLDER_GRAPH)
+    (tmp_path / 'user_knowledge_graph.mmd').write_text('graph TD\n')
+    return tmp_path
+
+
+def stub_calls(workspace):
+    path = workspace / 'kb' / 'logs' / 'stub_calls.ndjson'
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def statuses(results):
+    return {result['stage']: result['status'] for result in results}
+
+
+def test_roles_run_in_parallel_then_synthesis(workspace, monkeypatch):
+    monkeypatch.setenv('STUB_CLAUDE_SLEEP', '0.5')
+    monkeypatch.setenv('STUB_CLAUDE_ONLY', ','.join(RESEARCH_ROLES))
+
+    results = run_research(workspace, 'linear algebra', claude_cmd=STUB_CMD)
+
+    assert set(statuses(results).values()) == {'completed'}
+    assert len(results) == len(RESEARCH_ROLES) + 2
+    calls = {call['stage']: call for call in stub_calls(workspace)}
+    roles = [calls[role] for role in RESEARCH_ROLES]
+    # Every role started before any of them finished
+    assert max(call['start'] for call in roles) < min(call['end'] for call in roles)
+    assert calls['synthesis']['start'] >= max(call['end'] for call in roles)
+    assert calls['gap_analysis']['start'] >= calls['synthesis']['end']
+    assert (workspace / 'claude_knowledge_graph.mmd').read_text() != PLACEHOLDER_GRAPH
+
+
+def test_completed_stages_are_reused_from_the_cache(workspace):
+    run_research(workspace, 'linear algebra', claude_cmd=STUB_CMD)
+    first_calls = len(stub_calls(workspace))
+
+    results = run_research(workspace, 'linear algebra', claude_cmd=STUB_CMD)
+
+    assert set(statuses(results).values()) == {'cached'}
+    assert len(stub_calls(workspace)) == first_calls
+
+    # A changed output invalidates its own stage only
+    (workspace / 'kb' / 'advanced.md').write_text('# edited by hand\n')
+    results = run_research(workspace, 'linear algebra', claude_cmd=STUB_CMD, gap_analysis=False)
+    assert statuses(results)['advanced'] == 'completed'
+    assert statuses(results)['fundamentals'] == 'cached'
+
+
+def test_failed_attempt_is_retried(workspace, monkeypatch):
+    monkeypatch.setenv('STUB_CLAUDE_FAIL', '1')
+    cache = ResearchCache(workspace)
+
+    result = run_stage('fundamentals', 'prompt', ['kb/fundamentals.md'], workspace, STUB_CMD, cache, retries=1)
+
+    assert result['status'] == 'completed'
+    assert result['attempts'] == 2
+
+
+def test_stage_is_killed_on_timeout(workspace, monkeypatch):
+    monkeypatch.setenv('STUB_CLAUDE_SLEEP', '5')
+    cache = ResearchCache(workspace)
+
+    result = run_stage('advanced', 'prompt', ['kb/advanced.md'], workspace, STUB_CMD, cache,
+                       timeout=1, retries=0)
+
+    assert result['status'] == 'failed'
+    assert 'timed out' in result['error']
+    assert result['duration'] < 4
+
+
+def test_existing_outputs_do_not_count_as_written(workspace, monkeypatch):
+    # Setup's placeholder graph and a stale file from an earlier attempt exist
+    (workspace / 'kb' / 'synthesis.md').write_text('# stale synthesis\n')
+    monkeypatch.setenv('STUB_CLAUDE_NO_WRITE', '1')
+    cache = ResearchCache(workspace)
+
+    result = run_stage('synthesis', 'prompt', ['kb/synthesis.md', 'claude_knowledge_graph.mmd'],
+                       workspace, STUB_CMD, cache, retries=0)
+
+    assert result['status'] == 'failed'
+    assert result['error'] == 'did not write kb/synthesis.md, claude_knowledge_graph.mmd'
+    assert not (workspace / 'kb' / 'logs' / 'research_cache.json').exists()
@@ -0,0 +1,80 @@
+"""Tests for the spaced-repetition review queue."""
+
+import json
+import os
+
+import pytest
+
+import capture_events
+from review_queue import (
+    DAY_SECONDS, LEGACY_QUEUE_FILE, due_reviews, mastered_concepts, open_queue, record_review
+)
+
+
+def test_session_start_placeholder_is_not_scheduled(tmp_path):
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        assert capture_events.initialize_workspace_on_session_start()
+    finally:
+        os.chdir(cwd)
+
+    assert due_reviews(tmp_path, now=0) == []
+    assert due_reviews(tmp_path, now=365 * DAY_SECONDS) == []
+
+
+def test_mastered_concepts_come_from_graph_and_progress():
+    user_data = {'progress': {'concepts_learned': ['Vectors', ''], 'concepts_mastered': ['Matrices']}}
+    labels = ['User starting learning journey', 'Eigenvalues']
+    assert mastered_concepts(user_data, labels) == {'Vectors', 'Matrices', 'Eigenvalues'}
+
+
+def test_most_overdue_concepts_come_first(tmp_path):
+    (tmp_path / 'user_knowledge_graph.mmd').write_text(
+        'graph TD\n    V["Vectors"] --> M["Matrices"]\n    M --> E["Eigenvalues"]\n'
+    )
+    assert due_reviews(tmp_path, now=0) == []
+
+    record_review(tmp_path, 'Matrices', 5, now=DAY_SECONDS)
+    due = [concept for concept, _ in due_reviews(tmp_path, now=1.5 * DAY_SECONDS)]
+    assert due == ['Eigenvalues', 'Vectors']
+
+    due = [concept for concept, _ in due_reviews(tmp_path, now=3 * DAY_SECONDS)]
+    assert due == ['Eigenvalues', 'Vectors', 'Matrices']
+
+
+def test_due_query_uses_the_due_index(tmp_path):
+    queue = open_queue(tmp_path)
+    try:
+        plan = ' '.join(str(row) for row in queue.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT concept FROM reviews WHERE due <= ? ORDER BY due, concept LIMIT ?',
+            (0, 5)
+        ))
+    finally:
+        queue.conn.close()
+    assert 'idx_reviews_due' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_review_of_an_untracked_concept_changes_nothing(tmp_path):
+    (tmp_path / 'user_knowledge_graph.mmd').write_text('graph TD\n    V["Vectors"]\n')
+    due_reviews(tmp_path, now=0)
+    with pytest.raises(KeyError):
+        record_review(tmp_path, 'Tensors', 5, now=0)
+    assert [concept for concept, _ in due_reviews(tmp_path, now=2 * DAY_SECONDS)] == ['Vectors']
+
+
+def test_legacy_json_queue_is_imported_once(tmp_path):
+    (tmp_path / 'user_knowledge_graph.mmd').write_text('graph TD\n    V["Vectors"]\n')
+    item = {'due': 5.0, 'ease': 2.6, 'interval': 6, 'reps': 2, 'lapses': 0, 'last_review': 1.0}
+    stamp = os.stat(tmp_path / 'user_knowledge_graph.mmd')
+    (tmp_path / LEGACY_QUEUE_FILE).write_text(json.dumps({
+        'version': 1,
+        'sources': {'user.json': None,
+                    'user_knowledge_graph.mmd': [stamp.st_mtime_ns, stamp.st_size]},
+        'heap': ['Vectors'],
+        'items': {'Vectors': item},
+    }))
+
+    assert due_reviews(tmp_path, now=10) == [('Vectors', item)]
+    assert not (tmp_path / LEGACY_QUEUE_FILE).exists()
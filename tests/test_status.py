@@ -0,0 +1,117 @@
+"""Tests for the terminal status view and its parse cache."""
+
+import os
+import pickle
+import sys
+
+import pytest
+
+import capture_events
+import status
+
+CLAUDE = (
+    'graph TD\n'
+    '    V["Vectors"] --> M["Matrices"]\n'
+    '    M -->|"enables"| E["Eigenvalues"]\n'
+    '    V --> D["Dot Product"]\n'
+    '    M --> T["Transpose"]\n'
+)
+USER = 'graph TD\n    V["Vectors"] --> M["Matrices"]\n'
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / 'claude_knowledge_graph.mmd').write_text(CLAUDE)
+    (tmp_path / 'user_knowledge_graph.mmd').write_text(USER)
+    return tmp_path
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    build = status.build_status
+
+    def counting_build(*args, **kwargs):
+        calls.append(args[0])
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(status, 'build_status', counting_build)
+    return calls
+
+
+def run_main(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(sys, 'argv', ['status.py', *map(str, argv)])
+    code = status.main()
+    return code, capsys.readouterr().out
+
+
+def test_fresh_workspace(tmp_path, monkeypatch, capsys):
+    assert run_main(monkeypatch, capsys, tmp_path)[1].splitlines()[1] == '   No knowledge graphs yet'
+
+    # A workspace fresh from SessionStart only holds the placeholder nodes
+    monkeypatch.chdir(tmp_path)
+    assert capture_events.initialize_workspace_on_session_start()
+    code, out = run_main(monkeypatch, capsys, tmp_path, '-n', 0)
+    assert code == 0
+    assert out.splitlines()[1:] == ['   No concepts yet (run /study::init)']
+
+
+def test_populated_workspace(workspace, monkeypatch, capsys):
+    code, out = run_main(monkeypatch, capsys, workspace)
+    assert code == 0
+    lines = out.splitlines()
+    assert lines[1] == '   Mastered 2/5 concepts (40%) · 3 gaps · 3 on the frontier'
+    assert lines[2] == '   Next up: Eigenvalues, Dot Product, Transpose'
+    assert lines[4:9] == [
+        '   └─ ✓ Vectors',
+        '      ├─ ✓ Matrices',
+        '      │  ├─ ▸ Eigenvalues  (enables)',
+        '      │  └─ ▸ Transpose',
+        '      └─ ▸ Dot Product',
+    ]
+    assert lines[-1] == '✓ mastered   ▸ ready to learn   · gap'
+
+
+def test_tree_is_cut_at_tree_lines(workspace):
+    lines = status.render_status(workspace, status.load_status(workspace), tree_lines=2)
+    assert lines[-1] == '   … 3 more lines (--tree-lines to show more)'
+
+
+def test_cache_is_reused_until_a_graph_changes(workspace, builds):
+    first = status.load_status(workspace)
+    assert status.load_status(workspace) == first
+    assert len(builds) == 1
+
+    # Same size, new mtime
+    user = workspace / 'user_knowledge_graph.mmd'
+    stat = user.stat()
+    os.utime(user, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert status.load_status(workspace)['mastered'] == 2
+    assert len(builds) == 2
+
+    # New size
+    user.write_text(USER + '    V --> D["Dot Product"]\n')
+    assert status.load_status(workspace)['mastered'] == 3
+    assert len(builds) == 3
+    assert status.load_status(workspace)['mastered'] == 3
+    assert len(builds) == 3
+
+
+@pytest.mark.parametrize('content', [b'not a pickle', pickle.dumps((0, {})), pickle.dumps('garbage')])
+def test_corrupt_cache_is_rebuilt(workspace, builds, content):
+    cache = workspace / status.CACHE_FILE
+    cache.parent.mkdir(parents=True)
+    cache.write_bytes(content)
+
+    assert status.load_status(workspace)['mastered'] == 2
+    assert pickle.loads(cache.read_bytes())[0] == status.CACHE_VERSION
+    status.load_status(workspace)
+    assert len(builds) == 1
+
+
+def test_unreadable_cache_still_shows_the_status(workspace, builds):
+    # A directory where the cache file should be can be neither read nor replaced
+    (workspace / status.CACHE_FILE).mkdir(parents=True)
+    assert status.load_status(workspace)['mastered'] == 2
+    assert status.load_status(workspace)['mastered'] == 2
+    assert len(builds) == 2
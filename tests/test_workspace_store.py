@@ -0,0 +1,54 @@
+"""Tests for the locked JSON merge-patch updates in workspace_store."""
+
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import ROOT_DIR
+from workspace_store import merge_patch, read_json, update_json
+
+STORE_SCRIPT = ROOT_DIR / 'templates' / 'workspace_store.py'
+
+
+def test_merge_patch_merges_objects_and_removes_nulls():
+    target = {'name': 'Ada', 'progress': {'concepts_learned': ['Vectors'], 'streak': 3}}
+    patch = {'progress': {'streak': None, 'level': 2}, 'current_topic': 'Matrices'}
+
+    assert merge_patch(target, patch) == {
+        'name': 'Ada',
+        'current_topic': 'Matrices',
+        'progress': {'concepts_learned': ['Vectors'], 'level': 2},
+    }
+    assert target['progress']['streak'] == 3
+
+
+def test_concurrent_updates_keep_every_key(tmp_path):
+    path = tmp_path / 'user.json'
+    path.write_text(json.dumps({'progress': {}}))
+
+    def patch(i):
+        update_json(path, {'progress': {f'session_{i}': i}})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(patch, range(40)))
+
+    assert read_json(path)['progress'] == {f'session_{i}': i for i in range(40)}
+
+
+def test_cli_patch(tmp_path):
+    path = tmp_path / 'user.json'
+    path.write_text(json.dumps({'name': 'Ada', 'learning_goals': []}))
+
+    result = subprocess.run(
+        [sys.executable, str(STORE_SCRIPT), 'patch', str(path), '{"current_topic": "Graphs"}'],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert read_json(path) == {'name': 'Ada', 'learning_goals': [], 'current_topic': 'Graphs'}
+
+    result = subprocess.run(
+        [sys.executable, str(STORE_SCRIPT), 'patch', str(path), '["not", "an", "object"]'],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 1
@@ -0,0 +1,297 @@
+#!/usr/bin/env node
+/**
+ * Events Database Benchmark
+ * Seeds an events database with millions of synthetic events and compares
+ * SQLite's default settings with statements prepared on every request (how
+ * the server used to run) against the tuned profile with statements
+ * prepared once: single-event ingestion throughput and read latency for the
+ * queries behind /events, /events/:sessionId and /sessions.
+ *
+ * Usage: node utils/bench-events-db.js [--rows 2000000] [--inserts 5000]
+ *            [--reads 500] [--dir /tmp/events-bench] [--keep]
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const Database = require('better-sqlite3');
+const EventStore = require('./event-store.js');
+const { initEventsSchema } = require('./events-schema.js');
+const { applyTuning, checkpoint, optimize } = require('./sqlite-tuning.js');
+
+const EVENTS_PER_SESSION = 200;
+const WORKSPACES = 50;
+const EVENT_SPACING_MS = 1000;
+const START_TS = Date.UTC(2024, 0, 1);
+const EVENT_TYPES = ['SessionStart', 'UserPromptSubmit', 'PostToolUse', 'PostToolUse', 'PostToolUse', 'Stop'];
+const TOOLS = ['Read', 'Edit', 'Write', 'Bash', 'Grep'];
+
+/**
+ * The server's previous queries: same SQL as EventStore, prepared per call
+ */
+class UnpreparedEventStore {
+    constructor(db) {
+        this.db = db;
+    }
+
+    insert(sessionId, eventType, timestamp, data) {
+        return this.db.prepare(`
+            INSERT INTO events (session_id, event_type, timestamp, data)
+            VALUES (?, ?, ?, ?)
+        `).run(sessionId, eventType, timestamp, JSON.stringify(data));
+    }
+
+    sessionEvents(sessionId, limit) {
+        return this.db.prepare(`
+            SELECT * FROM events WHERE session_id = ? ORDER BY timestamp DESC LIMIT ?
+        `).all(sessionId, limit);
+    }
+
+    recent(eventType, since, limit, workspace = null) {
+        let query = 'SELECT * FROM events WHERE event_type = ? AND timestamp > ?';
+        const params = [eventType, since];
+        if (workspace) {
+            query += ` AND (JSON_EXTRACT(data, '$.workspace') = ? OR JSON_EXTRACT(data, '$.working_directory') LIKE ?)`;
+            params.push(workspace, `%/${workspace}`);
+        }
+        query += ' ORDER BY timestamp DESC LIMIT ?';
+        params.push(limit);
+        return this.db.prepare(query).all(...params);
+    }
+
+    sessionSummaries() {
+        return this.db.prepare(`
+            SELECT session_id, COUNT(*) as event_count, MIN(timestamp) as first_event,
+                   MAX(timestamp) as last_event
+            FROM events GROUP BY session_id
+        `).all();
+    }
+}
+
+const PROFILES = {
+    default: {
+        description: 'rollback journal, synchronous=FULL, prepare per request',
+        configure: () => {},
+        open: (db) => new UnpreparedEventStore(db)
+    },
+    tuned: {
+        description: 'WAL, synchronous=NORMAL, 64 MB cache, mmap, prepared once',
+        configure: (db) => applyTuning(db),
+        // EventStore prepares its statements up front, so the schema must exist
+        open: (db) => new EventStore(db)
+    }
+};
+
+// Small deterministic PRNG so both profiles see identical data and queries
+function mulberry32(seed) {
+    return () => {
+        seed |= 0;
+        seed = (seed + 0x6D2B79F5) | 0;
+        let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+        t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+/**
+ * Synthetic event i, shaped like what the capture hook sends
+ */
+function makeEvent(i, rand) {
+    const session = Math.floor(i / EVENTS_PER_SESSION);
+    const workspace = `ws-${session % WORKSPACES}`;
+    const eventType = EVENT_TYPES[i % EVENT_TYPES.length];
+    const data = { workspace, working_directory: `/home/learner/${workspace}` };
+    if (eventType === 'UserPromptSubmit') {
+        data.user_prompt = `Explain concept ${Math.floor(rand() * 5000)} `.repeat(8);
+    } else if (eventType === 'PostToolUse') {
+        data.tool_name = TOOLS[Math.floor(rand() * TOOLS.length)];
+        data.tool_input = { file_path: `/home/learner/${workspace}/kb/notes-${i % 97}.md` };
+    }
+    return {
+        sessionId: `session-${session}`,
+        eventType,
+        timestamp: START_TS + i * EVENT_SPACING_MS,
+        data
+    };
+}
+
+function percentile(sorted, p) {
+    if (sorted.length === 0) return 0;
+    return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+}
+
+/**
+ * Time fn over n calls
+ * @returns {Object} { p50, p95, p99 } in milliseconds and total seconds
+ */
+function timeCalls(n, fn) {
+    const latencies = new Float64Array(n);
+    const started = process.hrtime.bigint();
+    for (let i = 0; i < n; i++) {
+        const t0 = process.hrtime.bigint();
+        fn(i);
+        latencies[i] = Number(process.hrtime.bigint() - t0) / 1e6;
+    }
+    const totalSeconds = Number(process.hrtime.bigint() - started) / 1e9;
+    latencies.sort();
+    return {
+        p50: percentile(latencies, 0.5),
+        p95: percentile(latencies, 0.95),
+        p99: percentile(latencies, 0.99),
+        totalSeconds
+    };
+}
+
+function removeDatabase(file) {
+    for (const suffix of ['', '-wal', '-shm', '-journal']) {
+        fs.rmSync(file + suffix, { force: true });
+    }
+}
+
+/**
+ * Bulk-load rows events in large transactions (not part of the comparison)
+ */
+function seed(file, profile, rows) {
+    const db = new Database(file);
+    PROFILES[profile].configure(db);
+    initEventsSchema(db);
+    const insert = db.prepare(`
+        INSERT INTO events (session_id, event_type, timestamp, data) VALUES (?, ?, ?, ?)
+    `);
+    const rand = mulberry32(42);
+    const insertBatch = db.transaction((from, to) => {
+        for (let i = from; i < to; i++) {
+            const event = makeEvent(i, rand);
+            insert.run(event.sessionId, event.eventType, event.timestamp, JSON.stringify(event.data));
+        }
+    });
+    for (let from = 0; from < rows; from += 50000) {
+        insertBatch(from, Math.min(rows, from + 50000));
+        process.stdout.write(`\r  seeding ${profile}: ${Math.min(rows, from + 50000)}/${rows}`);
+    }
+    process.stdout.write('\n');
+    if (profile === 'tuned') {
+        // The state the maintenance schedule keeps the server in
+        optimize(db);
+        checkpoint(db, 'TRUNCATE');
+    }
+    db.close();
+}
+
+/**
+ * Reopen a seeded database with the profile's settings and measure it
+ */
+function measure(file, profile, rows, options) {
+    const db = new Database(file);
+    PROFILES[profile].configure(db);
+    const store = PROFILES[profile].open(db);
+    const rand = mulberry32(7);
+    const sessions = Math.ceil(rows / EVENTS_PER_SESSION);
+    const lastTs = START_TS + rows * EVENT_SPACING_MS;
+
+    const results = {};
+    results.sessionEvents = timeCalls(options.reads, () => {
+        store.sessionEvents(`session-${Math.floor(rand() * sessions)}`, 50);
+    });
+    results.recent = timeCalls(options.reads, () => {
+        store.recent('UserPromptSubmit', lastTs - 3600000 - Math.floor(rand() * 86400000), 50);
+    });
+    results.recentWorkspace = timeCalls(options.reads, () => {
+        const since = lastTs - 3600000 - Math.floor(rand() * 86400000);
+        store.recent('UserPromptSubmit', since, 50, `ws-${Math.floor(rand() * WORKSPACES)}`);
+    });
+    // A full GROUP BY scan varies by tens of ms between calls, so a median
+    // needs a few dozen of them even though each is slow
+    results.sessionSummaries = timeCalls(Math.max(30, Math.floor(options.reads / 20)), () => {
+        store.sessionSummaries();
+    });
+
+    // One autocommitted insert per event, as POST /events does
+    const insertRand = mulberry32(99);
+    const ingest = timeCalls(options.inserts, (i) => {
+        const event = makeEvent(rows + i, insertRand);
+        store.insert(event.sessionId, event.eventType, event.timestamp, event.data);
+    });
+    results.ingest = { ...ingest, eventsPerSecond: options.inserts / ingest.totalSeconds };
+
+    db.close();
+    return results;
+}
+
+function formatRow(label, values, unit, lowerIsBetter = true) {
+    const [before, after] = values;
+    const ratio = lowerIsBetter ? before / after : after / before;
+    const fmt = (v) => (v >= 100 ? v.toFixed(0) : v.toFixed(3)).padStart(12);
+    return `  ${label.padEnd(34)}${fmt(before)}${fmt(after)}  ${unit.padEnd(8)}${ratio.toFixed(1).padStart(6)}x`;
+}
+
+function printReport(results, options) {
+    const { default: before, tuned: after } = results;
+    console.log(`\nEvents database benchmark: ${options.rows} seeded rows, ` +
+        `${options.inserts} inserts, ${options.reads} reads per query`);
+    for (const [name, profile] of Object.entries(PROFILES)) {
+        console.log(`  ${name}: ${profile.description}`);
+    }
+    console.log(`\n  ${'metric'.padEnd(34)}${'default'.padStart(12)}${'tuned'.padStart(12)}  ${'unit'.padEnd(8)}  gain`);
+    console.log(formatRow('ingest throughput', [before.ingest.eventsPerSecond, after.ingest.eventsPerSecond], 'ev/s', false));
+    console.log(formatRow('ingest p99', [before.ingest.p99, after.ingest.p99], 'ms'));
+    const queries = {
+        sessionEvents: 'GET /events/:sessionId',
+        recent: 'GET /events',
+        recentWorkspace: 'GET /events?workspace=',
+        sessionSummaries: 'GET /sessions'
+    };
+    for (const [key, label] of Object.entries(queries)) {
+        for (const p of ['p50', 'p95']) {
+            console.log(formatRow(`${label} ${p}`, [before[key][p], after[key][p]], 'ms'));
+        }
+    }
+}
+
+function parseArgs(argv) {
+    const args = {
+        rows: 2000000,
+        inserts: 5000,
+        reads: 500,
+        dir: path.join(os.tmpdir(), 'events-bench'),
+        keep: false
+    };
+    for (let i = 0; i < argv.length; i++) {
+        const flag = argv[i];
+        const value = argv[i + 1];
+        if (flag === '--rows') { args.rows = parseInt(value); i++; }
+        else if (flag === '--inserts') { args.inserts = parseInt(value); i++; }
+        else if (flag === '--reads') { args.reads = parseInt(value); i++; }
+        else if (flag === '--dir') { args.dir = value; i++; }
+        else if (flag === '--keep') { args.keep = true; }
+        else throw new Error(`Unknown argument: ${flag}`);
+    }
+    return args;
+}
+
+function runBenchmark(options) {
+    fs.mkdirSync(options.dir, { recursive: true });
+    const results = {};
+    for (const profile of Object.keys(PROFILES)) {
+        const file = path.join(options.dir, `events-${profile}.db`);
+        removeDatabase(file);
+        seed(file, profile, options.rows);
+        results[profile] = measure(file, profile, options.rows, options);
+        if (!options.keep) {
+            removeDatabase(file);
+        }
+    }
+    return results;
+}
+
+if (require.main === module) {
+    try {
+        const options = parseArgs(process.argv.slice(2));
+        printReport(runBenchmark(options), options);
+    } catch (error) {
+        console.error(`Benchmark error: ${error.message}`);
+        process.exit(1);
+    }
+}
+
+module.exports = { runBenchmark, makeEvent };
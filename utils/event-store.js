@@ -0,0 +1,155 @@
+/**
+ * Event Store
+ * Every query the server runs against the events table, prepared once per
+ * database (or shard) when it is opened instead of on every request.
+ */
+
+class EventStore {
+    /**
+     * @param {Object} db - better-sqlite3 database handle with the events schema
+     */
+    constructor(db) {
+        this.db = db;
+        this.prepareStatements();
+    }
+
+    prepareStatements() {
+        this.stmts = {
+            insert: this.db.prepare(`
+                INSERT INTO events (session_id, event_type, timestamp, data)
+                VALUES (?, ?, ?, ?)
+            `),
+            sessionEvents: this.db.prepare(`
+                SELECT * FROM events
+                WHERE session_id = ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            `),
+            recentByType: this.db.prepare(`
+                SELECT * FROM events
+                WHERE event_type = ? AND timestamp > ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            `),
+            recentByTypeInWorkspace: this.db.prepare(`
+                SELECT * FROM events
+                WHERE event_type = ? AND timestamp > ?
+                  AND (JSON_EXTRACT(data, '$.workspace') = ? OR JSON_EXTRACT(data, '$.working_directory') LIKE ?)
+                ORDER BY timestamp DESC
+                LIMIT ?
+            `),
+            sessionSummaries: this.db.prepare(`
+                SELECT
+                    session_id,
+                    COUNT(*) as event_count,
+                    MIN(timestamp) as first_event,
+                    MAX(timestamp) as last_event
+                FROM events
+                GROUP BY session_id
+            `),
+            ping: this.db.prepare('SELECT 1 as test')
+        };
+        // Export pages, one statement per combination of filters, prepared on first use
+        this.exportStmts = new Map();
+    }
+
+    /**
+     * Export statement for a set of filters. Rows come in (timestamp, id)
+     * order strictly after a keyset position, which the timestamp (or
+     * session_id, timestamp) index serves without sorting.
+     * @param {Object} filters - { sessionId, eventType, workspace, until }
+     * @returns {Object} Prepared statement
+     */
+    exportStatement(filters) {
+        const clauses = ['(timestamp, id) > (?, ?)'];
+        if (filters.sessionId) clauses.push('session_id = ?');
+        if (filters.eventType) clauses.push('event_type = ?');
+        if (filters.until != null) clauses.push('timestamp < ?');
+        if (filters.workspace) {
+            clauses.push(`(JSON_EXTRACT(data, '$.workspace') = ? OR JSON_EXTRACT(data, '$.working_directory') LIKE ?)`);
+        }
+        const key = clauses.join(' AND ');
+        let stmt = this.exportStmts.get(key);
+        if (!stmt) {
+            stmt = this.db.prepare(`
+                SELECT id, session_id, event_type, timestamp, data, created_at FROM events
+                WHERE ${clauses.join(' AND ')}
+                ORDER BY timestamp ASC, id ASC
+                LIMIT ?
+            `);
+            this.exportStmts.set(key, stmt);
+        }
+        return stmt;
+    }
+
+    /**
+     * One page of events after a keyset position, for streaming exports
+     * @param {Object} filters - { sessionId, eventType, workspace, until }
+     * @param {number} afterTimestamp - Timestamp of the last row already exported
+     * @param {number} afterId - Id of the last row already exported
+     * @param {number} limit - Page size
+     * @returns {Iterator<Object>} Raw event rows; consume it fully before the
+     *     next query on this database
+     */
+    exportPage(filters, afterTimestamp, afterId, limit) {
+        const params = [afterTimestamp, afterId];
+        if (filters.sessionId) params.push(filters.sessionId);
+        if (filters.eventType) params.push(filters.eventType);
+        if (filters.until != null) params.push(filters.until);
+        if (filters.workspace) params.push(filters.workspace, `%/${filters.workspace}`);
+        params.push(limit);
+        return this.exportStatement(filters).iterate(...params);
+    }
+
+    /**
+     * Store one event
+     * @param {string} sessionId - Session ID
+     * @param {string} eventType - Event type
+     * @param {number} timestamp - Event time (ms)
+     * @param {Object} data - Remaining event fields, stored as JSON
+     * @returns {Object} better-sqlite3 run info
+     */
+    insert(sessionId, eventType, timestamp, data) {
+        return this.stmts.insert.run(sessionId, eventType, timestamp, JSON.stringify(data));
+    }
+
+    /**
+     * Most recent events of a session
+     * @param {string} sessionId - Session ID
+     * @param {number} limit - Maximum rows
+     * @returns {Array<Object>} Raw event rows (data still JSON text)
+     */
+    sessionEvents(sessionId, limit) {
+        return this.stmts.sessionEvents.all(sessionId, limit);
+    }
+
+    /**
+     * Most recent events of one type since a time, optionally for one workspace
+     * @param {string} eventType - Event type
+     * @param {number} since - Exclusive lower bound on timestamp (ms)
+     * @param {number} limit - Maximum rows
+     * @param {string|null} workspace - Workspace name, matched on data.workspace
+     *     or the working directory's last path component
+     * @returns {Array<Object>} Raw event rows (data still JSON text)
+     */
+    recent(eventType, since, limit, workspace = null) {
+        if (workspace) {
+            return this.stmts.recentByTypeInWorkspace.all(eventType, since, workspace, `%/${workspace}`, limit);
+        }
+        return this.stmts.recentByType.all(eventType, since, limit);
+    }
+
+    /**
+     * Event count and time range per session
+     * @returns {Array<Object>} { session_id, event_count, first_event, last_event }
+     */
+    sessionSummaries() {
+        return this.stmts.sessionSummaries.all();
+    }
+
+    ping() {
+        return this.stmts.ping.get();
+    }
+}
+
+module.exports = EventStore;
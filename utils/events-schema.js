@@ -0,0 +1,29 @@
+/**
+ * Events Schema
+ * Shared DDL for the events table so the server and offline tools create
+ * identical databases and shards.
+ */
+
+/**
+ * Create the events table and its indexes if needed
+ * @param {Object} db - better-sqlite3 database handle
+ */
+function initEventsSchema(db) {
+    db.exec(`
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            event_type TEXT,
+            timestamp INTEGER,
+            data TEXT,
+            created_at INTEGER DEFAULT (strftime('%s', 'now'))
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_session_id ON events(session_id);
+        CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type);
+        CREATE INDEX IF NOT EXISTS idx_timestamp ON events(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_session_timestamp ON events(session_id, timestamp);
+    `);
+}
+
+module.exports = { initEventsSchema };
@@ -0,0 +1,318 @@
+/**
+ * Knowledge Graph History
+ * Content-hashed, versioned snapshots of the knowledge graphs stored as
+ * node/edge deltas from the previous version, with periodic full
+ * checkpoints. Diffing two versions only reads the changes between them.
+ */
+
+const crypto = require('crypto');
+const fs = require('fs');
+const GraphIndex = require('./graph-index.js');
+
+const EDGE_SEPARATOR = '\u0000';
+
+class GraphHistory {
+    /**
+     * @param {Object} db - better-sqlite3 database handle for history tables
+     * @param {Object} options - History options
+     * @param {number} options.checkpointEvery - Store a full state every N versions
+     * @param {number} options.maxCached - Latest-version states kept in memory (LRU)
+     */
+    constructor(db, options = {}) {
+        this.db = db;
+        this.checkpointEvery = options.checkpointEvery || 50;
+        this.maxCached = options.maxCached || 256;
+        this.latest = new Map(); // "workspace/graph" -> { version, hash, mtimeMs, size, nodes, edges }, in LRU order
+        this.initSchema();
+        this.prepareStatements();
+    }
+
+    initSchema() {
+        this.db.exec(`
+            CREATE TABLE IF NOT EXISTS graph_versions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workspace TEXT NOT NULL,
+                graph TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                node_count INTEGER NOT NULL,
+                edge_count INTEGER NOT NULL,
+                nodes_added INTEGER NOT NULL DEFAULT 0,
+                nodes_removed INTEGER NOT NULL DEFAULT 0,
+                edges_added INTEGER NOT NULL DEFAULT 0,
+                edges_removed INTEGER NOT NULL DEFAULT 0,
+                checkpoint TEXT,
+                UNIQUE(workspace, graph, version)
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_graph_versions_time ON graph_versions(workspace, graph, created_at);
+
+            CREATE TABLE IF NOT EXISTS graph_changes (
+                workspace TEXT NOT NULL,
+                graph TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (workspace, graph, version, seq)
+            ) WITHOUT ROWID;
+        `);
+    }
+
+    prepareStatements() {
+        this.stmts = {
+            latestVersion: this.db.prepare(`
+                SELECT version, hash FROM graph_versions
+                WHERE workspace = ? AND graph = ?
+                ORDER BY version DESC LIMIT 1
+            `),
+            insertVersion: this.db.prepare(`
+                INSERT INTO graph_versions (workspace, graph, version, hash, created_at, node_count,
+                    edge_count, nodes_added, nodes_removed, edges_added, edges_removed, checkpoint)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            `),
+            insertChange: this.db.prepare(`
+                INSERT INTO graph_changes (workspace, graph, version, seq, op, kind, item_key, value)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            `),
+            timeline: this.db.prepare(`
+                SELECT version, hash, created_at, node_count, edge_count,
+                       nodes_added, nodes_removed, edges_added, edges_removed,
+                       checkpoint IS NOT NULL AS is_checkpoint
+                FROM graph_versions
+                WHERE workspace = ? AND graph = ? AND created_at >= ?
+                ORDER BY version ASC LIMIT ?
+            `),
+            versionAtTime: this.db.prepare(`
+                SELECT version FROM graph_versions
+                WHERE workspace = ? AND graph = ? AND created_at <= ?
+                ORDER BY created_at DESC, version DESC LIMIT 1
+            `),
+            nearestCheckpoint: this.db.prepare(`
+                SELECT version, checkpoint FROM graph_versions
+                WHERE workspace = ? AND graph = ? AND version <= ? AND checkpoint IS NOT NULL
+                ORDER BY version DESC LIMIT 1
+            `),
+            changesBetween: this.db.prepare(`
+                SELECT version, op, kind, item_key, value FROM graph_changes
+                WHERE workspace = ? AND graph = ? AND version > ? AND version <= ?
+                ORDER BY version ASC, seq ASC
+            `)
+        };
+    }
+
+    static edgeKey(edge) {
+        return [edge.from, edge.to, edge.label || ''].join(EDGE_SEPARATOR);
+    }
+
+    static splitEdgeKey(key) {
+        const [from, to, label] = key.split(EDGE_SEPARATOR);
+        return { from, to, label };
+    }
+
+    /**
+     * Snapshot a graph file if its content changed since the last version
+     * @param {string} workspace - Workspace name ('' for the default workspace)
+     * @param {string} graph - Graph name ('claude' or 'user')
+     * @param {string} filePath - Path to the .mmd file
+     * @returns {Object|null} The new version record, or null if unchanged
+     */
+    record(workspace, graph, filePath) {
+        let stat;
+        try {
+            stat = fs.statSync(filePath);
+        } catch (e) {
+            return null;
+        }
+
+        const key = `${workspace}/${graph}`;
+        const state = this.loadLatest(workspace, graph);
+        if (state && state.mtimeMs === stat.mtimeMs && state.size === stat.size) {
+            return null;
+        }
+
+        const content = fs.readFileSync(filePath, 'utf8');
+        const hash = crypto.createHash('sha256').update(content).digest('hex');
+        if (state && state.hash === hash) {
+            state.mtimeMs = stat.mtimeMs;
+            state.size = stat.size;
+            return null;
+        }
+
+        const index = new GraphIndex(content);
+        const nodes = new Map();
+        for (const [id, node] of index.nodes) {
+            nodes.set(id, node.label);
+        }
+        const edges = new Set(index.edges.map(edge => GraphHistory.edgeKey(edge)));
+
+        const previousNodes = state ? state.nodes : new Map();
+        const previousEdges = state ? state.edges : new Set();
+        const changes = [];
+        for (const [id, label] of previousNodes) {
+            if (nodes.get(id) !== label) changes.push(['-', 'node', id, label]);
+        }
+        for (const [id, label] of nodes) {
+            if (previousNodes.get(id) !== label) changes.push(['+', 'node', id, label]);
+        }
+        for (const edge of previousEdges) {
+            if (!edges.has(edge)) changes.push(['-', 'edge', edge, null]);
+        }
+        for (const edge of edges) {
+            if (!previousEdges.has(edge)) changes.push(['+', 'edge', edge, null]);
+        }
+
+        const version = state ? state.version + 1 : 1;
+        const isCheckpoint = version === 1 || version % this.checkpointEvery === 0;
+        const checkpoint = isCheckpoint
+            ? JSON.stringify({ nodes: Array.from(nodes), edges: Array.from(edges) })
+            : null;
+        const count = (op, kind) => changes.filter(c => c[0] === op && c[1] === kind).length;
+        const createdAt = Date.now();
+
+        this.db.transaction(() => {
+            this.stmts.insertVersion.run(
+                workspace, graph, version, hash, createdAt, nodes.size, edges.size,
+                count('+', 'node'), count('-', 'node'), count('+', 'edge'), count('-', 'edge'),
+                checkpoint
+            );
+            changes.forEach(([op, kind, itemKey, value], seq) => {
+                this.stmts.insertChange.run(workspace, graph, version, seq, op, kind, itemKey, value);
+            });
+        })();
+
+        this.cacheLatest(key, { version, hash, mtimeMs: stat.mtimeMs, size: stat.size, nodes, edges });
+        return { workspace, graph, version, hash, createdAt, changes: changes.length };
+    }
+
+    /**
+     * Keep a latest-version state in the LRU cache, evicting the least
+     * recently used one beyond maxCached (it is rebuilt from the DB if needed)
+     */
+    cacheLatest(key, state) {
+        this.latest.delete(key);
+        this.latest.set(key, state);
+        while (this.latest.size > this.maxCached) {
+            this.latest.delete(this.latest.keys().next().value);
+        }
+    }
+
+    /**
+     * In-memory state of the latest version, materialized from the DB on first use
+     */
+    loadLatest(workspace, graph) {
+        const key = `${workspace}/${graph}`;
+        let state = this.latest.get(key);
+        if (!state) {
+            const row = this.stmts.latestVersion.get(workspace, graph);
+            if (!row) return null;
+            const { nodes, edges } = this.materialize(workspace, graph, row.version);
+            state = { version: row.version, hash: row.hash, mtimeMs: null, size: null, nodes, edges };
+        }
+        this.cacheLatest(key, state);
+        return state;
+    }
+
+    /**
+     * Rebuild the node/edge sets of a version from the nearest checkpoint
+     * @returns {Object} { nodes: Map(id -> label), edges: Set(edgeKey) }
+     */
+    materialize(workspace, graph, version) {
+        const checkpointRow = this.stmts.nearestCheckpoint.get(workspace, graph, version);
+        let nodes = new Map();
+        let edges = new Set();
+        let from = 0;
+        if (checkpointRow) {
+            const parsed = JSON.parse(checkpointRow.checkpoint);
+            nodes = new Map(parsed.nodes);
+            edges = new Set(parsed.edges);
+            from = checkpointRow.version;
+        }
+        for (const change of this.stmts.changesBetween.iterate(workspace, graph, from, version)) {
+            if (change.kind === 'node') {
+                // Relabels are stored as '-' old then '+' new within one version
+                if (change.op === '+') nodes.set(change.item_key, change.value);
+                else nodes.delete(change.item_key);
+            } else if (change.op === '+') {
+                edges.add(change.item_key);
+            } else {
+                edges.delete(change.item_key);
+            }
+        }
+        return { nodes, edges };
+    }
+
+    /**
+     * Version timeline with per-version change counts
+     */
+    timeline(workspace, graph, since = 0, limit = 1000) {
+        return this.stmts.timeline.all(workspace, graph, since, limit).map(row => ({
+            ...row,
+            is_checkpoint: Boolean(row.is_checkpoint)
+        }));
+    }
+
+    /**
+     * Latest version at or before a timestamp (0 if none)
+     */
+    versionAt(workspace, graph, timestamp) {
+        const row = this.stmts.versionAtTime.get(workspace, graph, timestamp);
+        return row ? row.version : 0;
+    }
+
+    /**
+     * Net changes between two versions, reading only the changes in between
+     * @param {string} workspace - Workspace name
+     * @param {string} graph - Graph name
+     * @param {number} fromVersion - Older version (0 = empty graph)
+     * @param {number} toVersion - Newer version
+     * @returns {Object} Added, removed and relabelled nodes and edges
+     */
+    diff(workspace, graph, fromVersion, toVersion) {
+        const reverse = fromVersion > toVersion;
+        const [lo, hi] = reverse ? [toVersion, fromVersion] : [fromVersion, toVersion];
+
+        // For each item, the first change tells us its state at lo and the last its state at hi
+        const items = new Map();
+        for (const change of this.stmts.changesBetween.iterate(workspace, graph, lo, hi)) {
+            const itemId = `${change.kind}${EDGE_SEPARATOR}${change.item_key}`;
+            let item = items.get(itemId);
+            if (!item) {
+                item = { kind: change.kind, key: change.item_key, first: change, last: change };
+                items.set(itemId, item);
+            }
+            item.last = change;
+        }
+
+        const result = {
+            from: fromVersion,
+            to: toVersion,
+            nodes: { added: [], removed: [], relabeled: [] },
+            edges: { added: [], removed: [] }
+        };
+
+        for (const item of items.values()) {
+            const before = item.first.op === '-' ? (item.kind === 'node' ? item.first.value : true) : null;
+            const after = item.last.op === '+' ? (item.kind === 'node' ? item.last.value : true) : null;
+            const [older, newer] = reverse ? [after, before] : [before, after];
+            if (older === newer) continue;
+
+            if (item.kind === 'node') {
+                if (older === null) result.nodes.added.push({ id: item.key, label: newer });
+                else if (newer === null) result.nodes.removed.push({ id: item.key, label: older });
+                else result.nodes.relabeled.push({ id: item.key, from: older, to: newer });
+            } else {
+                const edge = GraphHistory.splitEdgeKey(item.key);
+                if (older === null) result.edges.added.push(edge);
+                else result.edges.removed.push(edge);
+            }
+        }
+
+        return result;
+    }
+}
+
+module.exports = GraphHistory;
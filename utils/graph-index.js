@@ -0,0 +1,281 @@
+/**
+ * Knowledge Graph Index
+ * Indexed in-memory view of a Mermaid knowledge graph that answers
+ * neighborhood, subgraph and hierarchy-level queries and re-emits just the
+ * selected part as Mermaid, so large graphs never ship or render whole.
+ */
+
+const fs = require('fs');
+const MermaidToAscii = require('./mermaid-to-ascii.js');
+
+class GraphIndex {
+    /**
+     * @param {string} mermaidCode - Mermaid diagram source
+     */
+    constructor(mermaidCode) {
+        const parser = new MermaidToAscii();
+        parser.parseMermaid(mermaidCode || '');
+
+        this.nodes = new Map();      // id -> { id, label, level, subgraph, children, parents }
+        this.edges = parser.edges;   // [{ from, to, label }]
+        this.labelIndex = new Map(); // lowercase label -> id
+        this.levels = new Map();     // level -> [ids]
+        this.subgraphs = new Map();  // name -> [ids]
+
+        for (const [id, node] of parser.nodes) {
+            // Nodes unreachable from a root (pure cycles) sit at the top level
+            const level = node.level < 0 ? 0 : node.level;
+            this.nodes.set(id, {
+                id,
+                label: node.label,
+                level,
+                subgraph: node.subgraph || null,
+                children: node.children,
+                parents: node.parents
+            });
+            this.labelIndex.set(node.label.toLowerCase(), id);
+            if (!this.levels.has(level)) this.levels.set(level, []);
+            this.levels.get(level).push(id);
+            if (node.subgraph) {
+                if (!this.subgraphs.has(node.subgraph)) this.subgraphs.set(node.subgraph, []);
+                this.subgraphs.get(node.subgraph).push(id);
+            }
+        }
+    }
+
+    /**
+     * Resolve a concept by node id or (case-insensitive) label
+     * @param {string} concept - Node id or label
+     * @returns {string|null} Node id
+     */
+    resolve(concept) {
+        if (!concept) return null;
+        if (this.nodes.has(concept)) return concept;
+        return this.labelIndex.get(concept.toLowerCase()) || null;
+    }
+
+    /**
+     * Counts per level and subgraph, without any nodes
+     * @returns {Object} Overview of the graph's shape
+     */
+    overview() {
+        const levels = [];
+        for (const [level, ids] of Array.from(this.levels).sort((a, b) => a[0] - b[0])) {
+            levels.push({ level, count: ids.length });
+        }
+        const subgraphs = [];
+        for (const [name, ids] of this.subgraphs) {
+            subgraphs.push({ name, count: ids.length });
+        }
+        return { totalNodes: this.nodes.size, totalEdges: this.edges.length, levels, subgraphs };
+    }
+
+    /**
+     * Nodes within k hops of a concept (following edges in either direction)
+     * @param {string} concept - Node id or label
+     * @param {number} depth - Number of hops
+     * @param {number} maxNodes - Cap on returned nodes
+     * @returns {Object|null} Selection, or null if the concept is unknown
+     */
+    neighborhood(concept, depth = 1, maxNodes = 500) {
+        const start = this.resolve(concept);
+        if (!start) return null;
+
+        const selected = new Set([start]);
+        let frontier = [start];
+        let truncated = false;
+
+        for (let hop = 0; hop < depth && frontier.length > 0 && !truncated; hop++) {
+            const next = [];
+            for (const id of frontier) {
+                const node = this.nodes.get(id);
+                for (const neighbor of [...node.children, ...node.parents]) {
+                    if (selected.has(neighbor)) continue;
+                    if (selected.size >= maxNodes) {
+                        truncated = true;
+                        break;
+                    }
+                    selected.add(neighbor);
+                    next.push(neighbor);
+                }
+                if (truncated) break;
+            }
+            frontier = next;
+        }
+
+        return this.select(selected, { center: start, truncated });
+    }
+
+    /**
+     * All nodes in one Mermaid subgraph
+     * @param {string} name - Subgraph name
+     * @returns {Object|null} Selection, or null if there is no such subgraph
+     */
+    subgraph(name) {
+        const ids = this.subgraphs.get(name);
+        if (!ids) return null;
+        return this.select(new Set(ids), { subgraph: name });
+    }
+
+    /**
+     * A page of nodes at one hierarchy level
+     * @param {number} level - Level (0 = roots)
+     * @param {number} offset - Page offset
+     * @param {number} limit - Page size
+     * @returns {Object} Selection with pagination info
+     */
+    level(level, offset = 0, limit = 50) {
+        const ids = this.levels.get(level) || [];
+        const page = ids.slice(offset, offset + limit);
+        const nextOffset = offset + page.length < ids.length ? offset + page.length : null;
+        return this.select(new Set(page), { level, offset, limit, total: ids.length, nextOffset });
+    }
+
+    /**
+     * The top of the hierarchy, level by level, up to maxNodes nodes
+     * @param {number} maxNodes - Cap on returned nodes
+     * @returns {Object} Selection (the whole graph when it is small enough)
+     */
+    top(maxNodes = 150) {
+        const selected = new Set();
+        let truncated = false;
+        for (const [, ids] of Array.from(this.levels).sort((a, b) => a[0] - b[0])) {
+            if (selected.size + ids.length > maxNodes) {
+                truncated = true;
+                break;
+            }
+            ids.forEach(id => selected.add(id));
+        }
+        // Always show at least the roots, even for very wide graphs
+        if (selected.size === 0 && this.levels.has(0)) {
+            this.levels.get(0).slice(0, maxNodes).forEach(id => selected.add(id));
+        }
+        return this.select(selected, { truncated, totalNodes: this.nodes.size });
+    }
+
+    /**
+     * Concepts whose label contains a query string
+     * @param {string} query - Substring to match (case-insensitive)
+     * @param {number} limit - Maximum matches
+     * @returns {Array} Matching nodes
+     */
+    search(query, limit = 20) {
+        const needle = (query || '').toLowerCase();
+        const matches = [];
+        if (!needle) return matches;
+        for (const node of this.nodes.values()) {
+            if (node.label.toLowerCase().includes(needle)) {
+                matches.push(this.describe(node.id));
+                if (matches.length >= limit) break;
+            }
+        }
+        return matches;
+    }
+
+    describe(id) {
+        const node = this.nodes.get(id);
+        return {
+            id,
+            label: node.label,
+            level: node.level,
+            subgraph: node.subgraph,
+            childCount: node.children.size,
+            parentCount: node.parents.size
+        };
+    }
+
+    /**
+     * Package a node selection with its internal edges and Mermaid source
+     * @param {Set} ids - Selected node ids
+     * @param {Object} meta - Extra fields for the response
+     * @returns {Object} { nodes, edges, mermaid, ...meta }
+     */
+    select(ids, meta = {}) {
+        const nodes = Array.from(ids).map(id => this.describe(id));
+        const edges = this.edges.filter(edge => ids.has(edge.from) && ids.has(edge.to));
+        return { ...meta, nodes, edges, mermaid: this.toMermaid(ids, edges) };
+    }
+
+    /**
+     * Emit Mermaid for a set of nodes, keeping their original ids and subgraphs
+     * @param {Set} ids - Node ids to include
+     * @param {Array} edges - Edges among those nodes
+     * @returns {string} Mermaid diagram syntax
+     */
+    toMermaid(ids, edges) {
+        const quote = (text) => `"${String(text).replace(/"/g, '#quot;')}"`;
+        const lines = ['graph TD'];
+        const grouped = new Map();
+        const loose = [];
+
+        for (const id of ids) {
+            const node = this.nodes.get(id);
+            if (node.subgraph) {
+                if (!grouped.has(node.subgraph)) grouped.set(node.subgraph, []);
+                grouped.get(node.subgraph).push(node);
+            } else {
+                loose.push(node);
+            }
+        }
+
+        for (const [name, members] of grouped) {
+            lines.push(`    subgraph ${quote(name)}`);
+            for (const node of members) {
+                lines.push(`        ${node.id}[${quote(node.label)}]`);
+            }
+            lines.push('    end');
+        }
+        for (const node of loose) {
+            lines.push(`    ${node.id}[${quote(node.label)}]`);
+        }
+        for (const edge of edges) {
+            lines.push(edge.label
+                ? `    ${edge.from} -->|${quote(edge.label)}| ${edge.to}`
+                : `    ${edge.from} --> ${edge.to}`);
+        }
+        return lines.join('\n');
+    }
+}
+
+/**
+ * Caches one GraphIndex per file, rebuilding only when the file changes
+ */
+class GraphIndexCache {
+    constructor(maxEntries = 64) {
+        this.maxEntries = maxEntries;
+        this.entries = new Map(); // filePath -> { mtimeMs, size, index }
+    }
+
+    /**
+     * Get the index for a graph file
+     * @param {string} filePath - Path to a .mmd file
+     * @returns {GraphIndex|null} Index, or null if the file does not exist
+     */
+    get(filePath) {
+        let stat;
+        try {
+            stat = fs.statSync(filePath);
+        } catch (e) {
+            this.entries.delete(filePath);
+            return null;
+        }
+
+        const cached = this.entries.get(filePath);
+        if (cached && cached.mtimeMs === stat.mtimeMs && cached.size === stat.size) {
+            this.entries.delete(filePath);
+            this.entries.set(filePath, cached);
+            return cached.index;
+        }
+
+        const index = new GraphIndex(fs.readFileSync(filePath, 'utf8'));
+        this.entries.delete(filePath);
+        this.entries.set(filePath, { mtimeMs: stat.mtimeMs, size: stat.size, index });
+        if (this.entries.size > this.maxEntries) {
+            this.entries.delete(this.entries.keys().next().value);
+        }
+        return index;
+    }
+}
+
+module.exports = GraphIndex;
+module.exports.GraphIndexCache = GraphIndexCache;
@@ -126,6 +126,42 @@ class KnowledgeGraphToMermaid {
             .substring(0, 50) + (text.length > 50 ? '...' : ''); // Limit length
     }
 
+    /**
+     * Split entity names into user-only, Claude-only and common sets
+     * @param {Object} userGraph - User's knowledge graph
+     * @param {Object} claudeGraph - Claude's knowledge graph
+     * @returns {Object} Entity name sets and partitions
+     */
+    partitionEntities(userGraph, claudeGraph) {
+        const userEntities = new Set(userGraph.entities?.map(e => e.name) || []);
+        const claudeEntities = new Set(claudeGraph.entities?.map(e => e.name) || []);
+
+        return {
+            userEntities,
+            claudeEntities,
+            userOnlyEntities: Array.from(userEntities).filter(name => !claudeEntities.has(name)),
+            claudeOnlyEntities: Array.from(claudeEntities).filter(name => !userEntities.has(name)),
+            commonEntities: Array.from(userEntities).filter(name => claudeEntities.has(name))
+        };
+    }
+
+    /**
+     * Delta counts only, without rendering any Mermaid diagrams
+     * @param {Object} userGraph - User's knowledge graph
+     * @param {Object} claudeGraph - Claude's knowledge graph
+     * @returns {Object} Same shape as createDelta().summary
+     */
+    summarizeDelta(userGraph, claudeGraph) {
+        const parts = this.partitionEntities(userGraph, claudeGraph);
+        return {
+            userOnlyCount: parts.userOnlyEntities.length,
+            claudeOnlyCount: parts.claudeOnlyEntities.length,
+            commonCount: parts.commonEntities.length,
+            totalUser: parts.userEntities.size,
+            totalClaude: parts.claudeEntities.size
+        };
+    }
+
     /**
      * Create a diff between two knowledge graphs and generate Mermaid
      * @param {Object} userGraph - User's knowledge graph
@@ -133,12 +169,13 @@ class KnowledgeGraphToMermaid {
      * @returns {Object} Delta analysis with Mermaid diagrams
      */
     createDelta(userGraph, claudeGraph) {
-        const userEntities = new Set(userGraph.entities?.map(e => e.name) || []);
-        const claudeEntities = new Set(claudeGraph.entities?.map(e => e.name) || []);
-        
-        const userOnlyEntities = Array.from(userEntities).filter(name => !claudeEntities.has(name));
-        const claudeOnlyEntities = Array.from(claudeEntities).filter(name => !userEntities.has(name));
-        const commonEntities = Array.from(userEntities).filter(name => claudeEntities.has(name));
+        const {
+            userEntities,
+            claudeEntities,
+            userOnlyEntities,
+            claudeOnlyEntities,
+            commonEntities
+        } = this.partitionEntities(userGraph, claudeGraph);
 
         // Create filtered graphs for visualization
         const userOnlyGraph = this.filterGraphByEntities(userGraph, userOnlyEntities);
@@ -0,0 +1,271 @@
+/**
+ * Event Shard Manager
+ * Routes events to per-workspace or hash-bucketed SQLite files, opened lazily
+ * and kept in an LRU pool with a cap on open handles. In 'single' mode every
+ * workspace maps to the legacy db/events.db so callers use one code path.
+ */
+
+const fs = require('fs');
+const path = require('path');
+const Database = require('better-sqlite3');
+
+const SHARD_MODES = ['single', 'workspace', 'hash'];
+// Shard for events without a workspace in 'workspace' mode. Workspace shards
+// are always named ws-<workspace>, so no workspace name can map to it.
+const DEFAULT_SHARD_NAME = 'default';
+const LEGACY_DEFAULT_SHARD_NAME = 'ws-_default';
+// Bucket key for events without a workspace in 'hash' mode. Buckets are
+// shared by many workspaces anyway, so this only picks a bucket; it stays
+// fixed so existing bucket files keep their contents.
+const DEFAULT_HASH_KEY = '_default';
+
+class ShardManager {
+    /**
+     * @param {Object} options - Shard options
+     * @param {string} options.dbDir - Directory holding events.db and shards/
+     * @param {string} options.mode - 'single', 'workspace' or 'hash'
+     * @param {number} options.buckets - Number of hash buckets in 'hash' mode
+     * @param {number} options.maxOpen - Maximum simultaneously open shard handles
+     * @param {Array<string>} options.pinned - Shards never evicted from the pool;
+     *     the default shard is always pinned because every workspace query reads it
+     * @param {Function} options.onOpen - Called with (db, name) whenever a shard is
+     *     opened, including reopens after eviction and short-lived read handles;
+     *     its return value is stored as shard.context
+     */
+    constructor(options = {}) {
+        const {
+            dbDir,
+            mode = 'single',
+            buckets = 16,
+            maxOpen = 32,
+            pinned = [],
+            onOpen = () => null
+        } = options;
+
+        if (!SHARD_MODES.includes(mode)) {
+            throw new Error(`Unknown shard mode: ${mode} (expected ${SHARD_MODES.join(', ')})`);
+        }
+
+        this.dbDir = dbDir;
+        this.shardDir = path.join(dbDir, 'shards');
+        this.mode = mode;
+        this.buckets = Math.max(1, buckets);
+        this.maxOpen = Math.max(1, maxOpen);
+        this.onOpen = onOpen;
+        this.pool = new Map(); // shard name -> { name, db, context }, in LRU order
+        this.pinned = new Set([this.shardNameFor(null), ...pinned]);
+
+        fs.mkdirSync(mode === 'single' ? dbDir : this.shardDir, { recursive: true });
+        if (mode === 'workspace') {
+            this.migrateDefaultShard();
+        }
+    }
+
+    /**
+     * Rename the default shard from its old name, ws-_default, which a
+     * workspace literally named _default would also have mapped to
+     */
+    migrateDefaultShard() {
+        const legacy = this.shardPath(LEGACY_DEFAULT_SHARD_NAME);
+        const current = this.shardPath(DEFAULT_SHARD_NAME);
+        if (!fs.existsSync(legacy) || fs.existsSync(current)) {
+            return;
+        }
+        for (const suffix of ['-wal', '-shm', '']) {
+            if (fs.existsSync(legacy + suffix)) {
+                fs.renameSync(legacy + suffix, current + suffix);
+            }
+        }
+    }
+
+    /**
+     * Map a workspace to its shard name
+     * @param {string|null} workspace - Workspace name (already validated)
+     * @returns {string} Shard name
+     */
+    shardNameFor(workspace) {
+        if (this.mode === 'single') {
+            return 'events';
+        }
+        if (this.mode === 'workspace') {
+            return workspace ? `ws-${workspace}` : DEFAULT_SHARD_NAME;
+        }
+        return `bucket-${ShardManager.hashKey(workspace || DEFAULT_HASH_KEY) % this.buckets}`;
+    }
+
+    /**
+     * 32-bit FNV-1a hash, stable across processes and Node versions
+     * @param {string} key - Key to hash
+     * @returns {number} Unsigned 32-bit hash
+     */
+    static hashKey(key) {
+        let hash = 0x811c9dc5;
+        for (let i = 0; i < key.length; i++) {
+            hash ^= key.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193);
+        }
+        return hash >>> 0;
+    }
+
+    shardPath(name) {
+        if (this.mode === 'single') {
+            return path.join(this.dbDir, `${name}.db`);
+        }
+        return path.join(this.shardDir, `${name}.db`);
+    }
+
+    /**
+     * Get (opening if needed) the shard that owns a workspace
+     * @param {string|null} workspace - Workspace name
+     * @returns {Object} Shard { name, db, context }
+     */
+    forWorkspace(workspace) {
+        return this.open(this.shardNameFor(workspace));
+    }
+
+    /**
+     * Shards that may hold events for a workspace, including the default shard
+     * that receives events captured without a workspace name
+     * @param {string|null} workspace - Workspace name
+     * @returns {Array<string>} Shard names
+     */
+    shardNamesForQuery(workspace) {
+        return Array.from(new Set([this.shardNameFor(workspace), this.shardNameFor(null)]));
+    }
+
+    /**
+     * Open a shard by name, maintaining LRU order and the open-handle cap
+     * @param {string} name - Shard name
+     * @returns {Object} Shard { name, db, context }
+     */
+    open(name) {
+        const cached = this.pool.get(name);
+        if (cached) {
+            this.pool.delete(name);
+            this.pool.set(name, cached);
+            return cached;
+        }
+
+        this.evictForOpen();
+
+        const db = new Database(this.shardPath(name));
+        const shard = { name, db, context: null };
+        shard.context = this.onOpen(db, name);
+        this.pool.set(name, shard);
+        return shard;
+    }
+
+    /**
+     * Close least recently used shards until there is room for one more.
+     * Pinned shards are skipped, even if that leaves the pool over the cap, so
+     * their handles and prepared statements live as long as the server.
+     */
+    evictForOpen() {
+        for (const [name, shard] of this.pool) {
+            if (this.pool.size < this.maxOpen) {
+                return;
+            }
+            if (!this.pinned.has(name)) {
+                this.pool.delete(name);
+                shard.db.close();
+            }
+        }
+    }
+
+    /**
+     * Names of all shards that exist on disk
+     * @returns {Array<string>} Shard names
+     */
+    listShardNames() {
+        if (this.mode === 'single') {
+            return ['events'];
+        }
+        if (!fs.existsSync(this.shardDir)) {
+            return [];
+        }
+        return fs.readdirSync(this.shardDir)
+            .filter(file => file.endsWith('.db'))
+            .map(file => file.slice(0, -3))
+            .sort();
+    }
+
+    /**
+     * Shards currently open in the pool (none are opened by this call)
+     * @returns {Array<Object>} Shards { name, db, context }
+     */
+    openShards() {
+        return Array.from(this.pool.values());
+    }
+
+    /**
+     * Start a read over many shards that leaves the pool alone. Pooled shards
+     * are used as they are, without moving them in the LRU order; any other
+     * shard gets a handle of its own that lives until reader.close(). A scan
+     * of more shards than maxOpen therefore never evicts the shards that
+     * ingestion keeps hot.
+     * @returns {Object} Reader { get(name), close() }
+     */
+    reader() {
+        const own = new Map(); // shard name -> short-lived shard
+        return {
+            get: (name) => {
+                const shard = own.get(name) || this.pool.get(name);
+                if (shard) {
+                    return shard;
+                }
+                const db = new Database(this.shardPath(name));
+                const opened = { name, db, context: null };
+                opened.context = this.onOpen(db, name);
+                own.set(name, opened);
+                return opened;
+            },
+            close: () => {
+                for (const shard of own.values()) {
+                    shard.db.close();
+                }
+                own.clear();
+            }
+        };
+    }
+
+    /**
+     * Run a synchronous query against shards and collect the results. Shards
+     * outside the pool are opened for this call only (see reader()).
+     * @param {Function} fn - Called with (shard); its return value is collected
+     * @param {Array<string>} names - Shard names (default: every shard on disk)
+     * @returns {Array} One result per shard
+     */
+    fanOut(fn, names = this.listShardNames()) {
+        const reader = this.reader();
+        try {
+            return names.map(name => fn(reader.get(name)));
+        } finally {
+            reader.close();
+        }
+    }
+
+    /**
+     * Pool statistics for health reporting
+     * @returns {Object} Mode and handle counts
+     */
+    stats() {
+        return {
+            mode: this.mode,
+            shards: this.listShardNames().length,
+            openShards: this.pool.size,
+            maxOpen: this.maxOpen,
+            pinned: Array.from(this.pinned),
+            ...(this.mode === 'hash' && { buckets: this.buckets })
+        };
+    }
+
+    closeAll() {
+        for (const shard of this.pool.values()) {
+            shard.db.close();
+        }
+        this.pool.clear();
+    }
+}
+
+module.exports = ShardManager;
+module.exports.SHARD_MODES = SHARD_MODES;
@@ -0,0 +1,125 @@
+#!/usr/bin/env node
+/**
+ * Split Events Database
+ * Offline tool that splits an existing db/events.db into per-workspace or
+ * hash-bucketed shards using the same routing as the server.
+ *
+ * Usage: node utils/split-events-db.js --mode workspace|hash [--buckets 16]
+ *            [--source db/events.db] [--db-dir db] [--batch 5000]
+ */
+
+const path = require('path');
+const Database = require('better-sqlite3');
+const ShardManager = require('./shard-manager.js');
+const { initEventsSchema } = require('./events-schema.js');
+const { applyTuning } = require('./sqlite-tuning.js');
+
+/**
+ * Copy every event from source into the shard that owns its workspace
+ * @param {Object} options - Split options
+ * @param {string} options.source - Path to the unsharded events.db
+ * @param {string} options.dbDir - Directory that will hold shards/
+ * @param {string} options.mode - 'workspace' or 'hash'
+ * @param {number} options.buckets - Number of hash buckets
+ * @param {number} options.batchSize - Rows buffered per shard before flushing
+ * @returns {Object} Row counts per shard
+ */
+function splitEventsDb({ source, dbDir, mode, buckets = 16, batchSize = 5000 }) {
+    if (mode === 'single') {
+        throw new Error('Splitting requires --mode workspace or --mode hash');
+    }
+
+    const sourceDb = new Database(source, { readonly: true });
+    // New shards get the server's tuning so they start out with incremental auto_vacuum
+    const shards = new ShardManager({
+        dbDir, mode, buckets, maxOpen: 8,
+        onOpen: (db) => {
+            applyTuning(db);
+            initEventsSchema(db);
+        }
+    });
+
+    const pending = new Map(); // shard name -> buffered rows
+    const counts = {};
+
+    // Original ids are kept so events stay traceable across the split
+    const flush = (name) => {
+        const rows = pending.get(name);
+        if (!rows || rows.length === 0) return;
+        const { db } = shards.open(name);
+        const insert = db.prepare(`
+            INSERT OR IGNORE INTO events (id, session_id, event_type, timestamp, data, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        `);
+        db.transaction(() => {
+            for (const row of rows) {
+                insert.run(row.id, row.session_id, row.event_type, row.timestamp, row.data, row.created_at);
+            }
+        })();
+        counts[name] = (counts[name] || 0) + rows.length;
+        pending.set(name, []);
+    };
+
+    const rows = sourceDb.prepare(`
+        SELECT id, session_id, event_type, timestamp, data, created_at,
+               JSON_EXTRACT(data, '$.workspace') AS workspace
+        FROM events ORDER BY id ASC
+    `);
+
+    for (const row of rows.iterate()) {
+        const name = shards.shardNameFor(row.workspace || null);
+        if (!pending.has(name)) pending.set(name, []);
+        pending.get(name).push(row);
+        if (pending.get(name).length >= batchSize) {
+            flush(name);
+        }
+    }
+
+    for (const name of pending.keys()) {
+        flush(name);
+    }
+
+    shards.closeAll();
+    sourceDb.close();
+    return counts;
+}
+
+function parseArgs(argv) {
+    const args = {
+        source: path.join(__dirname, '..', 'db', 'events.db'),
+        dbDir: path.join(__dirname, '..', 'db'),
+        mode: 'workspace',
+        buckets: 16,
+        batchSize: 5000
+    };
+    for (let i = 0; i < argv.length; i++) {
+        const flag = argv[i];
+        const value = argv[i + 1];
+        if (flag === '--source') { args.source = value; i++; }
+        else if (flag === '--db-dir') { args.dbDir = value; i++; }
+        else if (flag === '--mode') { args.mode = value; i++; }
+        else if (flag === '--buckets') { args.buckets = parseInt(value); i++; }
+        else if (flag === '--batch') { args.batchSize = parseInt(value); i++; }
+        else throw new Error(`Unknown argument: ${flag}`);
+    }
+    return args;
+}
+
+if (require.main === module) {
+    try {
+        const args = parseArgs(process.argv.slice(2));
+        const counts = splitEventsDb(args);
+        const total = Object.values(counts).reduce((sum, n) => sum + n, 0);
+        console.log(`Split ${total} events into ${Object.keys(counts).length} shards (${args.mode} mode):`);
+        for (const [name, count] of Object.entries(counts)) {
+            console.log(`  ${name}: ${count}`);
+        }
+        console.log(`Start the server with EVENTS_SHARD_MODE=${args.mode}` +
+            (args.mode === 'hash' ? ` EVENTS_SHARD_BUCKETS=${args.buckets}` : ''));
+    } catch (error) {
+        console.error(`Error splitting events database: ${error.message}`);
+        process.exit(1);
+    }
+}
+
+module.exports = splitEventsDb;
@@ -0,0 +1,180 @@
+/**
+ * SQLite Tuning
+ * Connection pragmas for the server's databases (WAL journaling, relaxed
+ * synchronous, larger page cache, memory-mapped reads) and a background
+ * scheduler for the upkeep they need: WAL checkpoints, ANALYZE and
+ * incremental vacuum.
+ */
+
+const DEFAULT_TUNING = {
+    synchronous: 'NORMAL',        // Durable across app crashes; WAL makes FULL unnecessary
+    cacheSizeKb: 64 * 1024,       // Page cache per connection
+    mmapSizeBytes: 256 * 1024 * 1024,
+    busyTimeoutMs: 5000,          // Wait on other processes (e.g. the archive job) instead of failing
+    walAutocheckpointPages: 1000
+};
+
+const DEFAULT_SCHEDULE = {
+    checkpointMs: 60 * 1000,      // Passive WAL checkpoint
+    optimizeMs: 60 * 60 * 1000,   // ANALYZE / PRAGMA optimize, truncating checkpoint
+    vacuumMs: 10 * 60 * 1000,     // Incremental vacuum of free pages
+    vacuumPages: 2000,            // Pages released per vacuum run, bounding the pause
+    analysisLimit: 1000           // Rows sampled per index by ANALYZE
+};
+
+/**
+ * Apply the tuned connection settings to a freshly opened database
+ * @param {Object} db - better-sqlite3 database handle
+ * @param {Object} options - Overrides for DEFAULT_TUNING
+ * @returns {Object} Effective settings as reported by SQLite
+ */
+function applyTuning(db, options = {}) {
+    const settings = { ...DEFAULT_TUNING, ...options };
+
+    // auto_vacuum can only be switched before the first table is created;
+    // existing databases keep their mode until a full VACUUM
+    const isEmpty = db.prepare("SELECT COUNT(*) AS n FROM sqlite_master").get().n === 0;
+    if (isEmpty) {
+        db.pragma('auto_vacuum = INCREMENTAL');
+    }
+
+    db.pragma('journal_mode = WAL');
+    db.pragma(`synchronous = ${settings.synchronous}`);
+    db.pragma(`cache_size = -${Math.floor(settings.cacheSizeKb)}`);
+    db.pragma(`mmap_size = ${Math.floor(settings.mmapSizeBytes)}`);
+    db.pragma('temp_store = MEMORY');
+    db.pragma(`busy_timeout = ${Math.floor(settings.busyTimeoutMs)}`);
+    db.pragma(`wal_autocheckpoint = ${Math.floor(settings.walAutocheckpointPages)}`);
+
+    return {
+        journalMode: db.pragma('journal_mode', { simple: true }),
+        autoVacuum: ['none', 'full', 'incremental'][db.pragma('auto_vacuum', { simple: true })],
+        synchronous: settings.synchronous,
+        cacheSizeKb: settings.cacheSizeKb,
+        mmapSizeBytes: db.pragma('mmap_size', { simple: true })
+    };
+}
+
+/**
+ * Checkpoint the WAL; TRUNCATE also resets the -wal file to zero bytes
+ * @param {Object} db - better-sqlite3 database handle
+ * @param {string} mode - 'PASSIVE' or 'TRUNCATE'
+ * @returns {Object} { busy, log, checkpointed } frame counts
+ */
+function checkpoint(db, mode = 'PASSIVE') {
+    return db.pragma(`wal_checkpoint(${mode})`)[0];
+}
+
+/**
+ * Refresh planner statistics. The first run analyzes every index; later runs
+ * let PRAGMA optimize re-analyze only tables whose statistics went stale.
+ * analysis_limit keeps either bounded on tables with millions of rows.
+ * @param {Object} db - better-sqlite3 database handle
+ * @param {number} analysisLimit - Approximate rows examined per index
+ */
+function optimize(db, analysisLimit = DEFAULT_SCHEDULE.analysisLimit) {
+    db.pragma(`analysis_limit = ${Math.floor(analysisLimit)}`);
+    const hasStats = db.prepare(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).get();
+    if (hasStats) {
+        db.pragma('optimize');
+    } else {
+        db.exec('ANALYZE');
+    }
+}
+
+/**
+ * Return up to maxPages free pages to the filesystem (incremental auto_vacuum only)
+ * @param {Object} db - better-sqlite3 database handle
+ * @param {number} maxPages - Upper bound on pages released in this call
+ * @returns {number} Pages released
+ */
+function incrementalVacuum(db, maxPages = DEFAULT_SCHEDULE.vacuumPages) {
+    if (db.pragma('auto_vacuum', { simple: true }) !== 2) {
+        return 0;
+    }
+    const free = db.pragma('freelist_count', { simple: true });
+    if (free === 0) {
+        return 0;
+    }
+    // incremental_vacuum frees one page per step; exec steps it to completion
+    db.exec(`PRAGMA incremental_vacuum(${Math.min(free, Math.floor(maxPages))})`);
+    return free - db.pragma('freelist_count', { simple: true });
+}
+
+class MaintenanceScheduler {
+    /**
+     * @param {Function} getDatabases - Returns the currently open database handles;
+     *     called on every run so shards opened or evicted later are handled
+     * @param {Object} options - Overrides for DEFAULT_SCHEDULE
+     */
+    constructor(getDatabases, options = {}) {
+        this.getDatabases = getDatabases;
+        this.options = { ...DEFAULT_SCHEDULE, ...options };
+        this.timers = [];
+        this.lastRun = {};
+    }
+
+    /**
+     * Start the periodic jobs. Timers are unref'd so they never keep the
+     * process alive on their own.
+     */
+    start() {
+        const { checkpointMs, optimizeMs, vacuumMs } = this.options;
+        this.schedule('checkpoint', checkpointMs, db => checkpoint(db, 'PASSIVE'));
+        this.schedule('optimize', optimizeMs, db => {
+            optimize(db, this.options.analysisLimit);
+            checkpoint(db, 'TRUNCATE');
+        });
+        this.schedule('vacuum', vacuumMs, db => incrementalVacuum(db, this.options.vacuumPages));
+        return this;
+    }
+
+    schedule(job, intervalMs, task) {
+        if (!intervalMs || intervalMs <= 0) return;
+        const timer = setInterval(() => this.run(job, task), intervalMs);
+        timer.unref();
+        this.timers.push(timer);
+    }
+
+    /**
+     * Run one job against every open database; a failure on one database
+     * (e.g. a shard closed mid-run) is logged and does not stop the others
+     * @param {string} job - Job name, for logging and stats
+     * @param {Function} task - Called with (db)
+     */
+    run(job, task) {
+        const started = Date.now();
+        for (const db of this.getDatabases()) {
+            if (!db.open) continue;
+            try {
+                task(db);
+            } catch (error) {
+                console.error(`SQLite ${job} error (${db.name}):`, error.message);
+            }
+        }
+        this.lastRun[job] = { at: started, durationMs: Date.now() - started };
+    }
+
+    stop() {
+        for (const timer of this.timers) {
+            clearInterval(timer);
+        }
+        this.timers = [];
+    }
+
+    stats() {
+        return { ...this.lastRun };
+    }
+}
+
+module.exports = {
+    applyTuning,
+    checkpoint,
+    optimize,
+    incrementalVacuum,
+    MaintenanceScheduler,
+    DEFAULT_TUNING,
+    DEFAULT_SCHEDULE
+};
@@ -0,0 +1,402 @@
+/**
+ * Turn Analytics
+ * Derives per-turn records (UserPromptSubmit -> Stop) from the event stream
+ * as events are ingested, so latency and tool usage never require scanning
+ * raw events.
+ */
+
+// Open turns without activity for this long (a session that never sent
+// Stop) are closed as 'abandoned' and dropped from memory
+const OPEN_TURN_TTL_MS = 6 * 60 * 60 * 1000;
+const SWEEP_INTERVAL_MS = 60 * 1000;
+
+class TurnAnalytics {
+    /**
+     * @param {Object} db - better-sqlite3 database handle
+     * @param {Object} options - { openTurnTtlMs }
+     */
+    constructor(db, options = {}) {
+        this.db = db;
+        this.openTurnTtlMs = options.openTurnTtlMs || OPEN_TURN_TTL_MS;
+        this.openTurns = new Map(); // session_id -> { id, startedAt, lastEventAt, toolCalls, toolMix }
+        this.lastSweep = 0;
+        this.initSchema();
+        this.prepareStatements();
+    }
+
+    /**
+     * Create the turns table and its indexes if needed
+     */
+    initSchema() {
+        this.db.exec(`
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                workspace TEXT,
+                started_at INTEGER NOT NULL,
+                ended_at INTEGER,
+                duration_ms INTEGER,
+                tool_calls INTEGER NOT NULL DEFAULT 0,
+                tool_mix TEXT NOT NULL DEFAULT '{}',
+                prompt_chars INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'open'
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, started_at);
+            CREATE INDEX IF NOT EXISTS idx_turns_workspace_duration ON turns(workspace, status, duration_ms);
+            CREATE INDEX IF NOT EXISTS idx_turns_status_duration ON turns(status, duration_ms);
+
+            CREATE TABLE IF NOT EXISTS turn_analytics_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        `);
+    }
+
+    /**
+     * Rebind to a reopened handle of the same database. The schema already
+     * exists and the in-memory open turns are kept, so a shard evicted from
+     * the pool and reopened picks up exactly where it was.
+     * @param {Object} db - New better-sqlite3 handle
+     * @returns {TurnAnalytics} this
+     */
+    attach(db) {
+        this.db = db;
+        this.prepareStatements();
+        return this;
+    }
+
+    prepareStatements() {
+        this.stmts = {
+            insertTurn: this.db.prepare(`
+                INSERT INTO turns (session_id, workspace, started_at, prompt_chars)
+                VALUES (?, ?, ?, ?)
+            `),
+            updateTools: this.db.prepare(`
+                UPDATE turns SET tool_calls = ?, tool_mix = ? WHERE id = ?
+            `),
+            closeTurn: this.db.prepare(`
+                UPDATE turns SET ended_at = ?, duration_ms = ?, status = ? WHERE id = ?
+            `),
+            findOpenTurn: this.db.prepare(`
+                SELECT id, started_at, tool_calls, tool_mix FROM turns
+                WHERE session_id = ? AND status = 'open'
+                ORDER BY started_at DESC LIMIT 1
+            `),
+            sessionTurns: this.db.prepare(`
+                SELECT * FROM turns WHERE session_id = ?
+                ORDER BY started_at ASC LIMIT ?
+            `),
+            // Summary queries come in two variants: one workspace, or all turns
+            durationAtOffset: this.db.prepare(`
+                SELECT duration_ms FROM turns
+                WHERE workspace = ? AND status = 'completed'
+                ORDER BY duration_ms ASC LIMIT 1 OFFSET ?
+            `),
+            durationAtOffsetAll: this.db.prepare(`
+                SELECT duration_ms FROM turns
+                WHERE status = 'completed'
+                ORDER BY duration_ms ASC LIMIT 1 OFFSET ?
+            `),
+            durations: this.db.prepare(`
+                SELECT duration_ms FROM turns
+                WHERE workspace = ? AND status = 'completed'
+                ORDER BY duration_ms ASC
+            `).pluck(),
+            durationsAll: this.db.prepare(`
+                SELECT duration_ms FROM turns
+                WHERE status = 'completed'
+                ORDER BY duration_ms ASC
+            `).pluck(),
+            workspaceAggregates: this.db.prepare(`
+                SELECT COUNT(*) AS turns,
+                       SUM(duration_ms) AS duration_ms,
+                       SUM(tool_calls) AS tool_calls,
+                       SUM(prompt_chars) AS prompt_chars
+                FROM turns
+                WHERE workspace = ? AND status = 'completed'
+            `),
+            workspaceAggregatesAll: this.db.prepare(`
+                SELECT COUNT(*) AS turns,
+                       SUM(duration_ms) AS duration_ms,
+                       SUM(tool_calls) AS tool_calls,
+                       SUM(prompt_chars) AS prompt_chars
+                FROM turns
+                WHERE status = 'completed'
+            `),
+            workspaceToolMix: this.db.prepare(`
+                SELECT j.key AS tool, SUM(j.value) AS calls
+                FROM turns, json_each(turns.tool_mix) AS j
+                WHERE turns.workspace = ? AND turns.status = 'completed'
+                GROUP BY j.key
+            `),
+            workspaceToolMixAll: this.db.prepare(`
+                SELECT j.key AS tool, SUM(j.value) AS calls
+                FROM turns, json_each(turns.tool_mix) AS j
+                WHERE turns.status = 'completed'
+                GROUP BY j.key
+            `),
+            staleOpenTurns: this.db.prepare(`
+                SELECT id, session_id, started_at FROM turns
+                WHERE status = 'open' AND started_at < ?
+            `),
+            getMeta: this.db.prepare('SELECT value FROM turn_analytics_meta WHERE key = ?').pluck(),
+            setMeta: this.db.prepare(`
+                INSERT INTO turn_analytics_meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            `),
+            turnCount: this.db.prepare('SELECT COUNT(*) AS n FROM turns'),
+            allEvents: this.db.prepare(`
+                SELECT session_id, event_type, timestamp, data FROM events
+                ORDER BY timestamp ASC, id ASC
+            `)
+        };
+    }
+
+    /**
+     * Fold a single ingested event into the turn records
+     * @param {Object} event - { session_id, event_type, timestamp, data }
+     */
+    recordEvent(event) {
+        const { session_id: sessionId, event_type: eventType, timestamp } = event;
+        const data = event.data || {};
+        if (timestamp - this.lastSweep >= SWEEP_INTERVAL_MS) {
+            this.evictStaleTurns(timestamp);
+        }
+
+        if (eventType === 'UserPromptSubmit') {
+            // A new prompt before Stop means the previous turn was abandoned
+            const previous = this.getOpenTurn(sessionId);
+            if (previous) {
+                this.closeTurn(sessionId, previous, timestamp, 'interrupted');
+            }
+            const prompt = typeof data.user_prompt === 'string' ? data.user_prompt : '';
+            const result = this.stmts.insertTurn.run(sessionId, data.workspace || null, timestamp, prompt.length);
+            this.openTurns.set(sessionId, {
+                id: Number(result.lastInsertRowid),
+                startedAt: timestamp,
+                lastEventAt: timestamp,
+                toolCalls: 0,
+                toolMix: {}
+            });
+        } else if (eventType === 'PostToolUse') {
+            const turn = this.getOpenTurn(sessionId);
+            if (!turn) return;
+            const toolName = data.tool_name || 'unknown';
+            turn.lastEventAt = Math.max(turn.lastEventAt, timestamp);
+            turn.toolCalls += 1;
+            turn.toolMix[toolName] = (turn.toolMix[toolName] || 0) + 1;
+            this.stmts.updateTools.run(turn.toolCalls, JSON.stringify(turn.toolMix), turn.id);
+        } else if (eventType === 'Stop') {
+            const turn = this.getOpenTurn(sessionId);
+            if (!turn) return;
+            this.closeTurn(sessionId, turn, timestamp, 'completed');
+        }
+    }
+
+    /**
+     * Get the open turn for a session, reloading it from the DB after a restart
+     * @param {string} sessionId - Session identifier
+     * @returns {Object|null} Open turn state
+     */
+    getOpenTurn(sessionId) {
+        if (this.openTurns.has(sessionId)) {
+            return this.openTurns.get(sessionId);
+        }
+        const row = this.stmts.findOpenTurn.get(sessionId);
+        if (!row) return null;
+
+        let toolMix = {};
+        try {
+            toolMix = JSON.parse(row.tool_mix || '{}');
+        } catch (e) {
+            toolMix = {};
+        }
+        const turn = {
+            id: row.id,
+            startedAt: row.started_at,
+            lastEventAt: row.started_at,
+            toolCalls: row.tool_calls,
+            toolMix
+        };
+        this.openTurns.set(sessionId, turn);
+        return turn;
+    }
+
+    closeTurn(sessionId, turn, endedAt, status) {
+        const duration = Math.max(0, endedAt - turn.startedAt);
+        this.stmts.closeTurn.run(endedAt, duration, status, turn.id);
+        this.openTurns.delete(sessionId);
+    }
+
+    /**
+     * Close turns idle for longer than the TTL as 'abandoned', in memory and
+     * in the database (turns left open by a previous process included)
+     * @param {number} now - Current event time (ms)
+     * @returns {number} Number of turns closed
+     */
+    evictStaleTurns(now) {
+        this.lastSweep = now;
+        const cutoff = now - this.openTurnTtlMs;
+        let closed = 0;
+        for (const [sessionId, turn] of this.openTurns) {
+            if (turn.lastEventAt < cutoff) {
+                this.closeTurn(sessionId, turn, turn.lastEventAt, 'abandoned');
+                closed++;
+            }
+        }
+        for (const row of this.stmts.staleOpenTurns.all(cutoff)) {
+            if (this.openTurns.has(row.session_id)) continue;
+            this.stmts.closeTurn.run(row.started_at, 0, 'abandoned', row.id);
+            closed++;
+        }
+        return closed;
+    }
+
+    /**
+     * Derive turns for events ingested before analytics existed. Runs once
+     * per database: a meta row records that it happened, so databases whose
+     * events never form a turn are not rescanned on every open.
+     * @returns {number} Number of events replayed
+     */
+    backfillIfEmpty() {
+        if (this.stmts.getMeta.get('backfilled_at')) return 0;
+
+        let replayed = 0;
+        const replay = this.db.transaction(() => {
+            if (this.stmts.turnCount.get().n === 0) {
+                for (const row of this.stmts.allEvents.iterate()) {
+                    let data = {};
+                    try {
+                        data = JSON.parse(row.data || '{}');
+                    } catch (e) {
+                        data = {};
+                    }
+                    this.recordEvent({ ...row, data });
+                    replayed++;
+                }
+            }
+            this.stmts.setMeta.run('backfilled_at', String(Date.now()));
+        });
+        replay();
+        return replayed;
+    }
+
+    /**
+     * List turn records for a session
+     * @param {string} sessionId - Session identifier
+     * @param {number} limit - Maximum number of turns
+     * @returns {Array} Turn records with parsed tool mix
+     */
+    getSessionTurns(sessionId, limit = 500) {
+        return this.stmts.sessionTurns.all(sessionId, limit).map(turn => {
+            try {
+                turn.tool_mix = JSON.parse(turn.tool_mix || '{}');
+            } catch (e) {
+                turn.tool_mix = {};
+            }
+            return turn;
+        });
+    }
+
+    /**
+     * Summary inputs over completed turns, combinable across shards
+     * @param {string|null} workspace - Workspace name, or null for all turns
+     * @param {boolean} withDurations - Include every duration, sorted ascending
+     * @returns {Object} { turns, totals, toolMix, durations? }
+     */
+    getSummaryParts(workspace, withDurations = false) {
+        const aggregates = workspace
+            ? this.stmts.workspaceAggregates.get(workspace)
+            : this.stmts.workspaceAggregatesAll.get();
+        const toolMixRows = workspace
+            ? this.stmts.workspaceToolMix.all(workspace)
+            : this.stmts.workspaceToolMixAll.all();
+        const toolMix = {};
+        for (const { tool, calls } of toolMixRows) {
+            toolMix[tool] = calls;
+        }
+        return {
+            turns: aggregates.turns,
+            totals: {
+                durationMs: aggregates.duration_ms || 0,
+                toolCalls: aggregates.tool_calls || 0,
+                promptChars: aggregates.prompt_chars || 0
+            },
+            toolMix,
+            ...(withDurations && {
+                durations: workspace ? this.stmts.durations.all(workspace) : this.stmts.durationsAll.all()
+            })
+        };
+    }
+
+    /**
+     * Percentile and tool-mix summary over completed turns
+     * @param {string|null} workspace - Workspace name, or null for all turns
+     * @param {Array<number>} percentiles - Percentiles to report (0-100)
+     * @returns {Object} Summary statistics
+     */
+    getWorkspaceSummary(workspace, percentiles = [50, 90, 99]) {
+        const key = workspace || null;
+        const parts = this.getSummaryParts(key);
+        // Nearest-rank percentiles read straight off the duration index
+        const durationAt = (rank) => (key
+            ? this.stmts.durationAtOffset.get(key, rank)
+            : this.stmts.durationAtOffsetAll.get(rank)).duration_ms;
+        return TurnAnalytics.summarize(key, [parts], percentiles, durationAt);
+    }
+
+    /**
+     * Combine summary parts from several shards into one summary
+     * @param {string|null} workspace - Workspace the parts were computed for
+     * @param {Array<Object>} partsList - Results of getSummaryParts (with durations
+     *     unless durationAt is given)
+     * @param {Array<number>} percentiles - Percentiles to report (0-100)
+     * @param {Function} durationAt - Optional (rank) => duration lookup
+     * @returns {Object} Summary statistics
+     */
+    static summarize(workspace, partsList, percentiles = [50, 90, 99], durationAt = null) {
+        const total = partsList.reduce((sum, parts) => sum + parts.turns, 0);
+        const totals = { durationMs: 0, toolCalls: 0, promptChars: 0 };
+        const toolMix = {};
+        for (const parts of partsList) {
+            for (const field of Object.keys(totals)) {
+                totals[field] += parts.totals[field];
+            }
+            for (const [tool, calls] of Object.entries(parts.toolMix)) {
+                toolMix[tool] = (toolMix[tool] || 0) + calls;
+            }
+        }
+
+        if (!durationAt) {
+            const durations = [].concat(...partsList.map(parts => parts.durations || []));
+            if (partsList.length > 1) durations.sort((a, b) => a - b);
+            durationAt = (rank) => durations[rank];
+        }
+        const durationPercentiles = {};
+        for (const p of percentiles) {
+            if (total === 0) {
+                durationPercentiles[`p${p}`] = null;
+                continue;
+            }
+            const rank = Math.min(total - 1, Math.max(0, Math.ceil((p / 100) * total) - 1));
+            durationPercentiles[`p${p}`] = durationAt(rank);
+        }
+
+        const average = (sum) => total ? sum / total : null;
+        return {
+            workspace: workspace || null,
+            turns: total,
+            avgDurationMs: average(totals.durationMs),
+            avgToolCalls: average(totals.toolCalls),
+            avgPromptChars: average(totals.promptChars),
+            durationMs: durationPercentiles,
+            toolMix: Object.entries(toolMix)
+                .map(([tool, calls]) => ({ tool, calls }))
+                .sort((a, b) => b.calls - a.calls)
+        };
+    }
+}
+
+module.exports = TurnAnalytics;
+module.exports.OPEN_TURN_TTL_MS = OPEN_TURN_TTL_MS;